@@ -1,31 +1,320 @@
+import hashlib
+import math
 import os
 import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+from boto3.s3.transfer import TransferConfig
+
+from phising.configuration.aws_connection import S3Client
+from phising.constant import training_pipeline
 from phising.exception import PhisingException
+from phising.logger import logging
+
+
+@dataclass
+class S3SyncMetrics:
+    files_transferred: int = 0
+
+    files_skipped: int = 0
+
+    bytes_transferred: int = 0
+
+    seconds: float = 0.0
+
+    @property
+    def throughput_mb_per_sec(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+
+        return self.bytes_transferred / (1024 * 1024) / self.seconds
 
 
 class S3Sync:
+    """
+    Syncs folders to and from s3 like "aws s3 sync" does, without spawning the AWS CLI.
+
+    Files are transferred concurrently over one pooled s3 client, and large files are sent as concurrent
+    multipart transfers. A file is skipped when the local file already has the ETag of the s3 object.
+    """
+
+    def __init__(self):
+        self.s3_client = S3Client().client
+
+        self.transfer_config = TransferConfig(
+            multipart_threshold=training_pipeline.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=training_pipeline.S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=training_pipeline.S3_MAX_CONCURRENCY,
+        )
+
+    @staticmethod
+    def get_local_etag(file_path: str, part_size: int, n_parts: int = None) -> str:
+        """
+        Computes the ETag s3 gives an unencrypted object uploaded from file_path. It is the md5 of the file
+        for a single part upload, and the md5 of the concatenated part md5s followed by "-<number of parts>"
+        for a multipart upload of parts of part_size bytes.
+        """
+        file_size: int = os.path.getsize(file_path)
+
+        if n_parts is None:
+            n_parts = (
+                math.ceil(file_size / part_size)
+                if file_size >= training_pipeline.S3_MULTIPART_THRESHOLD
+                else 1
+            )
+
+        with open(file_path, "rb") as f:
+            if n_parts == 1:
+                return S3Sync.get_md5(f, file_size).hexdigest()
+
+            part_md5s: List[bytes] = []
+
+            while f.tell() < file_size:
+                part_md5s.append(S3Sync.get_md5(f, part_size).digest())
+
+        return f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+
+    @staticmethod
+    def get_md5(f, n_bytes: int):
+        """
+        md5 of the next n_bytes of the binary file f, read in chunks of S3_HASH_CHUNK_SIZE bytes so the file is
+        never held in memory whole.
+        """
+        md5 = hashlib.md5()
+
+        while n_bytes > 0:
+            chunk: bytes = f.read(min(n_bytes, training_pipeline.S3_HASH_CHUNK_SIZE))
+
+            if not chunk:
+                break
+
+            md5.update(chunk)
+
+            n_bytes -= len(chunk)
+
+        return md5
+
+    def is_unchanged(self, file_path: str, etag: str, size: int) -> bool:
+        """
+        Checks whether the local file at file_path has the content of the s3 object with the given ETag
+        and size. The part size of a multipart ETag written by another client is taken as the smallest whole
+        number of MiB giving the same number of parts.
+        """
+        if not os.path.isfile(file_path) or os.path.getsize(file_path) != size:
+            return False
+
+        etag = etag.strip('"')
+
+        if "-" not in etag:
+            return self.get_local_etag(file_path, size or 1, n_parts=1) == etag
+
+        n_parts: int = int(etag.split("-")[1])
+
+        part_size: int = training_pipeline.S3_MULTIPART_CHUNKSIZE
+
+        if math.ceil(size / part_size) != n_parts:
+            part_size = math.ceil(size / n_parts / (1024 * 1024)) * 1024 * 1024
+
+        return self.get_local_etag(file_path, part_size, n_parts=n_parts) == etag
+
+    def list_objects(self, bucket_name: str, prefix: str) -> Dict[str, Dict]:
+        """
+        Lists the objects under prefix, as a mapping of key to the ETag, Size and LastModified of the object.
+        """
+        objects: Dict[str, Dict] = {}
+
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if not obj["Key"].endswith("/"):
+                    objects[obj["Key"]] = obj
+
+        return objects
+
+    def iter_transfers(
+        self, transfers: List[Tuple], transfer_fn, metrics: S3SyncMetrics
+    ) -> Iterator[Tuple[Tuple, int]]:
+        """
+        Runs transfer_fn over the transfers on a thread pool and yields every transfer with the number of bytes
+        it moved, None when it was skipped, as soon as it completes. metrics is updated as transfers complete.
+        """
+        start: float = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=training_pipeline.S3_MAX_WORKERS) as pool:
+            futures: Dict[Future, Tuple] = {
+                pool.submit(transfer_fn, *transfer): transfer for transfer in transfers
+            }
+
+            for future in as_completed(futures):
+                n_bytes: int = future.result()
+
+                if n_bytes is None:
+                    metrics.files_skipped += 1
+
+                else:
+                    metrics.files_transferred += 1
+
+                    metrics.bytes_transferred += n_bytes
+
+                metrics.seconds = time.perf_counter() - start
+
+                yield futures[future], n_bytes
+
+        metrics.seconds = time.perf_counter() - start
+
+    def run_transfers(self, transfers: List[Tuple], transfer_fn) -> S3SyncMetrics:
+        metrics: S3SyncMetrics = S3SyncMetrics()
+
+        for _ in self.iter_transfers(transfers, transfer_fn, metrics):
+            pass
+
+        return metrics
+
+    def upload_file(
+        self, file_path: str, bucket_name: str, key: str, remote: Dict
+    ) -> int:
+        if remote is not None and self.is_unchanged(
+            file_path, remote["ETag"], remote["Size"]
+        ):
+            return None
+
+        self.s3_client.upload_file(
+            file_path, bucket_name, key, Config=self.transfer_config
+        )
+
+        return os.path.getsize(file_path)
+
+    def download_file(
+        self, file_path: str, bucket_name: str, key: str, remote: Dict
+    ) -> int:
+        if self.is_unchanged(file_path, remote["ETag"], remote["Size"]):
+            return None
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        self.s3_client.download_file(
+            bucket_name, key, file_path, Config=self.transfer_config
+        )
+
+        return remote["Size"]
+
     def sync_folder_to_s3(
         self, folder: str, bucket_name: str, bucket_folder_name: str
-    ) -> None:
+    ) -> S3SyncMetrics:
+        logging.info("Entered sync_folder_to_s3 method of S3Sync class")
+
         try:
-            command: str = (
-                f"aws s3 sync {folder} s3://{bucket_name}/{bucket_folder_name}/ "
+            prefix: str = bucket_folder_name.strip("/") + "/"
+
+            remote_objects: Dict[str, Dict] = self.list_objects(
+                bucket_name, prefix
             )
 
-            os.system(command)
+            transfers: List[Tuple] = []
+
+            for root, _, files in os.walk(folder):
+                for f in files:
+                    file_path: str = os.path.join(root, f)
+
+                    key: str = prefix + os.path.relpath(file_path, folder).replace(
+                        os.sep, "/"
+                    )
+
+                    transfers.append(
+                        (file_path, bucket_name, key, remote_objects.get(key))
+                    )
+
+            metrics: S3SyncMetrics = self.run_transfers(transfers, self.upload_file)
+
+            logging.info(
+                f"Synced {folder} to s3://{bucket_name}/{prefix} : {metrics.files_transferred} files uploaded, "
+                f"{metrics.files_skipped} unchanged, {metrics.bytes_transferred} bytes in {metrics.seconds:.2f}s "
+                f"({metrics.throughput_mb_per_sec:.2f} MB/s)"
+            )
+
+            logging.info("Exited sync_folder_to_s3 method of S3Sync class")
+
+            return metrics
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @staticmethod
+    def get_local_file_path(folder: str, prefix: str, key: str) -> str:
+        return os.path.join(folder, *key[len(prefix) :].split("/"))
+
+    def iter_download_objects(
+        self,
+        folder: str,
+        bucket_name: str,
+        prefix: str,
+        objects: Dict[str, Dict],
+        metrics: S3SyncMetrics,
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Downloads the listed objects under prefix into folder, skipping the ones already present unchanged, and
+        yields the key and the local file path of every object as soon as its file is in place.
+        """
+        os.makedirs(folder, exist_ok=True)
+
+        transfers: List[Tuple] = [
+            (self.get_local_file_path(folder, prefix, key), bucket_name, key, remote)
+            for key, remote in objects.items()
+        ]
+
+        for (file_path, _, key, _), _ in self.iter_transfers(
+            transfers, self.download_file, metrics
+        ):
+            yield key, file_path
+
+        logging.info(
+            f"Synced s3://{bucket_name}/{prefix} to {folder} : {metrics.files_transferred} files downloaded, "
+            f"{metrics.files_skipped} unchanged, {metrics.bytes_transferred} bytes in {metrics.seconds:.2f}s "
+            f"({metrics.throughput_mb_per_sec:.2f} MB/s)"
+        )
+
+    def download_objects(
+        self, folder: str, bucket_name: str, prefix: str, objects: Dict[str, Dict]
+    ) -> S3SyncMetrics:
+        """
+        Downloads the listed objects under prefix into folder, skipping the ones already present unchanged.
+        """
+        logging.info("Entered download_objects method of S3Sync class")
+
+        try:
+            metrics: S3SyncMetrics = S3SyncMetrics()
+
+            for _ in self.iter_download_objects(
+                folder, bucket_name, prefix, objects, metrics
+            ):
+                pass
+
+            logging.info("Exited download_objects method of S3Sync class")
+
+            return metrics
 
         except Exception as e:
             raise PhisingException(e, sys)
 
     def sync_folder_from_s3(
         self, folder: str, bucket_name: str, bucket_folder_name: str
-    ) -> None:
+    ) -> S3SyncMetrics:
+        logging.info("Entered sync_folder_from_s3 method of S3Sync class")
+
         try:
-            command: str = (
-                f"aws s3 sync s3://{bucket_name}/{bucket_folder_name}/ {folder} "
+            prefix: str = bucket_folder_name.strip("/") + "/"
+
+            metrics: S3SyncMetrics = self.download_objects(
+                folder, bucket_name, prefix, self.list_objects(bucket_name, prefix)
             )
 
-            os.system(command)
+            logging.info("Exited sync_folder_from_s3 method of S3Sync class")
+
+            return metrics
 
         except Exception as e:
             raise PhisingException(e, sys)
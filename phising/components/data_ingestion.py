@@ -1,10 +1,16 @@
+import hashlib
+import os
 import sys
+from datetime import datetime
+from typing import Dict, Iterator, Union
 
-from phising.cloud_storage.aws_operations import S3Sync
+from phising.cloud_storage.aws_operations import S3Sync, S3SyncMetrics
 from phising.entity.artifact_entity import DataIngestionArtifact
 from phising.entity.config_entity import DataIngestionConfig
 from phising.exception import PhisingException
 from phising.logger import logging
+from phising.utils.instrumentation import instrument_iterator, instrumented
+from phising.utils.main_utils import link_file, read_json, write_json
 
 
 class DataIngestion:
@@ -13,29 +19,226 @@ class DataIngestion:
 
         self.data_ingestion_config = data_ingestion_config
 
-    def export_data_into_feature_store(
-        self, bucket_name: str, bucket_folder_name: str, feature_store_folder_name: str
+        # downloads of the last iter_feature_store_files call
+        self.download_metrics: S3SyncMetrics = S3SyncMetrics()
+
+    def get_watermark(self, bucket_name: str, bucket_folder_name: str) -> Dict:
+        """
+        Reads the watermark of the feature store cache, which holds the LastModified time of the newest object
+        downloaded by the last successful ingestion, and the keys having that time. A watermark written for
+        another bucket or folder is ignored.
+        """
+        try:
+            watermark_file_path: str = (
+                self.data_ingestion_config.data_ingestion_watermark_file_path
+            )
+
+            if not os.path.exists(watermark_file_path):
+                return {}
+
+            watermark: Dict = read_json(watermark_file_path)
+
+            if (
+                watermark.get("bucket_name") != bucket_name
+                or watermark.get("bucket_folder_name") != bucket_folder_name
+            ):
+                return {}
+
+            return watermark
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def get_new_objects(
+        self, objects: Dict[str, Dict], watermark: Dict, prefix: str
+    ) -> Dict[str, Dict]:
+        """
+        Selects the objects modified after the watermark, and the ones missing from the feature store cache.
+        """
+        try:
+            last_modified: datetime = (
+                datetime.fromisoformat(watermark["last_modified"])
+                if watermark
+                else None
+            )
+
+            watermark_keys: set = set(watermark.get("keys", []))
+
+            return {
+                key: obj
+                for key, obj in objects.items()
+                if last_modified is None
+                or obj["LastModified"] > last_modified
+                or (obj["LastModified"] == last_modified and key not in watermark_keys)
+                or not os.path.exists(
+                    self.s3.get_local_file_path(
+                        self.data_ingestion_config.data_ingestion_cache_dir,
+                        prefix,
+                        key,
+                    )
+                )
+            }
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def update_watermark(
+        self, objects: Dict[str, Dict], bucket_name: str, bucket_folder_name: str
     ) -> None:
+        try:
+            if not objects:
+                return
 
-        logging.info(
-            "Entered export_data_into_feature_store method of DataIngestion class"
-        )
+            last_modified: datetime = max(
+                obj["LastModified"] for obj in objects.values()
+            )
+
+            write_json(
+                self.data_ingestion_config.data_ingestion_watermark_file_path,
+                {
+                    "bucket_name": bucket_name,
+                    "bucket_folder_name": bucket_folder_name,
+                    "last_modified": last_modified.isoformat(),
+                    "keys": sorted(
+                        key
+                        for key, obj in objects.items()
+                        if obj["LastModified"] == last_modified
+                    ),
+                },
+            )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def get_source_fingerprint(self) -> str:
+        """
+        Gets the sha256 of the keys and ETags of the batch files in the bucket folder, which changes whenever a
+        batch file is added, removed or rewritten.
+        """
+        try:
+            prefix: str = (
+                self.data_ingestion_config.data_ingestion_bucket_folder_name.strip("/")
+                + "/"
+            )
+
+            objects: Dict[str, Dict] = self.s3.list_objects(
+                self.data_ingestion_config.data_ingestion_bucket_name, prefix
+            )
+
+            fingerprint = hashlib.sha256()
+
+            for key in sorted(objects):
+                fingerprint.update(f"{key}:{objects[key]['ETag']}\n".encode())
+
+            return fingerprint.hexdigest()
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def link_into_feature_store(
+        self,
+        cache_file_path: str,
+        feature_store_folder_name: str,
+        prefix: str,
+        key: str,
+    ) -> str:
+        try:
+            dest_dir: str = os.path.dirname(
+                self.s3.get_local_file_path(feature_store_folder_name, prefix, key)
+            )
+
+            os.makedirs(dest_dir, exist_ok=True)
+
+            link_file(
+                cache_file_path,
+                dest_dir,
+                mode=self.data_ingestion_config.data_ingestion_routing_mode,
+            )
+
+            return os.path.join(dest_dir, os.path.basename(cache_file_path))
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def iter_feature_store_files(
+        self, bucket_name: str, bucket_folder_name: str, feature_store_folder_name: str
+    ) -> Iterator[str]:
+        """
+        Downloads the batch files added or changed since the last successful ingestion into the persistent
+        feature store cache, links every batch file of the bucket folder from the cache into the feature store
+        folder of this run, and yields the path of each linked file. Files already in the cache are yielded
+        first, the new ones as soon as their download completes. The watermark is moved only after every file
+        has been downloaded. The downloads are counted in download_metrics.
+        """
+        logging.info("Entered iter_feature_store_files method of DataIngestion class")
 
         try:
             logging.info(
                 f"Syncing {bucket_folder_name} folder from {bucket_name} to {feature_store_folder_name}"
             )
 
-            self.s3.sync_folder_from_s3(
-                folder=feature_store_folder_name,
-                bucket_name=bucket_name,
-                bucket_folder_name=bucket_folder_name,
+            cache_dir: str = self.data_ingestion_config.data_ingestion_cache_dir
+
+            prefix: str = bucket_folder_name.strip("/") + "/"
+
+            objects: Dict[str, Dict] = self.s3.list_objects(bucket_name, prefix)
+
+            os.makedirs(feature_store_folder_name, exist_ok=True)
+
+            new_objects: Dict[str, Dict] = self.get_new_objects(
+                objects,
+                self.get_watermark(bucket_name, bucket_folder_name),
+                prefix,
             )
 
+            logging.info(
+                f"{len(new_objects)} of {len(objects)} batch files are new since the last ingestion"
+            )
+
+            for key in objects:
+                if key not in new_objects:
+                    yield self.link_into_feature_store(
+                        self.s3.get_local_file_path(cache_dir, prefix, key),
+                        feature_store_folder_name,
+                        prefix,
+                        key,
+                    )
+
+            self.download_metrics = S3SyncMetrics()
+
+            for key, cache_file_path in self.s3.iter_download_objects(
+                cache_dir, bucket_name, prefix, new_objects, self.download_metrics
+            ):
+                yield self.link_into_feature_store(
+                    cache_file_path, feature_store_folder_name, prefix, key
+                )
+
+            self.update_watermark(objects, bucket_name, bucket_folder_name)
+
             logging.info(
                 f"Synced {bucket_folder_name} folder from {bucket_name} to {feature_store_folder_name}"
             )
 
+            logging.info("Exited iter_feature_store_files method of DataIngestion class")
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def export_data_into_feature_store(
+        self, bucket_name: str, bucket_folder_name: str, feature_store_folder_name: str
+    ) -> None:
+        logging.info(
+            "Entered export_data_into_feature_store method of DataIngestion class"
+        )
+
+        try:
+            for _ in self.iter_feature_store_files(
+                bucket_name=bucket_name,
+                bucket_folder_name=bucket_folder_name,
+                feature_store_folder_name=feature_store_folder_name,
+            ):
+                pass
+
             logging.info(
                 "Exited export_data_into_feature_store method of DataIngestion class"
             )
@@ -43,18 +246,40 @@ class DataIngestion:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def initiate_data_ingestion(self) -> DataIngestionArtifact:
         logging.info("Entered initiate_data_ingestion method of DataIngestion class")
 
         try:
-            self.export_data_into_feature_store(
-                bucket_name=self.data_ingestion_config.data_ingestion_bucket_name,
-                bucket_folder_name=self.data_ingestion_config.data_ingestion_bucket_folder_name,
-                feature_store_folder_name=self.data_ingestion_config.data_ingestion_feature_store_folder_name,
-            )
+            batch_files: Union[Iterator[str], None] = None
+
+            if self.data_ingestion_config.data_ingestion_streaming_mode:
+                # the files are listed and downloaded while data validation runs, so they are measured as a stage
+                # of their own instead of in the time and i/o of initiate_data_ingestion
+                batch_files = instrument_iterator(
+                    "DataIngestion.iter_feature_store_files",
+                    self.iter_feature_store_files(
+                        bucket_name=self.data_ingestion_config.data_ingestion_bucket_name,
+                        bucket_folder_name=self.data_ingestion_config.data_ingestion_bucket_folder_name,
+                        feature_store_folder_name=self.data_ingestion_config.data_ingestion_feature_store_folder_name,
+                    ),
+                    get_bytes_read=lambda: self.download_metrics.bytes_transferred,
+                )
+
+                logging.info(
+                    "Streaming mode is on, batch files are downloaded as data validation consumes them"
+                )
+
+            else:
+                self.export_data_into_feature_store(
+                    bucket_name=self.data_ingestion_config.data_ingestion_bucket_name,
+                    bucket_folder_name=self.data_ingestion_config.data_ingestion_bucket_folder_name,
+                    feature_store_folder_name=self.data_ingestion_config.data_ingestion_feature_store_folder_name,
+                )
 
             data_ingestion_artifact: DataIngestionArtifact = DataIngestionArtifact(
-                feature_store_folder_path=self.data_ingestion_config.data_ingestion_feature_store_folder_name
+                feature_store_folder_path=self.data_ingestion_config.data_ingestion_feature_store_folder_name,
+                batch_files=batch_files,
             )
 
             logging.info(f"Data Ingestion artifact is : {data_ingestion_artifact}")
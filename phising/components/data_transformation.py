@@ -3,10 +3,11 @@ import sys
 
 import numpy as np
 import pandas as pd
-from sklearn.impute import KNNImputer
+from sklearn.impute import KNNImputer, SimpleImputer
 from sklearn.pipeline import Pipeline
 
 from phising.constant import training_pipeline
+from phising.data_access.phising_data import PhisingData
 from phising.entity.artifact_entity import (
     DataTransformationArtifact,
     DataValidationArtifact,
@@ -14,7 +15,9 @@ from phising.entity.artifact_entity import (
 from phising.entity.config_entity import DataTransformationConfig
 from phising.exception import PhisingException
 from phising.logger import logging
-from phising.utils.main_utils import save_numpy_array_data, save_object
+from phising.ml.model.imputer import NearestPatternImputer
+from phising.utils.instrumentation import Instrumentation, instrumented
+from phising.utils.main_utils import save_compact_array_data, save_object
 
 
 class DataTransformation:
@@ -38,23 +41,55 @@ class DataTransformation:
     @staticmethod
     def read_data(file_path: str) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return PhisingData().read_artifact(file_path)
 
         except Exception as e:
             raise PhisingException(e, sys)
 
-    def get_data_transformer_object(cls) -> Pipeline:
+    def get_data_transformer_object(self) -> Pipeline:
+        """
+        Builds the preprocessing pipeline with the imputer selected by the imputer strategy of the data transformation config.
+
+        knn is sklearn's KNNImputer, which compares every incomplete row with every training row. nearest_pattern
+        does the same nearest neighbour imputation against the distinct ternary feature patterns only, by a dense
+        distance product computed in chunks bounded by working_memory, and mode fills the most frequent value of
+        the column.
+        """
         logging.info(
             "Entered get_data_transformer_object method of DataTransformation class"
         )
 
         try:
-            imputer: KNNImputer = KNNImputer(
-                **training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS
-            )
+            imputer_strategy: str = self.data_transformation_config.imputer_strategy
+
+            if imputer_strategy == "knn":
+                imputer_params: dict = (
+                    training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS
+                )
+
+                imputer: KNNImputer = KNNImputer(**imputer_params)
+
+            elif imputer_strategy == "nearest_pattern":
+                imputer_params: dict = (
+                    training_pipeline.DATA_TRANSFORMATION_NEAREST_PATTERN_IMPUTER_PARAMS
+                )
+
+                imputer: NearestPatternImputer = NearestPatternImputer(
+                    **imputer_params
+                )
+
+            elif imputer_strategy == "mode":
+                imputer_params: dict = (
+                    training_pipeline.DATA_TRANSFORMATION_MODE_IMPUTER_PARAMS
+                )
+
+                imputer: SimpleImputer = SimpleImputer(**imputer_params)
+
+            else:
+                raise Exception(f"Unknown imputer strategy {imputer_strategy}")
 
             logging.info(
-                f"Initialised KNNImputer with {training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS}"
+                f"Initialised {imputer.__class__.__name__} with {imputer_params}"
             )
 
             preprocessor: Pipeline = Pipeline([("imputer", imputer)])
@@ -68,6 +103,7 @@ class DataTransformation:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         logging.info(
             "Entered initiate_data_transformation method of DataTransformation class"
@@ -147,22 +183,28 @@ class DataTransformation:
                 preprocessor,
             )
 
-            save_numpy_array_data(
+            save_compact_array_data(
                 self.data_transformation_config.transformed_train_file_path,
                 array=train_arr,
             )
 
-            save_numpy_array_data(
+            save_compact_array_data(
                 self.data_transformation_config.transformed_test_file_path,
                 array=test_arr,
             )
 
             logging.info("Saved the preprocessor object")
 
+            Instrumentation.record_rows(
+                rows_in=len(train_df) + len(test_df),
+                rows_out=len(train_arr) + len(test_arr),
+            )
+
             data_transformation_artifact: DataTransformationArtifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
                 transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+                train_file_index_path=self.data_validation_artifact.train_file_index_path,
             )
 
             logging.info(
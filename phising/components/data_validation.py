@@ -1,18 +1,28 @@
+import hashlib
 import os
 import re
-import shutil
 import sys
-from typing import Dict, List, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
 
-from phising.data_access.phising_data import PhisingData
+from phising.data_access.phising_data import ArtifactWriter
 from phising.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from phising.entity.config_entity import DataValidationConfig
 from phising.exception import PhisingException
-from phising.logger import logging
-from phising.utils.main_utils import read_text, read_yaml
+from phising.logger import LOG_FILE_PATH, configure_logging, logging
+from phising.utils.instrumentation import Instrumentation, instrumented
+from phising.utils.main_utils import (
+    link_file,
+    read_json,
+    read_text,
+    read_yaml,
+    write_json,
+)
 
 
 class DataValidation:
@@ -25,9 +35,9 @@ class DataValidation:
 
         self.data_validation_config = data_validation_config
 
-        self.phising_data = PhisingData()
+        self.manifest: Dict[str, Dict[str, str]] = {}
 
-    def values_from_schema(self) -> Tuple[int, int, str, int]:
+    def values_from_schema(self) -> Tuple[int, int, Dict[str, str], int]:
         """
         Method Name :   values_from_schema
         Description :   This method gets schema values from the schema_training.json file
@@ -53,7 +63,7 @@ class DataValidation:
 
             LengthOfTimeStampInFile: int = dic["LengthOfTimeStampInFile"]
 
-            column_names: str = dic["ColName"]
+            column_names: Dict[str, str] = dic["ColName"]
 
             NumberofColumns: int = dic["NumberofColumns"]
 
@@ -79,199 +89,502 @@ class DataValidation:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @staticmethod
     def validate_raw_fname(
-        self, LengthOfDateStampInFile: int, LengthOfTimeStampInFile: int
-    ) -> None:
+        fname: str,
+        regex: str,
+        LengthOfDateStampInFile: int,
+        LengthOfTimeStampInFile: int,
+    ) -> bool:
         """
         Method Name :   validate_raw_fname
         Description :   This method validates the raw file name based on regex pattern and schema values
 
-        Output      :   Raw file names are validated, good file names are stored in good data folder and rest is stored in bad data
+        Output      :   True if the file name matches the regex pattern and the date and time stamp lengths, else False
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   file name check no longer copies the file, routing is done by validate_batch_files
         """
-        logging.info("Entered validate_raw_fname method of DataValidation class")
-
         try:
-            onlyfiles: List[str] = os.listdir(
-                self.data_ingestion_artifact.feature_store_folder_path
-            )
+            if not re.match(regex, fname):
+                return False
 
-            logging.info(
-                f"Got a list of files from {self.data_ingestion_artifact.feature_store_folder_path}"
-            )
+            splitAtDot = re.split(".csv", fname)
 
-            regex: str = read_text(
-                self.data_validation_config.data_validation_regex_path
-            )
+            splitAtDot = re.split("_", splitAtDot[0])
 
-            logging.info(
-                f"Got regex pattern {regex} from {self.data_validation_config.data_validation_regex_path}"
+            return (
+                len(splitAtDot) > 2
+                and len(splitAtDot[1]) == LengthOfDateStampInFile
+                and len(splitAtDot[2]) == LengthOfTimeStampInFile
             )
 
-            for fname in onlyfiles:
-                data_ingestion_fname: str = (
-                    self.data_ingestion_artifact.feature_store_folder_path + "/" + fname
-                )
+        except Exception as e:
+            raise PhisingException(e, sys)
 
-                os.makedirs(
-                    self.data_validation_config.data_validation_valid_data_dir,
-                    exist_ok=True,
-                )
+    @staticmethod
+    def validate_col_length(df: pd.DataFrame, NumberofColumns: int) -> bool:
+        """
+        Method Name :   validate_col_length
+        Description :   This method validates the column length based on number of columns as mentioned in schema values
 
-                os.makedirs(
-                    self.data_validation_config.data_validation_invalid_data_dir,
-                    exist_ok=True,
-                )
+        Output      :   True if the dataframe has the number of columns mentioned in schema values, else False
+        On Failure  :   Write an exception log and then raise an exception
 
-                if re.match(regex, fname):
-                    splitAtDot = re.split(".csv", fname)
+        Version     :   1.3
+        Revisions   :   works on an already parsed dataframe instead of re-reading the valid data folder
+        """
+        try:
+            return df.shape[1] == NumberofColumns
 
-                    splitAtDot = re.split("_", splitAtDot[0])
+        except Exception as e:
+            raise PhisingException(e, sys)
 
-                    if len(splitAtDot[1]) == LengthOfDateStampInFile:
-                        if len(splitAtDot[2]) == LengthOfTimeStampInFile:
-                            shutil.copy(
-                                data_ingestion_fname,
-                                self.data_validation_config.data_validation_valid_data_dir,
-                            )
+    @staticmethod
+    def validate_missing_values_in_col(df: pd.DataFrame) -> bool:
+        """
+        Method Name :   validate_missing_values_in_col
+        Description :   This method validates the missing values in columns
 
-                            logging.info(
-                                f"Copied {data_ingestion_fname} file to {self.data_validation_config.data_validation_valid_data_dir} folder"
-                            )
+        Output      :   True if no column of the dataframe is entirely missing, else False
+        On Failure  :   Write an exception log and then raise an exception
 
-                        else:
-                            shutil.copy(
-                                data_ingestion_fname,
-                                self.data_validation_config.data_validation_invalid_data_dir,
-                            )
+        Version     :   1.3
+        Revisions   :   works on an already parsed dataframe instead of re-reading the valid data folder
+        """
+        try:
+            return not df.isnull().all(axis=0).any()
 
-                            logging.info(
-                                f"Copied {data_ingestion_fname} file to {self.data_validation_config.data_validation_invalid_data_dir} folder"
-                            )
+        except Exception as e:
+            raise PhisingException(e, sys)
 
-                    else:
-                        shutil.copy(
-                            data_ingestion_fname,
-                            self.data_validation_config.data_validation_invalid_data_dir,
-                        )
+    @staticmethod
+    def validate_batch_file(
+        file_path: str,
+        regex: str,
+        LengthOfDateStampInFile: int,
+        LengthOfTimeStampInFile: int,
+        NumberofColumns: int,
+    ) -> Tuple[bool, Union[pd.DataFrame, None]]:
+        """
+        Method Name :   validate_batch_file
+        Description :   This method runs the file name, column length and missing values checks on a single batch file,
+                        the file is parsed at most once
 
-                        logging.info(
-                            f"Copied {data_ingestion_fname} file to {self.data_validation_config.data_validation_invalid_data_dir}"
-                        )
+        Output      :   Tuple of validation status and the parsed dataframe, dataframe is None when the file name is invalid
+        On Failure  :   Write an exception log and then raise an exception
 
-                else:
-                    shutil.copy(
-                        data_ingestion_fname,
-                        self.data_validation_config.data_validation_invalid_data_dir,
-                    )
+        Version     :   1.3
+        Revisions   :   single pass validation
+        """
+        try:
+            fname: str = os.path.basename(file_path)
 
-                    logging.info(
-                        f"Copied {data_ingestion_fname} file to {self.data_validation_config.data_validation_invalid_data_dir}"
-                    )
+            if not DataValidation.validate_raw_fname(
+                fname=fname,
+                regex=regex,
+                LengthOfDateStampInFile=LengthOfDateStampInFile,
+                LengthOfTimeStampInFile=LengthOfTimeStampInFile,
+            ):
+                return False, None
+
+            df: pd.DataFrame = pd.read_csv(file_path)
 
-            logging.info("Exited validate_raw_fname method of DataValidation class")
+            status: bool = DataValidation.validate_col_length(
+                df=df, NumberofColumns=NumberofColumns
+            ) and DataValidation.validate_missing_values_in_col(df=df)
+
+            return status, df
 
         except Exception as e:
             raise PhisingException(e, sys)
 
-    def validate_col_length(self, NumberofColumns: int) -> None:
+    def get_schema_version(self) -> str:
         """
-        Method Name :   validate_col_length
-        Description :   This method validates the column length based on number of columns as mentioned in schema values
+        Method Name :   get_schema_version
+        Description :   This method computes the version of the validation rules as a hash of the training schema file and the regex file
 
-        Output      :   The files' columns length are validated and good data is stored in good data folder and rest is stored in bad data folder
+        Output      :   Hex digest identifying the validation rules
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   verdict caching across pipeline runs
         """
-        logging.info("Entered validate_col_length method of DataValidation class")
+        try:
+            digest = hashlib.sha256()
+
+            for file_name in (
+                self.data_validation_config.data_validation_training_schema_path,
+                self.data_validation_config.data_validation_regex_path,
+            ):
+                with open(file_name, "rb") as f:
+                    digest.update(f.read())
 
+            return digest.hexdigest()[:16]
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @staticmethod
+    def get_file_hash(file_path: str) -> str:
         try:
-            lst: Tuple[pd.DataFrame, str, str] = self.phising_data.read_csv_from_folder(
-                folder_name=self.data_validation_config.data_validation_valid_data_dir
-            )
+            digest = hashlib.sha256()
 
-            logging.info(
-                f"Got a list of tuple of dataframe,filename and absolute filename from {self.data_validation_config.data_validation_valid_data_dir} folder"
-            )
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
 
-            for _, f in enumerate(lst):
-                df: pd.DataFrame = f[0]
+            return digest.hexdigest()
 
-                file: str = f[1]
+        except Exception as e:
+            raise PhisingException(e, sys)
 
-                if df.shape[1] == NumberofColumns:
-                    pass
+    def load_verdict_cache(self) -> Dict[str, Dict]:
+        try:
+            cache_file_path: str = self.data_validation_config.data_validation_cache_file_path
 
-                else:
-                    shutil.move(
-                        file,
-                        self.data_validation_config.data_validation_invalid_data_dir,
-                    )
+            if not os.path.exists(cache_file_path):
+                logging.info(f"No verdict cache found at {cache_file_path}")
 
-                    logging.info(
-                        f"Moved {file} file to {self.data_validation_config.data_validation_invalid_data_dir} folder"
-                    )
+                return {}
 
-            logging.info("Exited validate_col_length method of DataValidation class")
+            return read_json(cache_file_path)
 
         except Exception as e:
             raise PhisingException(e, sys)
 
-    def validate_missing_values_in_col(self) -> None:
+    def get_cached_verdict(
+        self, file_path: str, verdict_cache: Dict[str, Dict], schema_version: str
+    ) -> Union[bool, None]:
         """
-        Method Name :   validate_missing_values_in_col
-        Description :   This method validates the missing values in columns
+        Method Name :   get_cached_verdict
+        Description :   This method looks up the verdict of a previous run for the file. Size and modification time are compared first,
+                        the content hash is computed only when they differ. The cache entry is refreshed with the current fingerprint
 
-        Output      :   Missing columns are validated, and good data is stored in good data folder and rest is to stored in bad data folder
+        Output      :   Cached validation status, or None when the file has to be validated
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   verdict caching across pipeline runs
+        """
+        try:
+            fname: str = os.path.basename(file_path)
+
+            stat: os.stat_result = os.stat(file_path)
+
+            entry: Union[Dict, None] = verdict_cache.get(fname)
+
+            if entry is not None and entry["schema_version"] == schema_version:
+                if (
+                    entry["size"] == stat.st_size
+                    and entry["mtime_ns"] == stat.st_mtime_ns
+                ):
+                    return entry["status"]
+
+                if entry["size"] == stat.st_size:
+                    file_hash: str = self.get_file_hash(file_path)
+
+                    if entry["sha256"] == file_hash:
+                        entry["mtime_ns"] = stat.st_mtime_ns
+
+                        return entry["status"]
+
+            return None
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def update_verdict_cache(
+        self,
+        file_path: str,
+        status: bool,
+        verdict_cache: Dict[str, Dict],
+        schema_version: str,
+    ) -> None:
+        try:
+            stat: os.stat_result = os.stat(file_path)
+
+            verdict_cache[os.path.basename(file_path)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": self.get_file_hash(file_path),
+                "status": status,
+                "schema_version": schema_version,
+            }
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def lookup_cached_verdicts(
+        self,
+        file_paths: Iterable[str],
+        verdict_cache: Dict[str, Dict],
+        schema_version: str,
+        cached_verdicts: Dict[str, bool],
+    ) -> Iterator[str]:
+        """
+        Method Name :   lookup_cached_verdicts
+        Description :   This method looks up the cached verdict of every file as it is consumed, and records the verdicts found
+                        in cached_verdicts before the file is yielded. file_paths may still be growing, as in streaming ingestion
+
+        Output      :   Yields every file path of file_paths
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.3
+        Revisions   :   streaming ingestion
+        """
+        try:
+            for file_path in file_paths:
+                status: Union[bool, None] = self.get_cached_verdict(
+                    file_path=file_path,
+                    verdict_cache=verdict_cache,
+                    schema_version=schema_version,
+                )
+
+                if status is not None:
+                    cached_verdicts[file_path] = status
+
+                yield file_path
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def iter_batch_file_verdicts(
+        self,
+        file_paths: Iterable[str],
+        validate_fn: Callable[[str], Tuple[bool, Union[pd.DataFrame, None]]],
+        cached_verdicts: Dict[str, bool],
+    ) -> Iterator[Tuple[str, bool, Union[pd.DataFrame, None]]]:
+        """
+        Method Name :   iter_batch_file_verdicts
+        Description :   This method runs validate_fn on every file, serially or over a process pool based on the number of workers
+                        in data validation config. Files are submitted as they are consumed and a bounded number of files is in flight.
+                        Files with a cached verdict are not validated again and are yielded without a dataframe.
+                        file_paths is consumed lazily, so files can be validated while later ones are still downloading
+
+        Output      :   Yields file path, validation status and parsed dataframe in the same order as file_paths
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.3
+        Revisions   :   parallel validation, verdict caching across pipeline runs
+        """
+        try:
+            n_workers: int = self.data_validation_config.data_validation_n_workers
+
+            if n_workers <= 1:
+                for file_path in file_paths:
+                    if file_path in cached_verdicts:
+                        yield file_path, cached_verdicts[file_path], None
+
+                    else:
+                        yield (file_path, *validate_fn(file_path))
+
+                return
+
+            logging.info(f"Validating files with {n_workers} worker processes")
+
+            with ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=configure_logging,
+                initargs=(LOG_FILE_PATH,),
+            ) as executor:
+                pending: Deque = deque()
+
+                for file_path in file_paths:
+                    if file_path in cached_verdicts:
+                        future: Future = Future()
+
+                        future.set_result((cached_verdicts[file_path], None))
+
+                    else:
+                        future: Future = executor.submit(validate_fn, file_path)
+
+                    pending.append((file_path, future))
+
+                    if len(pending) >= 2 * n_workers:
+                        file_path, future = pending.popleft()
+
+                        yield (file_path, *future.result())
+
+                while pending:
+                    file_path, future = pending.popleft()
+
+                    yield (file_path, *future.result())
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def route_batch_file(
+        self, file_path: str, status: bool, cached: bool = False
+    ) -> None:
         """
-        logging.info(
-            "Entered validate_missing_values_in_col method of DataValidation class"
-        )
+        Method Name :   route_batch_file
+        Description :   This method places the file in good data folder or bad data folder as a hard link, reflink or symlink
+                        of the feature store file based on the routing mode, copying only when no link can be made,
+                        and records the verdict in the manifest
+
+        Output      :   File is placed in good data folder or bad data folder and the verdict is recorded
+        On Failure  :   Write an exception log and then raise an exception
 
+        Version     :   1.3
+        Revisions   :   link based routing with verdict manifest
+        """
         try:
-            lst: Tuple[pd.DataFrame, str, str] = self.phising_data.read_csv_from_folder(
-                folder_name=self.data_validation_config.data_validation_valid_data_dir
+            if status is True:
+                dest_dir: str = self.data_validation_config.data_validation_valid_data_dir
+
+            else:
+                dest_dir: str = (
+                    self.data_validation_config.data_validation_invalid_data_dir
+                )
+
+            routed_by: str = link_file(
+                src=file_path,
+                dest_dir=dest_dir,
+                mode=self.data_validation_config.data_validation_routing_mode,
+            )
+
+            self.manifest[os.path.basename(file_path)] = {
+                "source": file_path,
+                "cached": cached,
+                "status": "valid" if status is True else "invalid",
+                "routed_by": routed_by,
+            }
+
+            logging.info(f"Routed {file_path} file to {dest_dir} folder by {routed_by}")
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def validate_batch_files(
+        self,
+        LengthOfDateStampInFile: int,
+        LengthOfTimeStampInFile: int,
+        NumberofColumns: int,
+    ) -> Iterator[Tuple[str, Union[pd.DataFrame, None]]]:
+        """
+        Method Name :   validate_batch_files
+        Description :   This method validates every file of the feature store in a single pass, good files are stored in good data folder
+                        and rest is stored in bad data folder. Files are validated lazily as the merge step consumes them.
+                        When data ingestion streams its batch files, they are validated as they are downloaded
+
+        Output      :   Yields the path and the parsed dataframe of every good file, the dataframe is None when the verdict was cached
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.3
+        Revisions   :   single pass validation, optionally over a process pool, skipping files with a cached verdict, streaming ingestion
+        """
+        logging.info("Entered validate_batch_files method of DataValidation class")
+
+        try:
+            feature_store_folder_path: str = (
+                self.data_ingestion_artifact.feature_store_folder_path
+            )
+
+            if self.data_ingestion_artifact.batch_files is not None:
+                batch_files: Iterable[str] = self.data_ingestion_artifact.batch_files
+
+                logging.info("Validating batch files as data ingestion yields them")
+
+            else:
+                batch_files: Iterable[str] = [
+                    os.path.join(feature_store_folder_path, fname)
+                    for fname in sorted(os.listdir(feature_store_folder_path))
+                ]
+
+                logging.info(f"Got a list of files from {feature_store_folder_path}")
+
+            regex: str = read_text(
+                self.data_validation_config.data_validation_regex_path
             )
 
             logging.info(
-                f"Got a list of tuple of dataframe,filename and absolute filename from {self.data_validation_config.data_validation_valid_data_dir} folder"
+                f"Got regex pattern {regex} from {self.data_validation_config.data_validation_regex_path}"
             )
 
-            for _, f in enumerate(lst):
-                df: pd.DataFrame = f[0]
+            os.makedirs(
+                self.data_validation_config.data_validation_valid_data_dir,
+                exist_ok=True,
+            )
 
-                file: str = f[1]
+            os.makedirs(
+                self.data_validation_config.data_validation_invalid_data_dir,
+                exist_ok=True,
+            )
+
+            n_valid_files: int = 0
+
+            validate_fn = partial(
+                DataValidation.validate_batch_file,
+                regex=regex,
+                LengthOfDateStampInFile=LengthOfDateStampInFile,
+                LengthOfTimeStampInFile=LengthOfTimeStampInFile,
+                NumberofColumns=NumberofColumns,
+            )
 
-                count: int = 0
+            schema_version: str = self.get_schema_version()
 
-                for cols in df:
-                    if (len(df[cols]) - df[cols].count()) == len(df[cols]):
-                        count += 1
+            verdict_cache: Dict[str, Dict] = self.load_verdict_cache()
 
-                        shutil.move(
-                            file,
-                            self.data_validation_config.data_validation_invalid_data_dir,
-                        )
+            cached_verdicts: Dict[str, bool] = {}
 
-                        logging.info(
-                            f"Moved {file} file to {self.data_validation_config.data_validation_invalid_data_dir} folder"
-                        )
+            n_files: int = 0
+
+            for data_ingestion_fname, status, df in self.iter_batch_file_verdicts(
+                file_paths=self.lookup_cached_verdicts(
+                    file_paths=batch_files,
+                    verdict_cache=verdict_cache,
+                    schema_version=schema_version,
+                    cached_verdicts=cached_verdicts,
+                ),
+                validate_fn=validate_fn,
+                cached_verdicts=cached_verdicts,
+            ):
+                n_files += 1
+
+                self.route_batch_file(
+                    file_path=data_ingestion_fname,
+                    status=status,
+                    cached=data_ingestion_fname in cached_verdicts,
+                )
+
+                if data_ingestion_fname not in cached_verdicts:
+                    self.update_verdict_cache(
+                        file_path=data_ingestion_fname,
+                        status=status,
+                        verdict_cache=verdict_cache,
+                        schema_version=schema_version,
+                    )
+
+                # the trainer state records the batch files a model was trained on by their sha256
+                self.manifest[os.path.basename(data_ingestion_fname)][
+                    "sha256"
+                ] = verdict_cache[os.path.basename(data_ingestion_fname)]["sha256"]
 
-                        break
+                if status is True:
+                    n_valid_files += 1
+
+                    yield data_ingestion_fname, df
+
+            write_json(
+                file_name=self.data_validation_config.data_validation_cache_file_path,
+                content=verdict_cache,
+            )
+
+            write_json(
+                file_name=self.data_validation_config.data_validation_manifest_file_path,
+                content=self.manifest,
+            )
 
             logging.info(
-                "Exited validate_missing_values_in_col method of DataValidation class"
+                f"Found cached verdicts for {len(cached_verdicts)} of {n_files} files with schema version {schema_version}"
             )
 
+            logging.info(f"Validated {n_files} files, {n_valid_files} files are valid")
+
+            logging.info("Exited validate_batch_files method of DataValidation class")
+
         except Exception as e:
             raise PhisingException(e, sys)
 
@@ -302,28 +615,113 @@ class DataValidation:
         except Exception as e:
             raise PhisingException(e, sys)
 
-    @staticmethod
     def merge_batch_data(
-        folder_name: str,
-        input_file: str,
-    ) -> List[pd.DataFrame]:
-        logging.info("Entered merge_batch_data method of DataIngestion class")
+        self,
+        valid_batches: Iterator[Tuple[str, Union[pd.DataFrame, None]]],
+        column_types: Dict[str, str],
+    ) -> Tuple[int, int]:
+        """
+        Method Name :   merge_batch_data
+        Description :   This method appends the good files chunk by chunk to the merged file, and every row to the train file
+                        or the test file as decided by split_data_as_train_test. Only one chunk is held in memory at a time.
+                        The files are written in the artifact format of data validation config, typed by column_types.
+                        The sha256 and the number of train rows of every file are written to the train file index, in the
+                        order of the train file, so incremental training can select the rows of the files a model was not trained on
+
+        Output      :   Merged, train and test files and the train file index are written, number of train and test rows are returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.3
+        Revisions   :   streaming merge with hash based train test split, csv, parquet or arrow artifacts, train file index
+        """
+        logging.info("Entered merge_batch_data method of DataValidation class")
 
         try:
-            lst: List[pd.DataFrame] = [
-                pd.read_csv(
-                    folder_name + "/" + f,
-                )
-                for f in os.listdir(folder_name)
-            ]
+            columns: Union[List[str], None] = None
+
+            n_train_rows, n_test_rows = 0, 0
+
+            train_file_index: List[Dict] = []
+
+            os.makedirs(self.data_validation_config.data_validation_dir, exist_ok=True)
+
+            artifact_format: str = (
+                self.data_validation_config.data_validation_artifact_format
+            )
+
+            with ArtifactWriter(
+                self.data_validation_config.merged_file_path,
+                artifact_format=artifact_format,
+                column_types=column_types,
+            ) as merged_writer, ArtifactWriter(
+                self.data_validation_config.training_file_path,
+                artifact_format=artifact_format,
+                column_types=column_types,
+            ) as train_writer, ArtifactWriter(
+                self.data_validation_config.testing_file_path,
+                artifact_format=artifact_format,
+                column_types=column_types,
+            ) as test_writer:
+                for file_path, df in valid_batches:
+                    n_file_train_rows: int = 0
+
+                    if df is None:
+                        chunks: Iterator[pd.DataFrame] = pd.read_csv(
+                            file_path,
+                            chunksize=self.data_validation_config.data_validation_chunk_size,
+                        )
+
+                    else:
+                        chunks: Iterator[pd.DataFrame] = iter([df])
+
+                    for chunk in chunks:
+                        if columns is None:
+                            columns = list(chunk.columns)
+
+                        chunk = chunk.reindex(columns=columns)
+
+                        train_chunk, test_chunk = self.split_data_as_train_test(
+                            dataframe=chunk
+                        )
+
+                        merged_writer.write(chunk)
+
+                        train_writer.write(train_chunk)
+
+                        test_writer.write(test_chunk)
+
+                        n_file_train_rows += len(train_chunk)
 
-            new_df: pd.DataFrame = pd.concat(lst, ignore_index=True)
+                        n_test_rows += len(test_chunk)
 
-            new_df.to_csv(input_file, index=False, header=True)
+                    n_train_rows += n_file_train_rows
 
-            logging.info("Exited merge_batch_data method of DataIngestion class")
+                    train_file_index.append(
+                        {
+                            "file": os.path.basename(file_path),
+                            "sha256": self.manifest[os.path.basename(file_path)][
+                                "sha256"
+                            ],
+                            "n_train_rows": n_file_train_rows,
+                        }
+                    )
+
+            write_json(
+                file_name=self.data_validation_config.train_file_index_path,
+                content=train_file_index,
+            )
+
+            logging.info(
+                f"Merged {n_train_rows + n_test_rows} rows into {self.data_validation_config.merged_file_path}, {n_train_rows} train rows and {n_test_rows} test rows"
+            )
+
+            logging.info(
+                f"Wrote the train file index of {len(train_file_index)} files to {self.data_validation_config.train_file_index_path}"
+            )
+
+            logging.info("Exited merge_batch_data method of DataValidation class")
 
-            return new_df
+            return n_train_rows, n_test_rows
 
         except Exception as e:
             raise PhisingException(e, sys)
@@ -333,33 +731,33 @@ class DataValidation:
     ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
         Method Name :   split_data_as_train_test
-        Description :   This method splits the dataframe into train set and test set based on split ratio
+        Description :   This method splits the dataframe into train set and test set based on split ratio. Every row is assigned
+                        by a seeded hash of its values, so the split does not depend on chunking or file order and equal rows
+                        always land in the same set
 
-        Output      :   Folder is created in s3 bucket
+        Output      :   Train set and test set of the dataframe
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   hash based split for the streaming merge
         """
-        logging.info("Entered split_data_as_train_test method of Data_Ingestion class")
-
         try:
-            train_set, test_set = train_test_split(
-                dataframe,
-                test_size=self.data_validation_config.data_validation_split_ratio,
-            )
+            row_hash: np.ndarray = pd.util.hash_pandas_object(
+                dataframe.astype("float64"),
+                index=False,
+                hash_key=self.data_validation_config.data_validation_split_seed,
+            ).to_numpy()
 
-            logging.info("Performed train test split on the dataframe")
+            is_test: np.ndarray = (row_hash >> np.uint64(11)) / float(
+                1 << 53
+            ) < self.data_validation_config.data_validation_split_ratio
 
-            logging.info(
-                "Exited split_data_as_train_test method of Data_Ingestion class"
-            )
-
-            return train_set, test_set
+            return dataframe[~is_test], dataframe[is_test]
 
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def initiate_data_validation(self) -> DataValidationArtifact:
         """
         Method Name :   initiate_data_validation
@@ -368,8 +766,8 @@ class DataValidation:
         Output      :   Data Validation is done and artifacts are stored in artifacts folder
         On Failure  :   Raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   validation and merge run as one streaming pass
         """
         logging.info("Entered initiate_data_validation method of DataValidation class")
 
@@ -377,40 +775,22 @@ class DataValidation:
             (
                 LengthOfDateStampInFile,
                 LengthOfTimeStampInFile,
-                _,
+                column_names,
                 noofcolumns,
             ) = self.values_from_schema()
 
-            self.validate_raw_fname(
-                LengthOfDateStampInFile=LengthOfDateStampInFile,
-                LengthOfTimeStampInFile=LengthOfTimeStampInFile,
+            n_train_rows, n_test_rows = self.merge_batch_data(
+                valid_batches=self.validate_batch_files(
+                    LengthOfDateStampInFile=LengthOfDateStampInFile,
+                    LengthOfTimeStampInFile=LengthOfTimeStampInFile,
+                    NumberofColumns=noofcolumns,
+                ),
+                column_types=column_names,
             )
 
-            self.validate_col_length(NumberofColumns=noofcolumns)
+            Instrumentation.record_rows(rows_out=n_train_rows + n_test_rows)
 
-            self.validate_missing_values_in_col()
-
-            if self.check_validation_status() is True:
-                data: List[pd.DataFrame] = self.merge_batch_data(
-                    folder_name=self.data_validation_config.data_validation_valid_data_dir,
-                    input_file=self.data_validation_config.merged_file_path,
-                )
-
-                train_df, test_df = self.split_data_as_train_test(dataframe=data)
-
-                train_df.to_csv(
-                    self.data_validation_config.training_file_path,
-                    index=False,
-                    header=True,
-                )
-
-                test_df.to_csv(
-                    self.data_validation_config.testing_file_path,
-                    index=False,
-                    header=True,
-                )
-
-            else:
+            if self.check_validation_status() is False:
                 raise Exception(
                     f"No valid data csv files are found. {self.data_validation_config.data_validation_valid_data_dir} is empty"
                 )
@@ -420,6 +800,8 @@ class DataValidation:
                 invalid_data_dir=self.data_validation_config.data_validation_invalid_data_dir,
                 training_file_path=self.data_validation_config.training_file_path,
                 testing_file_path=self.data_validation_config.testing_file_path,
+                manifest_file_path=self.data_validation_config.data_validation_manifest_file_path,
+                train_file_index_path=self.data_validation_config.train_file_index_path,
             )
 
             logging.info(f"Data Validation Artifact is : {data_validation_artifact}")
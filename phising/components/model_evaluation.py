@@ -7,6 +7,7 @@ from mlflow.models import EvaluationResult, MetricThreshold
 from mlflow.models.evaluation.validation import ModelValidationFailedException
 
 from phising.constant import training_pipeline
+from phising.data_access.phising_data import PhisingData
 from phising.entity.artifact_entity import (
     DataValidationArtifact,
     ModelEvaluationArtifact,
@@ -20,6 +21,7 @@ from phising.entity.config_entity import (
 from phising.exception import PhisingException
 from phising.logger import logging
 from phising.ml.mlflow import MLFLowOperation
+from phising.utils.instrumentation import Instrumentation, instrumented
 
 
 class ModelEvaluation:
@@ -28,6 +30,7 @@ class ModelEvaluation:
         model_eval_config: ModelEvaluationConfig,
         data_validation_artifact: DataValidationArtifact,
         model_trainer_artifact: ModelTrainerArtifact,
+        prod_model_info: Union[MLFlowModelInfo, None] = None,
     ):
         self.model_eval_config = model_eval_config
 
@@ -35,6 +38,9 @@ class ModelEvaluation:
 
         self.model_trainer_artifact = model_trainer_artifact
 
+        # production model info looked up ahead by the training pipeline, looked up again when it is None
+        self.prod_model_info = prod_model_info
+
         self.mlflow_op = MLFLowOperation()
 
     def evaluate_model(self) -> EvaluateModelResponse:
@@ -43,7 +49,7 @@ class ModelEvaluation:
         try:
             model_eval_result = None
 
-            test_df: pd.DataFrame = pd.read_csv(
+            test_df: pd.DataFrame = PhisingData().read_artifact(
                 self.data_validation_artifact.testing_file_path
             )
 
@@ -58,6 +64,8 @@ class ModelEvaluation:
 
             logging.info("Split the dataset into features and targets")
 
+            Instrumentation.record_rows(rows_in=len(test_df))
+
             trained_model_info: MLFlowModelInfo = self.mlflow_op.get_model_info(
                 best_model_name=self.model_trainer_artifact.best_model_name
             )
@@ -68,9 +76,11 @@ class ModelEvaluation:
 
             logging.info("Replaced target values on targets dataset")
 
-            prod_model_info: Union[
-                MLFlowModelInfo, None
-            ] = self.mlflow_op.get_prod_model_info()
+            prod_model_info: Union[MLFlowModelInfo, None] = (
+                self.prod_model_info
+                if self.prod_model_info is not None
+                else self.mlflow_op.get_prod_model_info()
+            )
 
             logging.info(f"Got prod model info : {prod_model_info}")
 
@@ -139,6 +149,7 @@ class ModelEvaluation:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
         logging.info(
             "Entered initiate_model_evaluation method of ModelEvaluation class"
@@ -1,11 +1,24 @@
+import os
 import sys
+from typing import Dict, Union
 
 from phising.configuration.mlflow_connection import MLFlowClient
-from phising.entity.artifact_entity import ModelEvaluationArtifact, ModelPusherArtifact
+from phising.entity.artifact_entity import (
+    ModelEvaluationArtifact,
+    ModelPusherArtifact,
+    ModelTrainerArtifact,
+)
 from phising.entity.config_entity import ModelPusherConfig
 from phising.exception import PhisingException
 from phising.logger import logging
-from phising.utils.main_utils import build_and_push_bento_image
+from phising.ml.mlflow import MLFLowOperation
+from phising.ml.model.estimator import phisingModel
+from phising.utils.instrumentation import instrumented
+from phising.utils.main_utils import (
+    build_and_push_bento_image,
+    read_json,
+    write_json,
+)
 
 
 class ModelPusher:
@@ -13,13 +26,74 @@ class ModelPusher:
         self,
         model_evaluation_artifact: ModelEvaluationArtifact,
         model_pusher_config: ModelPusherConfig,
+        model_trainer_artifact: Union[ModelTrainerArtifact, None] = None,
     ):
         self.model_evaluation_artifact = model_evaluation_artifact
 
         self.model_pusher_config = model_pusher_config
 
+        self.model_trainer_artifact = model_trainer_artifact
+
         self.mlflow_client = MLFlowClient().client
 
+        self.mlflow_op = MLFLowOperation()
+
+    def get_compiled_model_file_path(self) -> Union[str, None]:
+        """
+        Gets the compiled model the model trainer saved and checked against the test set, when the accepted model
+        is the best model of that trainer run. None makes the serving model compile the accepted model.
+        """
+        if (
+            self.model_trainer_artifact is None
+            or self.model_trainer_artifact.compiled_model_file_path is None
+            or self.model_evaluation_artifact.accepted_model_info.model_name
+            != self.model_trainer_artifact.best_model_name
+            or not os.path.exists(self.model_trainer_artifact.compiled_model_file_path)
+        ):
+            return None
+
+        return self.model_trainer_artifact.compiled_model_file_path
+
+    def update_model_trainer_state(self) -> None:
+        """
+        Makes the candidate state written by the model trainer the state of the production model, once the accepted
+        model is pushed. The batch files the production model was trained on are advanced only here, so a run failing
+        before the push trains on the same new rows again.
+        """
+        logging.info("Entered update_model_trainer_state method of ModelPusher class")
+
+        try:
+            if (
+                self.model_trainer_artifact is None
+                or self.model_trainer_artifact.state_file_path is None
+                or not os.path.exists(self.model_trainer_artifact.state_file_path)
+            ):
+                logging.info("No model trainer state to update")
+
+                return None
+
+            state: Dict = read_json(self.model_trainer_artifact.state_file_path)
+
+            state["model_name"] = (
+                self.model_evaluation_artifact.accepted_model_info.model_name
+            )
+
+            state["model_version"] = str(
+                self.model_evaluation_artifact.accepted_model_info.model_version
+            )
+
+            write_json(self.model_pusher_config.model_trainer_state_file_path, state)
+
+            logging.info(
+                f"Updated model trainer state of {state['model_name']} version {state['model_version']} with {len(state.get('trained_files', []))} trained batch files"
+            )
+
+            logging.info("Exited update_model_trainer_state method of ModelPusher class")
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @instrumented
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         logging.info("Entered initiate_model_pusher method of ModelPusher class")
 
@@ -27,7 +101,11 @@ class ModelPusher:
             if self.model_evaluation_artifact.accepted_model_info is None:
                 raise Exception("No trained model is accepted")
 
-            elif (
+            accepted_model: phisingModel = self.mlflow_op.load_model(
+                self.model_evaluation_artifact.accepted_model_info
+            )
+
+            if (
                 self.model_evaluation_artifact.accepted_model_info is not None
                 and self.model_evaluation_artifact.prod_model_info is None
             ):
@@ -43,9 +121,13 @@ class ModelPusher:
                 )
 
                 build_and_push_bento_image(
-                    model_uri=self.model_evaluation_artifact.accepted_model_info.model_uri
+                    model_uri=self.model_evaluation_artifact.accepted_model_info.model_uri,
+                    model=accepted_model,
+                    compiled_model_file_path=self.get_compiled_model_file_path(),
                 )
 
+                self.update_model_trainer_state()
+
             elif (
                 self.model_evaluation_artifact.accepted_model_info is not None
                 and self.model_evaluation_artifact.prod_model_info is not None
@@ -69,9 +151,13 @@ class ModelPusher:
                 )
 
                 build_and_push_bento_image(
-                    model_uri=self.model_evaluation_artifact.accepted_model_info.model_uri
+                    model_uri=self.model_evaluation_artifact.accepted_model_info.model_uri,
+                    model=accepted_model,
+                    compiled_model_file_path=self.get_compiled_model_file_path(),
                 )
 
+                self.update_model_trainer_state()
+
             else:
                 logging.info("something went wrong")
 
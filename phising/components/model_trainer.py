@@ -1,24 +1,37 @@
+import copy
 import os
 import sys
-from typing import Dict
+from datetime import datetime
+from typing import Dict, List, Tuple, Union
 
 import mlflow
 import numpy as np
-from neuro_mf import BestModel, ModelFactory
+from neuro_mf import BestModel, GridSearchedBestModel
+from sklearn.ensemble import RandomForestClassifier
 
 from phising.constant import training_pipeline
 from phising.entity.artifact_entity import (
-    ClassificationMetricArtifact,
     DataTransformationArtifact,
     ModelTrainerArtifact,
 )
-from phising.entity.config_entity import ModelTrainerConfig
+from phising.entity.config_entity import MLFlowModelInfo, ModelTrainerConfig
 from phising.exception import PhisingException
 from phising.logger import logging
-from phising.ml.metric import calculate_metric
+from phising.ml.metric import calculate_psi, calculate_roc_auc_scores
 from phising.ml.mlflow import MLFLowOperation
+from phising.ml.model.compiled_forest import CompiledForest
 from phising.ml.model.estimator import phisingModel
-from phising.utils.main_utils import load_numpy_array_data, load_object, save_object
+from phising.ml.search import ModelSearch
+from phising.utils.instrumentation import Instrumentation, instrumented
+from phising.utils.main_utils import (
+    link_file,
+    load_compact_array_data,
+    load_object,
+    read_json,
+    read_yaml,
+    save_object,
+    write_json,
+)
 
 
 class ModelTrainer:
@@ -26,36 +39,188 @@ class ModelTrainer:
         self,
         data_transformation_artifact: DataTransformationArtifact,
         model_trainer_config: ModelTrainerConfig,
+        prod_model_info: Union[MLFlowModelInfo, None] = None,
     ):
         self.data_transformation_artifact = data_transformation_artifact
 
         self.model_trainer_config = model_trainer_config
 
+        # production model info looked up ahead by the training pipeline, looked up again when it is None
+        self.prod_model_info = prod_model_info
+
         self.mlflow_op = MLFLowOperation()
 
-    def initiate_model_trainer(
-        self,
-    ) -> ModelTrainerArtifact:
-        logging.info("Entered initiate_model_trainer method of ModelTrainer class")
+    @staticmethod
+    def get_value_shares(arr: np.ndarray) -> np.ndarray:
+        """
+        Gets the share of the -1, 0 and 1 values of every column of a transformed array, imputed values being
+        rounded to the nearest one.
+        """
+        values: np.ndarray = np.rint(arr)
+
+        return np.stack([(values == v).mean(axis=0) for v in (-1, 0, 1)], axis=1)
+
+    @staticmethod
+    def is_warm_startable(model: object) -> bool:
+        return isinstance(model, RandomForestClassifier) or hasattr(
+            model, "get_booster"
+        )
+
+    def get_state(self) -> Dict:
+        if not os.path.exists(self.model_trainer_config.state_file_path):
+            return {}
+
+        return read_json(self.model_trainer_config.state_file_path)
 
+    def get_new_train_rows(
+        self, train_file_index: List[Dict], trained_files: List[str]
+    ) -> np.ndarray:
+        """
+        Selects the rows of the transformed train array coming from the batch files whose sha256 is not in
+        trained_files, the train file index giving the number of train rows of every file in train file order.
+        """
         try:
-            train_arr: np.ndarray = load_numpy_array_data(
-                file_path=self.data_transformation_artifact.transformed_train_file_path
+            train_arr: np.ndarray = load_compact_array_data(
+                file_path=self.data_transformation_artifact.transformed_train_file_path,
+                mmap_mode=self.model_trainer_config.mmap_mode,
             )
 
-            test_arr: np.ndarray = load_numpy_array_data(
-                file_path=self.data_transformation_artifact.transformed_test_file_path
+            trained: set = set(trained_files)
+
+            is_new: np.ndarray = np.repeat(
+                [entry["sha256"] not in trained for entry in train_file_index],
+                [entry["n_train_rows"] for entry in train_file_index],
             )
 
-            x_train, y_train, x_test, y_test = (
-                train_arr[:, :-1],
-                train_arr[:, -1],
-                test_arr[:, :-1],
-                test_arr[:, -1],
+            if len(is_new) != len(train_arr):
+                raise Exception(
+                    f"Train file index holds {len(is_new)} rows, the train array {len(train_arr)}"
+                )
+
+            return np.asarray(train_arr[is_new])
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def get_full_search_reason(
+        self,
+        prod_model_info: Union[MLFlowModelInfo, None],
+        state: Dict,
+        new_train_arr: Union[np.ndarray, None],
+    ) -> Union[str, None]:
+        """
+        Decides whether the retrain has to run the full hyperparameter search, and why. None means the production
+        model can be trained further on the new train rows.
+        """
+        try:
+            if self.model_trainer_config.training_mode != "incremental":
+                return f"training mode is {self.model_trainer_config.training_mode}"
+
+            if prod_model_info is None:
+                return "there is no production model"
+
+            if (state.get("model_name"), state.get("model_version")) != (
+                prod_model_info.model_name,
+                str(prod_model_info.model_version),
+            ):
+                return f"the trainer state does not record what {prod_model_info.model_name} version {prod_model_info.model_version} was trained on"
+
+            if "last_full_search_at" not in state:
+                return "no full search is recorded"
+
+            days_since_full_search: float = (
+                datetime.now() - datetime.fromisoformat(state["last_full_search_at"])
+            ).total_seconds() / 86400
+
+            if (
+                days_since_full_search
+                >= self.model_trainer_config.full_search_interval_days
+            ):
+                return f"last full search ran {days_since_full_search:.1f} days ago"
+
+            if len(np.unique(new_train_arr[:, -1])) < 2:
+                return "the new train rows do not hold both classes"
+
+            psi: np.ndarray = calculate_psi(
+                expected=np.asarray(state["value_shares"]),
+                actual=self.get_value_shares(new_train_arr),
+            )
+
+            if psi.max() > self.model_trainer_config.drift_psi_threshold:
+                return f"column {int(psi.argmax())} drifted with a psi of {psi.max():.3f}"
+
+            return None
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def warm_start_model(self, model: object, x: np.ndarray, y: np.ndarray) -> object:
+        """
+        Trains a copy of a fitted model further on x and y, the fitted model is left unchanged. A
+        RandomForestClassifier gets warm_start_n_estimators new trees grown on x, the trees it has are kept. An
+        XGBClassifier gets warm_start_n_estimators more boosting rounds on top of its booster, cut at its best
+        iteration when it was early stopped.
+        """
+        try:
+            n_estimators: int = self.model_trainer_config.warm_start_n_estimators
+
+            if isinstance(model, RandomForestClassifier):
+                # the loaded production model is left as it is, the new trees are grown on a copy
+                model = copy.deepcopy(model)
+
+                model.set_params(
+                    warm_start=True, n_estimators=model.n_estimators + n_estimators
+                )
+
+                return model.fit(x, y)
+
+            booster = model.get_booster()
+
+            best_iteration: Union[str, None] = booster.attr("best_iteration")
+
+            if best_iteration is not None:
+                booster = booster[: int(best_iteration) + 1]
+
+            booster.set_attr(best_iteration=None, best_score=None)
+
+            params: Dict = model.get_params()
+
+            params.update(n_estimators=n_estimators, early_stopping_rounds=None)
+
+            return type(model)(**params).fit(x, y, xgb_model=booster)
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def search_models(
+        self, x_test: np.ndarray
+    ) -> Tuple[List[GridSearchedBestModel], BestModel, Dict[str, Dict], Dict]:
+        """
+        Runs the hyperparameter search over every model of the model config on the whole train set. Returns the
+        searched models, the best one, the cv results of every candidate and the trainer state to record.
+        """
+        logging.info("Entered search_models method of ModelTrainer class")
+
+        try:
+            train_arr: np.ndarray = load_compact_array_data(
+                file_path=self.data_transformation_artifact.transformed_train_file_path,
+                mmap_mode=self.model_trainer_config.mmap_mode,
             )
 
-            model_factory: ModelFactory = ModelFactory(
-                model_config_path=self.model_trainer_config.model_config_file_path
+            x_train, y_train = train_arr[:, :-1], train_arr[:, -1]
+
+            Instrumentation.record_rows(rows_in=len(train_arr) + len(x_test))
+
+            model_factory: ModelSearch = ModelSearch(
+                model_config_path=self.model_trainer_config.model_config_file_path,
+                backend=self.model_trainer_config.search_backend,
+                n_candidates=self.model_trainer_config.search_n_candidates,
+                halving_factor=self.model_trainer_config.search_halving_factor,
+                early_stopping_rounds=self.model_trainer_config.early_stopping_rounds,
+                early_stopping_validation_size=self.model_trainer_config.early_stopping_validation_size,
+                random_state=self.model_trainer_config.search_random_state,
+                parallel_families=self.model_trainer_config.parallel_families,
+                family_n_jobs=self.model_trainer_config.family_n_jobs,
             )
 
             best_model_detail: BestModel = model_factory.get_best_model(
@@ -64,72 +229,311 @@ class ModelTrainer:
                 base_accuracy=self.model_trainer_config.expected_score,
             )
 
+            state: Dict = {
+                "last_full_search_at": datetime.now().isoformat(),
+                "value_shares": self.get_value_shares(train_arr).tolist(),
+            }
+
+            logging.info("Exited search_models method of ModelTrainer class")
+
+            return (
+                model_factory.grid_searched_best_model_list,
+                best_model_detail,
+                model_factory.cv_results,
+                state,
+            )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def warm_start_prod_model(
+        self,
+        prod_model_info: MLFlowModelInfo,
+        prod_model: phisingModel,
+        new_train_arr: np.ndarray,
+        x_test: np.ndarray,
+        y_test: np.ndarray,
+    ) -> Tuple[List[GridSearchedBestModel], BestModel]:
+        """
+        Trains the production model loaded from the MLflow registry further on the new train rows only. The test
+        score of the updated model is its best score, as there is no cv score to report.
+        """
+        logging.info("Entered warm_start_prod_model method of ModelTrainer class")
+
+        try:
+            Instrumentation.record_rows(rows_in=len(new_train_arr) + len(x_test))
+
+            model: object = self.warm_start_model(
+                prod_model.trained_model_object,
+                x=new_train_arr[:, :-1],
+                y=new_train_arr[:, -1],
+            )
+
+            model_score: float = float(
+                calculate_roc_auc_scores(
+                    y=y_test, y_scores=model.predict_proba(x_test)[:, 1]
+                )[0]
+            )
+
+            warm_started_model: GridSearchedBestModel = GridSearchedBestModel(
+                model_serial_number="warm_start",
+                model=prod_model.trained_model_object,
+                best_model=model,
+                best_parameters={
+                    "warm_start_from": f"{prod_model_info.model_name}/{prod_model_info.model_version}",
+                    "n_new_train_rows": len(new_train_arr),
+                    "n_estimators": model.get_params()["n_estimators"],
+                },
+                best_score=model_score,
+            )
+
+            logging.info(
+                f"Trained {prod_model_info.model_name} version {prod_model_info.model_version} on {len(new_train_arr)} new train rows"
+            )
+
+            logging.info("Exited warm_start_prod_model method of ModelTrainer class")
+
+            return [warm_started_model], BestModel(*warm_started_model)
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def compile_model(self, model: object, x_test: np.ndarray) -> Union[str, None]:
+        """
+        Compiles the best model into flat tree arrays and saves them for serving, when the compiled model gives
+        the same predictions as the model on the whole test set. Returns the file path of the compiled model,
+        None when it is not saved.
+        """
+        logging.info("Entered compile_model method of ModelTrainer class")
+
+        try:
+            if not self.model_trainer_config.compile_best_model:
+                return None
+
+            try:
+                compiled_model: CompiledForest = CompiledForest.from_model(model)
+
+            except PhisingException as e:
+                logging.info(f"Not compiling {type(model).__name__}: {e}")
+
+                return None
+
+            if not np.array_equal(compiled_model.predict(x_test), model.predict(x_test)):
+                logging.info(
+                    f"Compiled {type(model).__name__} disagrees with the model on the test set, not saving it"
+                )
+
+                return None
+
+            compiled_model.save(self.model_trainer_config.compiled_model_file_path)
+
+            logging.info(
+                f"Saved compiled {type(model).__name__} with {len(compiled_model.roots)} trees to {self.model_trainer_config.compiled_model_file_path}"
+            )
+
+            logging.info("Exited compile_model method of ModelTrainer class")
+
+            return self.model_trainer_config.compiled_model_file_path
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @instrumented
+    def initiate_model_trainer(
+        self,
+    ) -> ModelTrainerArtifact:
+        logging.info("Entered initiate_model_trainer method of ModelTrainer class")
+
+        try:
+            test_arr: np.ndarray = load_compact_array_data(
+                file_path=self.data_transformation_artifact.transformed_test_file_path
+            )
+
+            x_test, y_test = test_arr[:, :-1], test_arr[:, -1]
+
+            state: Dict = self.get_state()
+
+            train_file_index: List[Dict] = read_json(
+                self.data_transformation_artifact.train_file_index_path
+            )
+
+            # every batch file of the train set, the candidate state records them as trained on
+            train_files: List[str] = sorted(
+                {entry["sha256"] for entry in train_file_index}
+            )
+
+            new_train_arr: Union[np.ndarray, None] = (
+                self.get_new_train_rows(
+                    train_file_index=train_file_index,
+                    trained_files=state.get("trained_files", []),
+                )
+                if self.model_trainer_config.training_mode == "incremental"
+                else None
+            )
+
+            prod_model_info: Union[MLFlowModelInfo, None] = (
+                self.prod_model_info
+                if self.prod_model_info is not None
+                or self.model_trainer_config.training_mode != "incremental"
+                else self.mlflow_op.get_prod_model_info()
+            )
+
+            full_search_reason: Union[str, None] = self.get_full_search_reason(
+                prod_model_info=prod_model_info,
+                state=state,
+                new_train_arr=new_train_arr,
+            )
+
+            if full_search_reason is None:
+                prod_model: phisingModel = self.mlflow_op.load_model(prod_model_info)
+
+                if not self.is_warm_startable(prod_model.trained_model_object):
+                    full_search_reason = f"{type(prod_model.trained_model_object).__name__} can not be trained incrementally"
+
+            cv_results_by_model: Dict[str, Dict] = {}
+
+            if full_search_reason is None:
+                training_mode: str = "incremental"
+
+                # the production model was not searched again, so its full search and value shares carry over
+                state: Dict = {
+                    "last_full_search_at": state["last_full_search_at"],
+                    "value_shares": state["value_shares"],
+                }
+
+                searched_models, best_model_detail = self.warm_start_prod_model(
+                    prod_model_info=prod_model_info,
+                    prod_model=prod_model,
+                    new_train_arr=new_train_arr,
+                    x_test=x_test,
+                    y_test=y_test,
+                )
+
+            else:
+                training_mode: str = "full"
+
+                logging.info(f"Running a full search, as {full_search_reason}")
+
+                (
+                    searched_models,
+                    best_model_detail,
+                    cv_results_by_model,
+                    state,
+                ) = self.search_models(x_test=x_test)
+
             preprocessing_obj: object = load_object(
                 file_path=self.data_transformation_artifact.transformed_object_file_path
             )
 
-            best_model = phisingModel(
-                preprocessing_object=preprocessing_obj,
-                trained_model_object=best_model_detail.best_model,
+            # one predict call per searched model, then every model is scored on the test set at once
+            test_predictions: np.ndarray = np.vstack(
+                [model.best_model.predict(x_test) for model in searched_models]
             )
 
-            best_model_path: str = os.path.join(
-                self.model_trainer_config.best_model_file_dir,
-                best_model.trained_model_object.__class__.__name__
-                + "-"
-                + training_pipeline.EXP_NAME
-                + ".pkl",
+            model_scores: np.ndarray = calculate_roc_auc_scores(
+                y=y_test, y_scores=test_predictions
             )
 
-            save_object(file_path=best_model_path, obj=best_model)
+            # column order the served models expect, checked against the preprocessing object when they are loaded
+            feature_names: List[str] = list(
+                read_yaml(training_pipeline.SCHEMA_FILE_PATH)["ColName"]
+            )
 
-            for model in model_factory.grid_searched_best_model_list:
-                with mlflow.start_run(
-                    run_name=training_pipeline.EXP_NAME
+            os.makedirs(self.model_trainer_config.best_model_file_dir, exist_ok=True)
+
+            cv_results: Dict[str, Dict] = {}
+
+            for model, model_score in zip(searched_models, model_scores):
+                trained_model = phisingModel(
+                    preprocessing_object=preprocessing_obj,
+                    trained_model_object=model.best_model,
+                    feature_names=feature_names,
+                )
+
+                trained_model_path: str = os.path.join(
+                    self.model_trainer_config.trained_model_file_dir,
+                    trained_model.trained_model_object.__class__.__name__
                     + "-"
-                    + model.model_serial_number
-                ):
-                    model_score: ClassificationMetricArtifact = calculate_metric(
-                        model=model.best_model, x=x_test, y=y_test
-                    )
+                    + training_pipeline.EXP_NAME
+                    + ".pkl",
+                )
 
-                    model_parameters: Dict = model.best_parameters
+                save_object(file_path=trained_model_path, obj=trained_model)
 
-                    trained_model = phisingModel(
-                        preprocessing_object=preprocessing_obj,
-                        trained_model_object=model.best_model,
+                if model.model_serial_number == best_model_detail.model_serial_number:
+                    link_file(
+                        trained_model_path,
+                        self.model_trainer_config.best_model_file_dir,
+                        mode="hardlink",
                     )
 
-                    trained_model_path: str = os.path.join(
-                        self.model_trainer_config.trained_model_file_dir,
-                        trained_model.trained_model_object.__class__.__name__
-                        + "-"
-                        + training_pipeline.EXP_NAME
-                        + ".pkl",
+                    logging.info(
+                        f"Linked best model {trained_model_path} into {self.model_trainer_config.best_model_file_dir}"
                     )
 
-                    save_object(file_path=trained_model_path, obj=trained_model)
+                cv_results[model.model_serial_number] = {
+                    "model_name": trained_model.trained_model_object.__class__.__name__,
+                    "best_parameters": model.best_parameters,
+                    "cv_score": float(model.best_score)
+                    if training_mode == "full"
+                    else None,
+                    "test_score": float(model_score),
+                    "candidates": cv_results_by_model.get(model.model_serial_number, {}),
+                }
 
+                with mlflow.start_run(
+                    run_name=training_pipeline.EXP_NAME
+                    + "-"
+                    + model.model_serial_number
+                ):
                     self.mlflow_op.log_all_for_model(
                         model=trained_model,
-                        model_parameters=model_parameters,
-                        model_score=model_score,
+                        model_parameters=model.best_parameters,
+                        model_score=float(model_score),
+                    )
+
+                    mlflow.log_dict(
+                        cv_results[model.model_serial_number],
+                        training_pipeline.MODEL_TRAINER_CV_RESULTS_FILE_NAME,
                     )
 
             mlflow.end_run()
 
-            if best_model_detail.best_score < self.model_trainer_config.expected_score:
+            write_json(self.model_trainer_config.cv_results_file_path, cv_results)
+
+            # the cv score of the best searched model in full mode, the test score of the warm started production
+            # model in incremental mode, as it has no cv score
+            best_model_score: float = float(best_model_detail.best_score)
+
+            logging.info(
+                f"Best model has a {'cv' if training_mode == 'full' else 'test'} score of {best_model_score}"
+            )
+
+            if best_model_score < self.model_trainer_config.expected_score:
                 logging.info("No best model found with score more than base score")
 
                 raise Exception("No best model found with score more than base score")
 
+            state["trained_files"] = train_files
+
+            # the model pusher makes this the state of the production model once the best model is pushed
+            write_json(self.model_trainer_config.candidate_state_file_path, state)
+
+            compiled_model_file_path: Union[str, None] = self.compile_model(
+                best_model_detail.best_model, x_test=x_test
+            )
+
             model_trainer_artifact: ModelTrainerArtifact = ModelTrainerArtifact(
                 trained_model_dir=self.model_trainer_config.trained_model_file_dir,
                 best_model_dir=self.model_trainer_config.best_model_file_dir,
                 best_model_name=best_model_detail.best_model.__class__.__name__
                 + "-"
                 + training_pipeline.EXP_NAME,
-                trained_model_list=model_factory.grid_searched_best_model_list,
+                trained_model_list=searched_models,
+                cv_results_file_path=self.model_trainer_config.cv_results_file_path,
+                training_mode=training_mode,
+                compiled_model_file_path=compiled_model_file_path,
+                state_file_path=self.model_trainer_config.candidate_state_file_path,
             )
 
             logging.info(f"Model trainer artifact: {model_trainer_artifact}")
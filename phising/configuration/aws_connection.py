@@ -0,0 +1,29 @@
+import os
+
+import boto3
+from botocore.config import Config
+
+from phising.constant import training_pipeline
+from phising.constant.env_variable import AWS_S3_ENDPOINT_URL_KEY
+
+
+class S3Client:
+    client = None
+
+    def __init__(self):
+        if S3Client.client == None:
+            __s3_endpoint_url = os.getenv(AWS_S3_ENDPOINT_URL_KEY)
+
+            S3Client.client = boto3.client(
+                "s3",
+                endpoint_url=__s3_endpoint_url,
+                config=Config(
+                    max_pool_connections=training_pipeline.S3_MAX_POOL_CONNECTIONS,
+                    retries={
+                        "max_attempts": training_pipeline.S3_MAX_ATTEMPTS,
+                        "mode": "adaptive",
+                    },
+                ),
+            )
+
+        self.client = S3Client.client
@@ -1 +1,3 @@
 MLFLOW_TRACKING_URI_KEY: str = "MLFLOW_TRACKING_URI"
+
+AWS_S3_ENDPOINT_URL_KEY: str = "AWS_S3_ENDPOINT_URL"
@@ -27,6 +27,24 @@ SCHEMA_FILE_PATH: str = os.path.join("config", "phising_schema_prediction.yaml")
 
 PREPROCSSING_OBJECT_FILE_NAME: str = "preprocessing.pkl"
 
+"""
+S3 transfer related constant start with S3 VAR NAME
+"""
+S3_MAX_POOL_CONNECTIONS: int = 32
+
+S3_MAX_WORKERS: int = 16
+
+S3_MAX_CONCURRENCY: int = 4
+
+S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+
+S3_MULTIPART_CHUNKSIZE: int = 8 * 1024 * 1024
+
+# bytes read at a time when hashing a local file against the ETag of its s3 object
+S3_HASH_CHUNK_SIZE: int = 1024 * 1024
+
+S3_MAX_ATTEMPTS: int = 5
+
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
 """
@@ -40,6 +58,16 @@ DATA_INGESTION_BUCKET_NAME: str = "36930phising-feature-store"
 
 DATA_INGESTION_BUCKET_FOLDER_NAME: str = "data/train_batch"
 
+DATA_INGESTION_CACHE_DIR: str = "feature_store_cache"
+
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.json"
+
+DATA_INGESTION_ROUTING_MODE: str = "hardlink"
+
+# opt-in, downloads the batch files as data validation consumes them instead of all of them before it. The run
+# report shows the downloads as the DataIngestion.iter_feature_store_files stage
+DATA_INGESTION_STREAMING_MODE: bool = False
+
 """
 Data Validation realted contant start with DATA_VALIDATION VAR NAME
 """
@@ -55,11 +83,33 @@ DATA_VALIDATION_TRAIN_SCHEMA: str = "config/phising_schema_training.yaml"
 
 DATA_VALIDATION_REGEX: str = "config/phising_regex.txt"
 
-DATA_VALIDATION_TRAIN_COMPRESSED_FILE_PATH: str = "train_input_file.csv"
+# csv, parquet or arrow, which is also the extension of the merged, train and test files
+DATA_VALIDATION_ARTIFACT_FORMAT: str = "parquet"
+
+DATA_VALIDATION_TRAIN_COMPRESSED_FILE_PATH: str = (
+    "train_input_file." + DATA_VALIDATION_ARTIFACT_FORMAT
+)
+
+DATA_VALIDATION_TRAIN_FILE_PATH: str = "train." + DATA_VALIDATION_ARTIFACT_FORMAT
+
+DATA_VALIDATION_TEST_FILE_PATH: str = "test." + DATA_VALIDATION_ARTIFACT_FORMAT
+
+# sha256 and number of train rows of every valid batch file, in the order of the train file
+DATA_VALIDATION_TRAIN_FILE_INDEX_FILE_NAME: str = "train_file_index.json"
 
-DATA_VALIDATION_TRAIN_FILE_PATH: str = "train.csv"
+DATA_VALIDATION_N_WORKERS: int = 1
 
-DATA_VALIDATION_TEST_FILE_PATH: str = "test.csv"
+DATA_VALIDATION_CHUNK_SIZE: int = 100000
+
+DATA_VALIDATION_SPLIT_SEED: str = "phising-split-v1"
+
+DATA_VALIDATION_ROUTING_MODE: str = "hardlink"
+
+DATA_VALIDATION_MANIFEST_FILE_NAME: str = "manifest.json"
+
+DATA_VALIDATION_CACHE_FILE_PATH: str = os.path.join(
+    ARTIFACT_DIR, "data_validation_cache.json"
+)
 
 """
 Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
@@ -70,15 +120,24 @@ DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
 
+DATA_TRANSFORMATION_IMPUTER_STRATEGY: str = "knn"
+
 DATA_TRANSFORMATION_IMPUTER_PARAMS: dict = {
     "missing_values": np.nan,
     "n_neighbors": 3,
     "weights": "uniform",
 }
 
-DATA_TRANSFORMATION_TRAIN_FILE_PATH: str = "train.npy"
+DATA_TRANSFORMATION_MODE_IMPUTER_PARAMS: dict = {
+    "missing_values": np.nan,
+    "strategy": "most_frequent",
+}
+
+DATA_TRANSFORMATION_NEAREST_PATTERN_IMPUTER_PARAMS: dict = {"n_neighbors": 3}
 
-DATA_TRANSFORMATION_TEST_FILE_PATH: str = "test.npy"
+DATA_TRANSFORMATION_TRAIN_FILE_PATH: str = "train.npz"
+
+DATA_TRANSFORMATION_TEST_FILE_PATH: str = "test.npz"
 
 """
 Model Trainer ralated constant start with MODE TRAINER VAR NAME
@@ -98,6 +157,60 @@ MODEL_TRAINER_MODEL_CONFIG_FILE_PATH: str = "config/model.yaml"
 
 MODEL_TRAINER_MODEL_METRIC_KEY: str = "roc_auc_score"
 
+MODEL_TRAINER_MMAP_MODE: str = "r"
+
+MODEL_TRAINER_CV_RESULTS_FILE_NAME: str = "cv_results.json"
+
+# compile the best model into flat tree arrays for serving, kept only when it predicts the test set identically
+MODEL_TRAINER_COMPILE_BEST_MODEL: bool = True
+
+MODEL_TRAINER_COMPILED_MODEL_FILE_NAME: str = "compiled_model.npz"
+
+# full searches hyperparameters on every retrain, incremental continues training the production model on the
+# train rows of the batch files it was not trained on and falls back to a full search on schedule, on drift or
+# when the trainer state does not record what the production model was trained on
+MODEL_TRAINER_TRAINING_MODE: str = "full"
+
+MODEL_TRAINER_FULL_SEARCH_INTERVAL_DAYS: int = 7
+
+# population stability index of a column between the last full search and the new rows
+MODEL_TRAINER_DRIFT_PSI_THRESHOLD: float = 0.2
+
+# trees of RandomForestClassifier or boosting rounds of XGBClassifier added by an incremental retrain
+MODEL_TRAINER_WARM_START_N_ESTIMATORS: int = 10
+
+# state of the production model, the batch files it was trained on included, written by the model pusher
+MODEL_TRAINER_STATE_FILE_PATH: str = os.path.join(
+    ARTIFACT_DIR, "model_trainer_state.json"
+)
+
+# state of the best trained model, which becomes the state of the production model once it is pushed
+MODEL_TRAINER_CANDIDATE_STATE_FILE_NAME: str = "model_trainer_state.json"
+
+# one of grid, halving_grid, halving_random or random, scripts/bench_model_search.py compares the roc auc of
+# the faster backends with grid on the data at hand before switching to one of them
+MODEL_TRAINER_SEARCH_BACKEND: str = "grid"
+
+# number of sampled candidates of the random and halving_random backends
+MODEL_TRAINER_SEARCH_N_CANDIDATES: int = 16
+
+MODEL_TRAINER_SEARCH_HALVING_FACTOR: int = 3
+
+MODEL_TRAINER_SEARCH_RANDOM_STATE: int = 42
+
+# early stopping of the estimators supporting it, such as XGBClassifier, with the backends other than grid,
+# 0 keeps it off so that n_estimators is searched like the other parameters
+MODEL_TRAINER_EARLY_STOPPING_ROUNDS: int = 0
+
+MODEL_TRAINER_EARLY_STOPPING_VALIDATION_SIZE: float = 0.2
+
+# search the model families of the model config concurrently, one process each, off until
+# scripts/bench_parallel_families.py shows a gain on the training machine
+MODEL_TRAINER_PARALLEL_FAMILIES: bool = False
+
+# model serial number -> cores of its search, families not listed share the remaining cores evenly
+MODEL_TRAINER_FAMILY_N_JOBS: dict = {}
+
 """
 MODEL Evauation related constant start with MODEL_EVALUATION var name
 """
@@ -123,3 +236,72 @@ MODEL_PUSHER_BENTOML_SERVICE_NAME: str = "phising_model_service"
 MODEL_PUSHER_BENTOML_MODEL_IMAGE: str = "phisingimage"
 
 MODEL_PUSHER_MODEL_ECR_URI: str = ""
+
+# push the production model as a slim serving model of npz files instead of the pickled mlflow model
+MODEL_PUSHER_SLIM_SERVING_MODEL: bool = True
+
+# random rows the slim serving model must predict the same as the mlflow model on
+MODEL_PUSHER_SERVING_MODEL_CHECK_ROWS: int = 4096
+
+"""
+Stage cache related constant start with STAGE_CACHE var name
+"""
+STAGE_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "stage_cache")
+
+STAGE_CACHE_CONFIG_DIR: str = "config"
+
+# cache the stage artifacts of every run, runs with --resume or --from-stage cache them either way
+STAGE_CACHE_ENABLED: bool = False
+
+STAGE_CACHE_UNHASHED_CONSTANTS: list = [
+    "TIMESTAMP",
+    "STAGE_CACHE_ENABLED",
+    "EXP_NAME",
+    "DAG_MAX_WORKERS",
+    "INSTRUMENTATION_SAMPLE_INTERVAL",
+    "INSTRUMENTATION_REPORT_FILE_NAME",
+    "MODEL_SERVICE_MAX_BATCH_SIZE",
+    "MODEL_SERVICE_MAX_LATENCY_MS",
+    "MODEL_SERVICE_CACHE_ENABLED",
+    "MODEL_SERVICE_CACHE_MAX_SIZE",
+    "MODEL_SERVICE_CACHE_TTL_SECONDS",
+]
+
+STAGE_CACHE_STAGES: list = [
+    "data_ingestion",
+    "data_validation",
+    "data_transformation",
+    "model_trainer",
+    "model_evaluation",
+    "model_pusher",
+]
+
+"""
+DAG related constant start with DAG var name
+"""
+DAG_MAX_WORKERS: int = 4
+
+"""
+Instrumentation related constant start with INSTRUMENTATION var name
+"""
+INSTRUMENTATION_SAMPLE_INTERVAL: float = 0.05
+
+INSTRUMENTATION_REPORT_FILE_NAME: str = "run_report.json"
+
+"""
+Model service related constant start with MODEL_SERVICE var name
+"""
+# concatenate concurrent classify requests along the row axis into one runner call
+MODEL_SERVICE_BATCHABLE: bool = True
+
+MODEL_SERVICE_BATCH_DIM: int = 0
+
+MODEL_SERVICE_MAX_BATCH_SIZE: int = 512
+
+MODEL_SERVICE_MAX_LATENCY_MS: int = 100
+
+MODEL_SERVICE_CACHE_ENABLED: bool = True
+
+MODEL_SERVICE_CACHE_MAX_SIZE: int = 100000
+
+MODEL_SERVICE_CACHE_TTL_SECONDS: float = 3600.0
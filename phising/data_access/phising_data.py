@@ -1,11 +1,104 @@
 import os
 import sys
-from typing import List, Tuple
+from typing import Dict, List, Tuple, Union
 
 import pandas as pd
 
 from phising.exception import PhisingException
 
+# the phising features and the target are -1, 0 or 1 codes, so INTEGER columns are stored as int8. Arrow columns
+# are nullable, a missing value is written as null and read back as NaN in a float64 column
+ARROW_COLUMN_TYPES: Dict[str, str] = {"INTEGER": "int8"}
+
+
+class ArtifactWriter:
+    """
+    Appends dataframes to a data artifact in csv, parquet or arrow (IPC file) format.
+
+    parquet and arrow files are written with a typed schema built from the ColName section of the training
+    schema, one row group or record batch per appended dataframe.
+    """
+
+    def __init__(
+        self, file_path: str, artifact_format: str, column_types: Dict[str, str]
+    ):
+        self.file_path = file_path
+
+        self.artifact_format = artifact_format
+
+        self.column_types = column_types
+
+        self.writer = None
+
+        self.schema = None
+
+    def get_arrow_schema(self, columns: List[str]):
+        import pyarrow as pa
+
+        return pa.schema(
+            [
+                (
+                    col,
+                    pa.type_for_alias(
+                        ARROW_COLUMN_TYPES.get(self.column_types.get(col), "float64")
+                    ),
+                )
+                for col in columns
+            ]
+        )
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        try:
+            if self.artifact_format == "csv":
+                if self.writer is None:
+                    self.writer = open(self.file_path, "w", newline="")
+
+                    dataframe.to_csv(self.writer, index=False, header=True)
+
+                else:
+                    dataframe.to_csv(self.writer, index=False, header=False)
+
+                return
+
+            import pyarrow as pa
+
+            if self.writer is None:
+                self.schema = self.get_arrow_schema(list(dataframe.columns))
+
+                if self.artifact_format == "parquet":
+                    import pyarrow.parquet as pq
+
+                    self.writer = pq.ParquetWriter(self.file_path, self.schema)
+
+                elif self.artifact_format == "arrow":
+                    self.writer = pa.ipc.new_file(self.file_path, self.schema)
+
+                else:
+                    raise ValueError(f"Unknown artifact format {self.artifact_format}")
+
+            self.writer.write_table(
+                pa.Table.from_pandas(
+                    dataframe, schema=self.schema, preserve_index=False
+                )
+            )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def close(self) -> None:
+        try:
+            if self.writer is not None:
+                self.writer.close()
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
 
 class PhisingData:
     def __init__(self):
@@ -28,3 +121,41 @@ class PhisingData:
 
         except Exception as e:
             raise PhisingException(e, sys)
+
+    def read_artifact(
+        self, file_path: str, columns: Union[List[str], None] = None
+    ) -> pd.DataFrame:
+        """
+        Reads a data artifact written by ArtifactWriter, the format is taken from the file extension.
+
+        parquet and arrow files are memory mapped, arrow record batches are read without copying them.
+        """
+        try:
+            artifact_format: str = os.path.splitext(file_path)[1].lstrip(".")
+
+            if artifact_format == "csv":
+                return pd.read_csv(file_path, usecols=columns)
+
+            if artifact_format == "parquet":
+                import pyarrow.parquet as pq
+
+                table = pq.read_table(file_path, columns=columns, memory_map=True)
+
+            elif artifact_format == "arrow":
+                import pyarrow as pa
+
+                with pa.memory_map(file_path, "r") as source:
+                    table = pa.ipc.open_file(source).read_all()
+
+                    if columns is not None:
+                        table = table.select(columns)
+
+                    return table.to_pandas()
+
+            else:
+                raise ValueError(f"Unknown artifact format {artifact_format}")
+
+            return table.to_pandas()
+
+        except Exception as e:
+            raise PhisingException(e, sys)
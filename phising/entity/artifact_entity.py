@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Iterator, List, Union
 
 from phising.entity.config_entity import MLFlowModelInfo
 
@@ -8,6 +8,8 @@ from phising.entity.config_entity import MLFlowModelInfo
 class DataIngestionArtifact:
     feature_store_folder_path: str
 
+    batch_files: Union[Iterator[str], None] = field(default=None, repr=False)
+
 
 @dataclass
 class DataValidationArtifact:
@@ -19,6 +21,10 @@ class DataValidationArtifact:
 
     testing_file_path: str
 
+    manifest_file_path: str
+
+    train_file_index_path: str
+
 
 @dataclass
 class DataTransformationArtifact:
@@ -28,6 +34,8 @@ class DataTransformationArtifact:
 
     transformed_test_file_path: str
 
+    train_file_index_path: str
+
 
 @dataclass
 class ClassificationMetricArtifact:
@@ -44,6 +52,14 @@ class ModelTrainerArtifact:
 
     best_model_name: str
 
+    cv_results_file_path: str
+
+    training_mode: str
+
+    compiled_model_file_path: Union[str, None] = None
+
+    state_file_path: Union[str, None] = None
+
 
 @dataclass
 class ModelEvaluationArtifact:
@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from datetime import datetime
 
 from phising.constant import training_pipeline
+from phising.utils.main_utils import get_n_cores
 
 
 class TrainingPipelineConfig:
@@ -35,6 +36,21 @@ class DataIngestionConfig:
             self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR
         )
 
+        self.data_ingestion_cache_dir: str = training_pipeline.DATA_INGESTION_CACHE_DIR
+
+        self.data_ingestion_watermark_file_path: str = os.path.join(
+            self.data_ingestion_cache_dir,
+            training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME,
+        )
+
+        self.data_ingestion_routing_mode: str = (
+            training_pipeline.DATA_INGESTION_ROUTING_MODE
+        )
+
+        self.data_ingestion_streaming_mode: bool = (
+            training_pipeline.DATA_INGESTION_STREAMING_MODE
+        )
+
 
 class DataValidationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -61,6 +77,37 @@ class DataValidationConfig:
             training_pipeline.DATA_VALIDATION_TEST_SIZE
         )
 
+        self.data_validation_n_workers: int = (
+            get_n_cores()
+            if training_pipeline.DATA_VALIDATION_N_WORKERS == -1
+            else training_pipeline.DATA_VALIDATION_N_WORKERS
+        )
+
+        self.data_validation_chunk_size: int = (
+            training_pipeline.DATA_VALIDATION_CHUNK_SIZE
+        )
+
+        self.data_validation_split_seed: str = (
+            training_pipeline.DATA_VALIDATION_SPLIT_SEED
+        )
+
+        self.data_validation_routing_mode: str = (
+            training_pipeline.DATA_VALIDATION_ROUTING_MODE
+        )
+
+        self.data_validation_manifest_file_path: str = os.path.join(
+            self.data_validation_dir,
+            training_pipeline.DATA_VALIDATION_MANIFEST_FILE_NAME,
+        )
+
+        self.data_validation_cache_file_path: str = (
+            training_pipeline.DATA_VALIDATION_CACHE_FILE_PATH
+        )
+
+        self.data_validation_artifact_format: str = (
+            training_pipeline.DATA_VALIDATION_ARTIFACT_FORMAT
+        )
+
         self.merged_file_path: str = os.path.join(
             self.data_validation_dir,
             training_pipeline.DATA_VALIDATION_TRAIN_COMPRESSED_FILE_PATH,
@@ -76,6 +123,11 @@ class DataValidationConfig:
             training_pipeline.DATA_VALIDATION_TEST_FILE_PATH,
         )
 
+        self.train_file_index_path: str = os.path.join(
+            self.data_validation_dir,
+            training_pipeline.DATA_VALIDATION_TRAIN_FILE_INDEX_FILE_NAME,
+        )
+
 
 class DataTransformationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -89,6 +141,10 @@ class DataTransformationConfig:
             training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
         )
 
+        self.imputer_strategy: str = (
+            training_pipeline.DATA_TRANSFORMATION_IMPUTER_STRATEGY
+        )
+
         self.transformed_object_file_path: str = os.path.join(
             self.data_transformation_dir,
             training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
@@ -131,6 +187,66 @@ class ModelTrainerConfig:
             training_pipeline.MODEL_TRAINER_MODEL_METRIC_KEY
         )
 
+        self.mmap_mode: str = training_pipeline.MODEL_TRAINER_MMAP_MODE
+
+        self.cv_results_file_path: str = os.path.join(
+            self.model_trainer_dir, training_pipeline.MODEL_TRAINER_CV_RESULTS_FILE_NAME
+        )
+
+        self.compile_best_model: bool = training_pipeline.MODEL_TRAINER_COMPILE_BEST_MODEL
+
+        self.compiled_model_file_path: str = os.path.join(
+            self.best_model_file_dir,
+            training_pipeline.MODEL_TRAINER_COMPILED_MODEL_FILE_NAME,
+        )
+
+        self.search_backend: str = training_pipeline.MODEL_TRAINER_SEARCH_BACKEND
+
+        self.search_n_candidates: int = (
+            training_pipeline.MODEL_TRAINER_SEARCH_N_CANDIDATES
+        )
+
+        self.search_halving_factor: int = (
+            training_pipeline.MODEL_TRAINER_SEARCH_HALVING_FACTOR
+        )
+
+        self.search_random_state: int = (
+            training_pipeline.MODEL_TRAINER_SEARCH_RANDOM_STATE
+        )
+
+        self.early_stopping_rounds: int = (
+            training_pipeline.MODEL_TRAINER_EARLY_STOPPING_ROUNDS
+        )
+
+        self.early_stopping_validation_size: float = (
+            training_pipeline.MODEL_TRAINER_EARLY_STOPPING_VALIDATION_SIZE
+        )
+
+        self.parallel_families: bool = training_pipeline.MODEL_TRAINER_PARALLEL_FAMILIES
+
+        self.family_n_jobs: dict = training_pipeline.MODEL_TRAINER_FAMILY_N_JOBS
+
+        self.training_mode: str = training_pipeline.MODEL_TRAINER_TRAINING_MODE
+
+        self.full_search_interval_days: int = (
+            training_pipeline.MODEL_TRAINER_FULL_SEARCH_INTERVAL_DAYS
+        )
+
+        self.drift_psi_threshold: float = (
+            training_pipeline.MODEL_TRAINER_DRIFT_PSI_THRESHOLD
+        )
+
+        self.warm_start_n_estimators: int = (
+            training_pipeline.MODEL_TRAINER_WARM_START_N_ESTIMATORS
+        )
+
+        self.state_file_path: str = training_pipeline.MODEL_TRAINER_STATE_FILE_PATH
+
+        self.candidate_state_file_path: str = os.path.join(
+            self.model_trainer_dir,
+            training_pipeline.MODEL_TRAINER_CANDIDATE_STATE_FILE_NAME,
+        )
+
 
 class ModelEvaluationConfig:
     def __init__(self):
@@ -167,6 +283,10 @@ class ModelPusherConfig:
             training_pipeline.MODEL_PUSHER_BENTOML_MODEL_IMAGE
         )
 
+        self.model_trainer_state_file_path: str = (
+            training_pipeline.MODEL_TRAINER_STATE_FILE_PATH
+        )
+
 
 @dataclass
 class MLFlowModelInfo:
@@ -1,18 +1,30 @@
 import logging
+import multiprocessing
 import os
 
 from phising.constant.training_pipeline import TIMESTAMP
 
+LOG_FORMAT: str = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
+
 LOG_FILE: str = f"{TIMESTAMP}.log"
 
 logs_path = os.path.join(os.getcwd(), "logs", TIMESTAMP)
 
-os.makedirs(logs_path, exist_ok=True)
-
 LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+
+def configure_logging(log_file_path: str) -> None:
+    """
+    Points logging at log_file_path. Worker pools pass it as their initializer with the LOG_FILE_PATH of the
+    parent process, so the workers log into the log file of the run.
+    """
+    os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+
+    logging.basicConfig(
+        filename=log_file_path, format=LOG_FORMAT, level=logging.INFO, force=True
+    )
+
+
+# spawned workers import this module again with a TIMESTAMP of their own, their pool initializer sets up logging
+if multiprocessing.current_process().name == "MainProcess":
+    configure_logging(LOG_FILE_PATH)
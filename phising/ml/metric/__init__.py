@@ -1,6 +1,8 @@
 import sys
 
+import numpy as np
 import pandas as pd
+from scipy.stats import rankdata
 from sklearn.base import BaseEstimator
 from sklearn.metrics import roc_auc_score
 
@@ -20,3 +22,54 @@ def calculate_metric(
 
     except Exception as e:
         raise PhisingException(e, sys)
+
+
+def calculate_roc_auc_scores(y: np.ndarray, y_scores: np.ndarray) -> np.ndarray:
+    """
+    Computes the ROC-AUC of every row of y_scores, one row of scores or predictions per model, against the
+    binary targets y in one pass, from the Mann-Whitney rank sum of the positive class. Tied scores get their
+    average rank, which gives the same values as roc_auc_score.
+    """
+    try:
+        y: np.ndarray = np.asarray(y).ravel()
+
+        classes: np.ndarray = np.unique(y)
+
+        if len(classes) != 2:
+            raise ValueError(
+                f"ROC-AUC needs exactly two target classes, got {classes.tolist()}"
+            )
+
+        positive: np.ndarray = y == classes[1]
+
+        n_positive: int = int(positive.sum())
+
+        n_negative: int = len(y) - n_positive
+
+        ranks: np.ndarray = rankdata(np.atleast_2d(y_scores), axis=1)
+
+        return (
+            ranks[:, positive].sum(axis=1) - n_positive * (n_positive + 1) / 2
+        ) / (n_positive * n_negative)
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
+def calculate_psi(
+    expected: np.ndarray, actual: np.ndarray, eps: float = 1e-4
+) -> np.ndarray:
+    """
+    Computes the population stability index of every row of actual against the same row of expected, each row
+    holding the shares of the values of one column. Shares are clipped to eps so empty values do not divide
+    by zero.
+    """
+    try:
+        expected: np.ndarray = np.clip(np.asarray(expected, dtype=np.float64), eps, None)
+
+        actual: np.ndarray = np.clip(np.asarray(actual, dtype=np.float64), eps, None)
+
+        return ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+    except Exception as e:
+        raise PhisingException(e, sys)
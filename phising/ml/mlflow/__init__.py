@@ -131,3 +131,55 @@ class MLFLowOperation:
 
         except Exception as e:
             raise PhisingException(e, sys)
+
+    def load_model(self, model_info: MLFlowModelInfo) -> phisingModel:
+        """
+        Loads a registered model back as the phisingModel it was logged from.
+        """
+        logging.info("Entered load_model method of MLFLowOperation class")
+
+        try:
+            pyfunc_model = mlflow.pyfunc.load_model(model_uri=model_info.model_uri)
+
+            # unwrap_python_model is missing from older mlflow releases
+            if hasattr(pyfunc_model, "unwrap_python_model"):
+                model: phisingModel = pyfunc_model.unwrap_python_model()
+
+            else:
+                model: phisingModel = pyfunc_model._model_impl.python_model
+
+            logging.info(
+                f"Loaded {model_info.model_name} version {model_info.model_version} from {model_info.model_uri}"
+            )
+
+            logging.info("Exited load_model method of MLFLowOperation class")
+
+            return model
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def log_run_report(self, run_report: Dict, run_report_file_path: str) -> None:
+        """
+        Logs the run report of the training pipeline as an artifact of its own MLflow run, with the wall time,
+        cpu time and peak rss of every stage as metrics, so they can be compared across retrains.
+        """
+        logging.info("Entered log_run_report method of MLFLowOperation class")
+
+        try:
+            with mlflow.start_run(run_name=training_pipeline.EXP_NAME + "-run-report"):
+                mlflow.log_artifact(local_path=run_report_file_path)
+
+                for stage in run_report["stages"]:
+                    for metric in ("wall_seconds", "cpu_seconds", "peak_rss_mb"):
+                        if stage[metric] is not None:
+                            mlflow.log_metric(
+                                key=f"{stage['name']}.{metric}", value=stage[metric]
+                            )
+
+            logging.info(f"Logged run report {run_report_file_path} to MLflow")
+
+            logging.info("Exited log_run_report method of MLFLowOperation class")
+
+        except Exception as e:
+            raise PhisingException(e, sys)
@@ -0,0 +1,396 @@
+import json
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from phising.exception import PhisingException
+
+# number of rows evaluated at once, the node index matrix of a chunk has chunk rows times number of trees entries
+CHUNK_ROWS: int = 256
+
+
+class CompiledForest:
+    """
+    Fitted RandomForestClassifier or binary XGBClassifier compiled into flat NumPy arrays.
+
+    The nodes of all trees are stored in one set of arrays, node features, thresholds, left and right children,
+    whether missing values go left and leaf values. Leaves point to themselves as both children, so a batch of
+    rows walks every tree at once, one level per step, with no Python loop over trees. A row goes left when its
+    float32 value is at most the float32 threshold. The float64 thresholds of scikit-learn are rounded down to
+    float32, which keeps the comparison exact for float32 values. XGBoost splits on value < threshold, so its
+    float32 thresholds are stored as the next float32 value down.
+
+    A random forest predicts the class with the highest mean leaf probability, an XGBoost model the positive
+    class when the logistic of its margin is above 0.5. The leaf values are summed in tree order in the dtype
+    of the original model, so the predictions agree with the ones of the original model. The probabilities of a
+    random forest are identical to the ones it gives with n_jobs=1. With n_jobs > 1 scikit-learn adds up the
+    trees of every thread in the order the threads finish, so its probabilities can differ in the last bits.
+    The ones of XGBoost can differ in the last bit, as its logistic uses the expf of the C library.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        missing_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        classes: np.ndarray,
+        base_margin: float = 0.0,
+    ):
+        self.kind = kind
+
+        self.feature = feature
+
+        self.threshold = threshold
+
+        self.left = left
+
+        self.right = right
+
+        self.missing_left = missing_left
+
+        self.value = value
+
+        self.roots = roots
+
+        self.max_depth = max_depth
+
+        self.classes = classes
+
+        self.base_margin = base_margin
+
+        # evaluation layout, the children of node i at 2 * i (left) and 2 * i + 1 (right)
+        self.children: np.ndarray = np.stack([left, right], axis=1).ravel().astype(np.intp)
+
+        self.node_feature: np.ndarray = feature.astype(np.intp)
+
+    @classmethod
+    def from_model(cls, model: object) -> "CompiledForest":
+        try:
+            if hasattr(model, "get_booster"):
+                return cls.from_xgboost(model)
+
+            if hasattr(model, "estimators_"):
+                return cls.from_random_forest(model)
+
+            raise Exception(f"Can not compile {type(model).__name__}")
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @staticmethod
+    def concat_trees(
+        trees: List[Tuple[np.ndarray, ...]]
+    ) -> Tuple[np.ndarray, ...]:
+        """
+        Concatenates the (feature, threshold, left, right, missing_left, value) arrays of the trees, leaves
+        having -1 as children, into global arrays where leaves point to themselves.
+        """
+        offsets: np.ndarray = np.cumsum([0] + [len(tree[0]) for tree in trees])
+
+        feature, threshold, left, right, missing_left, value = (
+            np.concatenate(arrays) for arrays in zip(*trees)
+        )
+
+        node_offsets: np.ndarray = np.repeat(offsets[:-1], [len(t[0]) for t in trees])
+
+        is_leaf: np.ndarray = left < 0
+
+        nodes: np.ndarray = np.arange(len(feature))
+
+        left = np.where(is_leaf, nodes, left + node_offsets).astype(np.int32)
+
+        right = np.where(is_leaf, nodes, right + node_offsets).astype(np.int32)
+
+        feature = np.where(is_leaf, 0, feature).astype(np.int32)
+
+        return feature, threshold, left, right, missing_left, value, offsets[:-1]
+
+    @staticmethod
+    def round_down_float32(threshold: np.ndarray) -> np.ndarray:
+        threshold32: np.ndarray = threshold.astype(np.float32)
+
+        return np.where(
+            threshold32 > threshold,
+            np.nextafter(threshold32, np.float32(-np.inf)),
+            threshold32,
+        )
+
+    @staticmethod
+    def get_tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+        depth: np.ndarray = np.zeros(len(left), dtype=np.int64)
+
+        # children always come after their parent in both sklearn and xgboost trees
+        for node in range(len(left)):
+            if left[node] >= 0:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+
+        return int(depth.max())
+
+    @classmethod
+    def from_random_forest(cls, model: object) -> "CompiledForest":
+        from sklearn import __version__ as sklearn_version
+
+        trees: List[Tuple[np.ndarray, ...]] = []
+
+        max_depth: int = 0
+
+        # trees store leaf class fractions from scikit-learn 1.4, class counts before that
+        normalize: bool = tuple(int(v) for v in sklearn_version.split(".")[:2]) < (1, 4)
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+
+            value: np.ndarray = tree.value[:, 0, : model.n_classes_].astype(np.float64)
+
+            if normalize:
+                normalizer: np.ndarray = value.sum(axis=1)[:, None]
+
+                normalizer[normalizer == 0.0] = 1.0
+
+                value = value / normalizer
+
+            missing_left: np.ndarray = (
+                np.asarray(tree.missing_go_to_left, dtype=bool)
+                if hasattr(tree, "missing_go_to_left")
+                else np.zeros(tree.node_count, dtype=bool)
+            )
+
+            trees.append(
+                (
+                    tree.feature.astype(np.int64),
+                    cls.round_down_float32(tree.threshold),
+                    tree.children_left.astype(np.int64),
+                    tree.children_right.astype(np.int64),
+                    missing_left,
+                    value,
+                )
+            )
+
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature, threshold, left, right, missing_left, value, roots = cls.concat_trees(
+            trees
+        )
+
+        return cls(
+            kind="random_forest",
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            missing_left=missing_left,
+            value=value,
+            roots=roots.astype(np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+        )
+
+    @classmethod
+    def from_xgboost(cls, model: object) -> "CompiledForest":
+        dump: Dict = json.loads(model.get_booster().save_raw("json"))
+
+        learner: Dict = dump["learner"]
+
+        if learner["objective"]["name"] != "binary:logistic":
+            raise Exception(
+                f"Can not compile an XGBoost model with objective {learner['objective']['name']}"
+            )
+
+        tree_dumps: List[Dict] = learner["gradient_booster"]["model"]["trees"]
+
+        try:
+            n_trees: int = model.best_iteration + 1
+
+        except AttributeError:
+            n_trees: int = len(tree_dumps)
+
+        trees: List[Tuple[np.ndarray, ...]] = []
+
+        max_depth: int = 0
+
+        for tree_dump in tree_dumps[:n_trees]:
+            left: np.ndarray = np.asarray(tree_dump["left_children"], dtype=np.int64)
+
+            right: np.ndarray = np.asarray(tree_dump["right_children"], dtype=np.int64)
+
+            split_condition: np.ndarray = np.asarray(
+                tree_dump["split_conditions"], dtype=np.float32
+            )
+
+            # x < t is x <= the float32 just below t, for float32 x
+            threshold: np.ndarray = np.nextafter(split_condition, np.float32(-np.inf))
+
+            trees.append(
+                (
+                    np.asarray(tree_dump["split_indices"], dtype=np.int64),
+                    threshold,
+                    left,
+                    right,
+                    np.asarray(tree_dump["default_left"], dtype=bool),
+                    split_condition[:, None],
+                )
+            )
+
+            max_depth = max(max_depth, cls.get_tree_depth(left, right))
+
+        feature, threshold, left, right, missing_left, value, roots = cls.concat_trees(
+            trees
+        )
+
+        base_score: np.float32 = np.float32(
+            learner["learner_model_param"]["base_score"].strip("[]")
+        )
+
+        # margin of the base score, as xgboost computes it for the logistic objective
+        base_margin: np.float32 = -np.log(
+            np.float32(1.0) / base_score - np.float32(1.0), dtype=np.float32
+        )
+
+        return cls(
+            kind="xgboost",
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            missing_left=missing_left,
+            value=value,
+            roots=roots.astype(np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(getattr(model, "classes_", np.arange(2))),
+            base_margin=float(base_margin),
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Gives the leaf every row of X falls in, for every tree, as global node indices of shape (rows, trees).
+        """
+        nodes: np.ndarray = np.tile(self.roots.astype(np.intp), (len(X), 1))
+
+        # offset of every row in the flattened X
+        row_offsets: np.ndarray = np.arange(len(X), dtype=np.intp)[:, None] * X.shape[1]
+
+        flat_x: np.ndarray = X.ravel()
+
+        has_nan: bool = bool(np.isnan(flat_x).any())
+
+        for _ in range(self.max_depth):
+            x: np.ndarray = flat_x[row_offsets + self.node_feature[nodes]]
+
+            go_right: np.ndarray = x > self.threshold[nodes]
+
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.missing_left[nodes]
+
+            nodes = self.children[2 * nodes + go_right]
+
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        try:
+            X: np.ndarray = np.ascontiguousarray(np.atleast_2d(X), dtype=np.float32)
+
+            if self.kind == "random_forest":
+                proba: np.ndarray = np.empty((len(X), self.value.shape[1]))
+
+            else:
+                proba: np.ndarray = np.empty((len(X), 2), dtype=np.float32)
+
+            for start in range(0, len(X), CHUNK_ROWS):
+                leaves: np.ndarray = self.apply(X[start : start + CHUNK_ROWS])
+
+                if self.kind == "random_forest":
+                    # accumulated in tree order and then averaged, as RandomForestClassifier.predict_proba does
+                    proba[start : start + CHUNK_ROWS] = (
+                        np.add.accumulate(self.value[leaves], axis=1)[:, -1]
+                        / len(self.roots)
+                    )
+
+                else:
+                    margin: np.ndarray = np.add.accumulate(
+                        np.concatenate(
+                            [
+                                np.full((len(leaves), 1), self.base_margin, np.float32),
+                                self.value[leaves, 0],
+                            ],
+                            axis=1,
+                        ),
+                        axis=1,
+                        dtype=np.float32,
+                    )[:, -1]
+
+                    # the logistic of xgboost, with expf taken in float64 and rounded, which matches the expf
+                    # of the C library in all but rare last bit cases
+                    positive: np.ndarray = np.float32(1.0) / (
+                        np.exp(
+                            np.minimum(-margin, np.float32(88.7)).astype(np.float64)
+                        ).astype(np.float32)
+                        + np.float32(1.0)
+                    )
+
+                    proba[start : start + CHUNK_ROWS, 1] = positive
+
+                    proba[start : start + CHUNK_ROWS, 0] = np.float32(1.0) - positive
+
+            return proba
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        proba: np.ndarray = self.predict_proba(X)
+
+        if self.kind == "random_forest":
+            return self.classes.take(np.argmax(proba, axis=1))
+
+        return self.classes.take((proba[:, 1] > 0.5).astype(np.int64))
+
+    def save(self, file_path: str) -> None:
+        """
+        Saves the arrays of the compiled model into an uncompressed npz file, which loads without pickle.
+        """
+        try:
+            np.savez(
+                file_path,
+                kind=np.asarray(self.kind),
+                feature=self.feature,
+                threshold=self.threshold,
+                left=self.left,
+                right=self.right,
+                missing_left=self.missing_left,
+                value=self.value,
+                roots=self.roots,
+                max_depth=np.asarray(self.max_depth),
+                classes=self.classes,
+                base_margin=np.asarray(self.base_margin),
+            )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @classmethod
+    def load(cls, file_path: str) -> "CompiledForest":
+        try:
+            with np.load(file_path, allow_pickle=False) as data:
+                return cls(
+                    kind=str(data["kind"]),
+                    feature=data["feature"],
+                    threshold=data["threshold"],
+                    left=data["left"],
+                    right=data["right"],
+                    missing_left=data["missing_left"],
+                    value=data["value"],
+                    roots=data["roots"],
+                    max_depth=int(data["max_depth"]),
+                    classes=data["classes"],
+                    base_margin=float(data["base_margin"]),
+                )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
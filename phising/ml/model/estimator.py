@@ -1,5 +1,8 @@
+import copy
 import sys
+from typing import Dict, List, Union
 
+import numpy as np
 from mlflow.pyfunc import PythonModel
 from pandas import DataFrame
 from sklearn.pipeline import Pipeline
@@ -8,18 +11,152 @@ from phising.exception import PhisingException
 
 
 class phisingModel(PythonModel):
-    def __init__(self, preprocessing_object: Pipeline, trained_model_object: object):
+    """
+    Imputation pipeline and trained model logged to MLflow as one pyfunc model.
+
+    Inference runs on NumPy arrays only. The column order of the preprocessing object is checked against
+    feature_names once, when the model is loaded, and the preprocessing object is then used without its
+    feature names, so no DataFrame is built and no column names are checked per call. A DataFrame input is
+    put in feature_names order and converted to an array first.
+    """
+
+    def __init__(
+        self,
+        preprocessing_object: Pipeline,
+        trained_model_object: object,
+        feature_names: Union[List[str], None] = None,
+    ):
         self.preprocessing_object = preprocessing_object
 
         self.trained_model_object = trained_model_object
 
-    def predict(self, context, dataframe: DataFrame) -> DataFrame:
+        self.feature_names = feature_names
+
+        self.numpy_preprocessing_object = None
+
+    def __getstate__(self) -> Dict:
+        state: Dict = self.__dict__.copy()
+
+        # rebuilt from the preprocessing object when the model is loaded
+        state["numpy_preprocessing_object"] = None
+
+        return state
+
+    def load_context(self, context) -> None:
+        self.prepare_numpy_path()
+
+    def prepare_numpy_path(self) -> None:
+        """
+        Validates the column order of the preprocessing object against feature_names and builds a copy of it
+        without feature names, sharing the fitted arrays of the original.
+        """
         try:
-            transformed_feature = self.preprocessing_object.transform(dataframe)
+            fitted_names: Union[np.ndarray, None] = getattr(
+                self.preprocessing_object, "feature_names_in_", None
+            )
+
+            if getattr(self, "feature_names", None) is None:
+                self.feature_names = (
+                    None if fitted_names is None else list(fitted_names)
+                )
+
+            elif fitted_names is not None and list(fitted_names) != list(
+                self.feature_names
+            ):
+                raise Exception(
+                    f"Preprocessing object was fitted on columns {list(fitted_names)}, expected {list(self.feature_names)}"
+                )
+
+            steps: List = []
+
+            for name, step in self.preprocessing_object.steps:
+                step = copy.copy(step)
+
+                if hasattr(step, "feature_names_in_"):
+                    del step.feature_names_in_
+
+                steps.append((name, step))
+
+            self.numpy_preprocessing_object = Pipeline(steps)
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def to_features(self, X: Union[DataFrame, np.ndarray]) -> np.ndarray:
+        """
+        Gives the rows of X as a contiguous 2d array in feature_names order. A single row may be a 1d array.
+        """
+        if isinstance(X, DataFrame):
+            X = X[self.feature_names] if self.feature_names is not None else X
+
+            X = X.to_numpy()
+
+        X: np.ndarray = np.ascontiguousarray(X)
+
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if self.feature_names is not None and X.shape[1] != len(self.feature_names):
+            raise Exception(
+                f"Expected {len(self.feature_names)} features per row, got {X.shape[1]}"
+            )
+
+        return X
+
+    def impute(self, features: np.ndarray) -> np.ndarray:
+        """
+        Runs the preprocessing object only on the rows having missing values, returning float32 features.
+
+        The preprocessing object is an imputation pipeline, which leaves complete rows unchanged, so complete
+        rows are passed on to the model as they are. Integer arrays, such as int8 ones, can not hold missing
+        values and are not checked at all. The trees of the models split on float32 values, so float32
+        features give the same predictions as float64 ones.
+        """
+        try:
+            # models pickled before the numpy path existed do not have the attribute
+            if getattr(self, "numpy_preprocessing_object", None) is None:
+                self.prepare_numpy_path()
+
+            if features.dtype.kind in "iub":
+                return features.astype(np.float32)
+
+            features = features.astype(np.float64, copy=False)
+
+            incomplete_rows: np.ndarray = np.isnan(features).any(axis=1)
+
+            if not incomplete_rows.any():
+                return features.astype(np.float32)
+
+            if incomplete_rows.all():
+                return np.asarray(
+                    self.numpy_preprocessing_object.transform(features), dtype=np.float32
+                )
+
+            features = features.astype(np.float32)
+
+            features[incomplete_rows] = self.numpy_preprocessing_object.transform(
+                features[incomplete_rows].astype(np.float64)
+            )
+
+            return features
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def predict(self, context, dataframe: Union[DataFrame, np.ndarray]) -> np.ndarray:
+        """
+        Predicts every row of dataframe independently of the others, so the rows of several requests can be
+        batched into one call and the predictions split back by row. A single row may be given as a 1d array.
+        """
+        try:
+            if getattr(self, "numpy_preprocessing_object", None) is None:
+                self.prepare_numpy_path()
+
+            transformed_feature: np.ndarray = self.impute(self.to_features(dataframe))
 
             preds = self.trained_model_object.predict(transformed_feature)
 
-            return preds
+            return np.asarray(preds).reshape(len(transformed_feature))
 
         except Exception as e:
             raise PhisingException(e, sys)
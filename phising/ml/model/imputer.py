@@ -0,0 +1,128 @@
+import sys
+
+import numpy as np
+from pandas import DataFrame
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from phising.exception import PhisingException
+
+
+class NearestPatternImputer(TransformerMixin, BaseEstimator):
+    """
+    Nearest neighbour imputer for the ternary phising features.
+
+    The training rows are reduced to their distinct feature patterns and the number of rows having each
+    pattern. Incomplete training rows are first filled from the complete ones, so they still count as
+    neighbours for the columns they do have. Incomplete rows are compared with the patterns only, over
+    their observed columns, in chunks bounded by working_memory (MiB), so the cost grows with the number of
+    distinct patterns instead of the number of training rows. A missing value is filled with the mean of the
+    n_neighbors nearest training rows, as KNNImputer with uniform weights does.
+    """
+
+    def __init__(self, n_neighbors: int = 3, working_memory: int = 64):
+        self.n_neighbors = n_neighbors
+
+        self.working_memory = working_memory
+
+    def fit(self, X, y=None):
+        try:
+            if isinstance(X, DataFrame):
+                self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+
+            X: np.ndarray = np.asarray(X, dtype=np.float64)
+
+            self.n_features_in_ = X.shape[1]
+
+            complete: np.ndarray = X[~np.isnan(X).any(axis=1)]
+
+            self.patterns_, self.pattern_counts_ = np.unique(
+                complete, axis=0, return_counts=True
+            )
+
+            self.modes_ = np.array(
+                [
+                    DataFrame(X[:, i]).mode(dropna=True).iloc[0, 0]
+                    if not np.isnan(X[:, i]).all()
+                    else 0.0
+                    for i in range(X.shape[1])
+                ]
+            )
+
+            if len(complete) < len(X):
+                self.patterns_, self.pattern_counts_ = np.unique(
+                    self.transform(X), axis=0, return_counts=True
+                )
+
+            return self
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def _impute_rows(self, X: np.ndarray, nan_mask: np.ndarray) -> np.ndarray:
+        k: int = min(self.n_neighbors, len(self.patterns_))
+
+        X0: np.ndarray = np.where(nan_mask, 0.0, X)
+
+        # squared euclidean distance over the observed columns of each row
+        dist: np.ndarray = (
+            (X0**2).sum(axis=1)[:, None]
+            - 2 * X0 @ self.patterns_.T
+            + (~nan_mask).astype(np.float64) @ (self.patterns_**2).T
+        )
+
+        idx: np.ndarray = np.argpartition(dist, k - 1, axis=1)[:, :k]
+
+        idx = np.take_along_axis(
+            idx, np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1), axis=1
+        )
+
+        counts: np.ndarray = self.pattern_counts_[idx]
+
+        weights: np.ndarray = np.clip(
+            self.n_neighbors - (np.cumsum(counts, axis=1) - counts), 0, counts
+        )
+
+        means: np.ndarray = (self.patterns_[idx] * weights[:, :, None]).sum(
+            axis=1
+        ) / weights.sum(axis=1)[:, None]
+
+        return np.where(nan_mask, means, X)
+
+    def transform(self, X) -> np.ndarray:
+        try:
+            X: np.ndarray = np.array(X, dtype=np.float64)
+
+            nan_mask: np.ndarray = np.isnan(X)
+
+            rows: np.ndarray = np.flatnonzero(nan_mask.any(axis=1))
+
+            if len(rows) == 0:
+                return X
+
+            if len(self.patterns_) == 0:
+                X[nan_mask] = np.broadcast_to(self.modes_, X.shape)[nan_mask]
+
+                return X
+
+            chunk_size: int = max(
+                1, (self.working_memory << 20) // (8 * len(self.patterns_))
+            )
+
+            for start in range(0, len(rows), chunk_size):
+                chunk: np.ndarray = rows[start : start + chunk_size]
+
+                X[chunk] = self._impute_rows(X[chunk], nan_mask[chunk])
+
+            return X
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        if input_features is not None:
+            return np.asarray(input_features, dtype=object)
+
+        if hasattr(self, "feature_names_in_"):
+            return self.feature_names_in_
+
+        return np.asarray([f"x{i}" for i in range(self.n_features_in_)], dtype=object)
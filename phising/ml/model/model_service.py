@@ -1,14 +1,62 @@
+from typing import Dict
+
 import bentoml
 import numpy as np
 from bentoml import Service
 from bentoml._internal.runner import Runner
-from bentoml.io import NumpyNdarray
+from bentoml.io import JSON, NumpyNdarray
 
 from phising.constant import training_pipeline
+from phising.ml.model.prediction_cache import PredictionCache
+from phising.ml.model.serving_model import ServingModel
 
-runner: Runner = bentoml.mlflow.get(
+bento_model: bentoml.Model = bentoml.models.get(
     training_pipeline.MODEL_PUSHER_BENTOML_MODEL_NAME
-).to_runner()
+)
+
+
+class ServingModelRunnable(bentoml.Runnable):
+    SUPPORTED_RESOURCES = ("cpu",)
+
+    SUPPORTS_CPU_MULTI_THREADING = True
+
+    def __init__(self):
+        self.serving_model: ServingModel = ServingModel.load(bento_model.path)
+
+    @bentoml.Runnable.method(
+        batchable=training_pipeline.MODEL_SERVICE_BATCHABLE,
+        batch_dim=training_pipeline.MODEL_SERVICE_BATCH_DIM,
+    )
+    def predict(self, input_series: np.ndarray) -> np.ndarray:
+        return self.serving_model.predict(input_series)
+
+
+# concurrent requests are batched on the row axis when the model was imported with a batchable predict signature
+if bento_model.info.module == ServingModel.__module__:
+    runner: Runner = bentoml.Runner(
+        ServingModelRunnable,
+        name=training_pipeline.MODEL_PUSHER_BENTOML_MODEL_NAME,
+        models=[bento_model],
+        max_batch_size=training_pipeline.MODEL_SERVICE_MAX_BATCH_SIZE,
+        max_latency_ms=training_pipeline.MODEL_SERVICE_MAX_LATENCY_MS,
+    )
+
+else:
+    # models pushed as mlflow models load through mlflow, which is only imported for them
+    runner: Runner = bentoml.mlflow.get(bento_model.tag).to_runner(
+        max_batch_size=training_pipeline.MODEL_SERVICE_MAX_BATCH_SIZE,
+        max_latency_ms=training_pipeline.MODEL_SERVICE_MAX_LATENCY_MS,
+    )
+
+# the cache key does not hold the number of features, so only rows with the features of the model are cached
+n_features: int = len(bento_model.info.metadata.get("feature_names", []))
+
+# one cache per API worker process, serving the model of this tag, cache_stats reports the worker answering it
+prediction_cache: PredictionCache = PredictionCache(
+    max_size=training_pipeline.MODEL_SERVICE_CACHE_MAX_SIZE,
+    ttl_seconds=training_pipeline.MODEL_SERVICE_CACHE_TTL_SECONDS,
+    model_version=str(bento_model.tag),
+)
 
 svc: Service = Service(
     name=training_pipeline.MODEL_PUSHER_BENTOML_SERVICE_NAME, runners=[runner]
@@ -17,6 +65,54 @@ svc: Service = Service(
 
 @svc.api(input=NumpyNdarray(), output=NumpyNdarray())
 def classify(input_series: np.ndarray) -> np.ndarray:
-    result = runner.predict.run(input_series)
+    # a single row is sent as a 1d array, which would be concatenated feature-wise with the rows of other requests
+    features: np.ndarray = np.atleast_2d(input_series)
+
+    if (
+        not training_pipeline.MODEL_SERVICE_CACHE_ENABLED
+        or features.shape[1] != n_features
+    ):
+        return runner.predict.run(features)
+
+    keys, result, found = prediction_cache.lookup(features)
+
+    if not found.all():
+        predictions: np.ndarray = runner.predict.run(features[~found])
+
+        prediction_cache.store(features[~found], keys[~found], predictions)
+
+        result = result.astype(predictions.dtype, copy=False)
+
+        result[~found] = predictions
+
+    return result
+
+
+@svc.api(input=NumpyNdarray(), output=NumpyNdarray())
+async def classify_async(input_series: np.ndarray) -> np.ndarray:
+    # awaits the runner, so the event loop serves other requests while the model computes
+    features: np.ndarray = np.atleast_2d(input_series)
+
+    if (
+        not training_pipeline.MODEL_SERVICE_CACHE_ENABLED
+        or features.shape[1] != n_features
+    ):
+        return await runner.predict.async_run(features)
+
+    keys, result, found = prediction_cache.lookup(features)
+
+    if not found.all():
+        predictions: np.ndarray = await runner.predict.async_run(features[~found])
+
+        prediction_cache.store(features[~found], keys[~found], predictions)
+
+        result = result.astype(predictions.dtype, copy=False)
+
+        result[~found] = predictions
 
     return result
+
+
+@svc.api(input=JSON(), output=JSON())
+def cache_stats(_: Dict) -> Dict:
+    return prediction_cache.stats()
@@ -0,0 +1,163 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+from phising.exception import PhisingException
+
+
+class PredictionCache:
+    """
+    LRU cache of the predictions of the production model, with a time to live per entry.
+
+    A row of ternary phising features is packed into one 64 bit key, 2 bits per feature, with -1, 0 and 1 coded
+    as 0, 1 and 2 and a missing value as 3, so up to 32 features fit in a key. Rows holding any other value are
+    not cached. The key does not hold the number of features, so callers look up only rows having the number
+    of features of the model. Predictions are returned in the dtype the model predicted them in.
+
+    The cache lives in the process serving the model, so it holds the predictions of a single model version,
+    which is the one recorded in its stats. Every API worker process has a cache and counters of its own.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        model_version: Union[str, None] = None,
+    ):
+        self.max_size = max_size
+
+        self.ttl_seconds = ttl_seconds
+
+        self.model_version = model_version
+
+        # key -> (prediction, expiry time)
+        self.entries: "OrderedDict[int, Tuple[Union[int, float], float]]" = OrderedDict()
+
+        # dtype of the stored predictions, the one of the model output
+        self.dtype: Union[np.dtype, None] = None
+
+        self.hits: int = 0
+
+        self.misses: int = 0
+
+        self.uncacheable: int = 0
+
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def encode(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Packs every row of X into a uint64 key. Returns the keys and whether each row could be packed.
+        """
+        try:
+            X: np.ndarray = np.atleast_2d(np.asarray(X, dtype=np.float64))
+
+            if X.shape[1] > 32:
+                raise Exception(f"Can not pack {X.shape[1]} features into 64 bits")
+
+            nan_mask: np.ndarray = np.isnan(X)
+
+            codes: np.ndarray = np.where(nan_mask, 3, X + 1)
+
+            cacheable: np.ndarray = (
+                nan_mask | (X == -1) | (X == 0) | (X == 1)
+            ).all(axis=1)
+
+            codes = np.where(cacheable[:, None], codes, 0).astype(np.uint64)
+
+            shifts: np.ndarray = np.arange(X.shape[1], dtype=np.uint64) * np.uint64(2)
+
+            keys: np.ndarray = np.bitwise_or.reduce(codes << shifts, axis=1)
+
+            return keys, cacheable
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def lookup(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Looks up the predictions of the rows of X. Returns the row keys, the predictions, which are only set where
+        found, and whether each row was found.
+        """
+        try:
+            keys, cacheable = self.encode(X)
+
+            predictions: np.ndarray = np.zeros(
+                len(keys), dtype=self.dtype if self.dtype is not None else np.float64
+            )
+
+            found: np.ndarray = np.zeros(len(keys), dtype=bool)
+
+            now: float = time.monotonic()
+
+            with self.lock:
+                for i in np.flatnonzero(cacheable):
+                    entry = self.entries.get(int(keys[i]))
+
+                    if entry is None:
+                        continue
+
+                    if entry[1] <= now:
+                        del self.entries[int(keys[i])]
+
+                        continue
+
+                    self.entries.move_to_end(int(keys[i]))
+
+                    predictions[i] = entry[0]
+
+                    found[i] = True
+
+                self.hits += int(found.sum())
+
+                self.misses += int(cacheable.sum() - found.sum())
+
+                self.uncacheable += int(len(keys) - cacheable.sum())
+
+            return keys, predictions, found
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def store(self, X: np.ndarray, keys: np.ndarray, predictions: np.ndarray) -> None:
+        """
+        Stores the predictions of the rows of X under their keys, rows that can not be packed are skipped.
+        """
+        try:
+            _, cacheable = self.encode(X)
+
+            expires_at: float = time.monotonic() + self.ttl_seconds
+
+            with self.lock:
+                self.dtype = predictions.dtype
+
+                for key, prediction in zip(
+                    keys[cacheable].tolist(), predictions[cacheable].tolist()
+                ):
+                    self.entries[key] = (prediction, expires_at)
+
+                    self.entries.move_to_end(key)
+
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def stats(self) -> Dict[str, Union[int, float, str, None]]:
+        with self.lock:
+            n_lookups: int = self.hits + self.misses
+
+            return {
+                "model_version": self.model_version,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "hit_rate": self.hits / n_lookups if n_lookups else 0.0,
+            }
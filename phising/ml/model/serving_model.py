@@ -0,0 +1,279 @@
+import json
+import os
+import sys
+import threading
+from typing import Dict, List, Union
+
+import numpy as np
+
+from phising.exception import PhisingException
+from phising.ml.model.compiled_forest import CompiledForest
+
+SERVING_MODEL_FILE_NAME: str = "serving_model.json"
+
+COMPILED_MODEL_FILE_NAME: str = "compiled_model.npz"
+
+IMPUTER_FILE_NAME: str = "imputer.npz"
+
+# int8 code of a missing value in the compact arrays of the imputer state
+MISSING_CODE: int = -128
+
+
+def to_compact_array(array: np.ndarray) -> np.ndarray:
+    """
+    Stores an array of small integers and missing values as int8, other arrays are kept as they are.
+    """
+    array: np.ndarray = np.asarray(array, dtype=np.float64)
+
+    with np.errstate(invalid="ignore"):
+        is_code: np.ndarray = np.isnan(array) | (
+            (array == np.round(array)) & (np.abs(array) < -MISSING_CODE)
+        )
+
+    if not is_code.all():
+        return array
+
+    return np.where(np.isnan(array), MISSING_CODE, array).astype(np.int8)
+
+
+def from_compact_array(array: np.ndarray) -> np.ndarray:
+    if array.dtype != np.int8:
+        return array.astype(np.float64)
+
+    return np.where(array == MISSING_CODE, np.nan, array)
+
+
+class ServingModel:
+    """
+    Slim serving form of a phisingModel, saved as a directory of npz files and a json file, none of them pickled.
+
+    The trained model is kept as a CompiledForest and the preprocessing pipeline as the minimal state of its
+    imputer: the fill values of a SimpleImputer, the distinct patterns of a NearestPatternImputer or the
+    training rows of a KNNImputer, as int8 when they hold only ternary values and missing ones. Loading it needs
+    neither mlflow nor xgboost, and scikit-learn only to rebuild a nearest pattern or knn imputer, which is
+    done in the background after loading. As in phisingModel, only the rows having missing values
+    are imputed.
+    """
+
+    def __init__(
+        self,
+        compiled_model: CompiledForest,
+        imputer_kind: str,
+        imputer_params: Dict,
+        imputer_state: Dict[str, np.ndarray],
+        feature_names: Union[List[str], None] = None,
+    ):
+        self.compiled_model = compiled_model
+
+        self.imputer_kind = imputer_kind
+
+        self.imputer_params = imputer_params
+
+        self.imputer_state = imputer_state
+
+        self.feature_names = feature_names
+
+        self.imputer = None
+
+        self.imputer_lock = threading.Lock()
+
+    @classmethod
+    def from_phising_model(
+        cls, model: object, compiled_model: Union[CompiledForest, None] = None
+    ) -> "ServingModel":
+        """
+        Converts a phisingModel, whose preprocessing object is a pipeline of a single imputer. compiled_model is
+        the trained model of the phisingModel compiled already, such as the one saved by the model trainer.
+        """
+        try:
+            if compiled_model is None:
+                compiled_model: CompiledForest = CompiledForest.from_model(
+                    model.trained_model_object
+                )
+
+            steps: List = model.preprocessing_object.steps
+
+            if len(steps) != 1:
+                raise Exception(
+                    f"Can not convert a preprocessing pipeline of {len(steps)} steps"
+                )
+
+            imputer = steps[0][1]
+
+            imputer_name: str = type(imputer).__name__
+
+            if getattr(imputer, "add_indicator", False):
+                raise Exception(f"Can not convert {imputer_name} with add_indicator")
+
+            if imputer_name == "SimpleImputer":
+                imputer_kind, imputer_params = "simple", {}
+
+                imputer_state: Dict[str, np.ndarray] = {
+                    "statistics": np.asarray(imputer.statistics_, dtype=np.float64)
+                }
+
+            elif imputer_name == "NearestPatternImputer":
+                imputer_kind = "nearest_pattern"
+
+                imputer_params: Dict = {
+                    "n_neighbors": imputer.n_neighbors,
+                    "working_memory": imputer.working_memory,
+                }
+
+                imputer_state: Dict[str, np.ndarray] = {
+                    "patterns": to_compact_array(imputer.patterns_),
+                    "pattern_counts": imputer.pattern_counts_,
+                    "modes": imputer.modes_,
+                }
+
+            elif imputer_name == "KNNImputer" and isinstance(imputer.metric, str):
+                imputer_kind = "knn"
+
+                imputer_params: Dict = {
+                    "n_neighbors": imputer.n_neighbors,
+                    "weights": imputer.weights,
+                    "metric": imputer.metric,
+                }
+
+                imputer_state: Dict[str, np.ndarray] = {
+                    "fit_x": to_compact_array(imputer._fit_X)
+                }
+
+            else:
+                raise Exception(f"Can not convert {imputer_name}")
+
+            return cls(
+                compiled_model=compiled_model,
+                imputer_kind=imputer_kind,
+                imputer_params=imputer_params,
+                imputer_state=imputer_state,
+                feature_names=getattr(model, "feature_names", None),
+            )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def get_imputer(self) -> object:
+        """
+        Rebuilds the fitted imputer of the nearest pattern and knn kinds from the imputer state, once.
+        """
+        with self.imputer_lock:
+            if self.imputer is None and self.imputer_kind != "simple":
+                self.imputer = self.build_imputer()
+
+        return self.imputer
+
+    def build_imputer(self) -> object:
+        if self.imputer_kind == "nearest_pattern":
+            from phising.ml.model.imputer import NearestPatternImputer
+
+            imputer = NearestPatternImputer(**self.imputer_params)
+
+            imputer.patterns_ = from_compact_array(self.imputer_state["patterns"])
+
+            imputer.pattern_counts_ = self.imputer_state["pattern_counts"]
+
+            imputer.modes_ = self.imputer_state["modes"]
+
+            imputer.n_features_in_ = imputer.patterns_.shape[1]
+
+        else:
+            from sklearn.impute import KNNImputer
+
+            imputer = KNNImputer(**self.imputer_params)
+
+            imputer._fit_X = from_compact_array(self.imputer_state["fit_x"])
+
+            imputer._mask_fit_X = np.isnan(imputer._fit_X)
+
+            imputer._valid_mask = ~imputer._mask_fit_X.all(axis=0)
+
+            imputer.n_features_in_ = imputer._fit_X.shape[1]
+
+            imputer.indicator_ = None
+
+        return imputer
+
+    def impute(self, features: np.ndarray) -> np.ndarray:
+        if self.imputer_kind == "simple":
+            return np.where(
+                np.isnan(features), self.imputer_state["statistics"], features
+            )
+
+        return self.get_imputer().transform(features)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        try:
+            X: np.ndarray = np.ascontiguousarray(np.atleast_2d(X))
+
+            if self.feature_names is not None and X.shape[1] != len(self.feature_names):
+                raise Exception(
+                    f"Expected {len(self.feature_names)} features per row, got {X.shape[1]}"
+                )
+
+            # integer arrays, such as int8 ones, can not hold missing values
+            if X.dtype.kind in "iub":
+                return self.compiled_model.predict(X)
+
+            features: np.ndarray = X.astype(np.float64)
+
+            incomplete_rows: np.ndarray = np.isnan(features).any(axis=1)
+
+            if incomplete_rows.any():
+                features[incomplete_rows] = self.impute(features[incomplete_rows])
+
+            return self.compiled_model.predict(features)
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def save(self, dir_path: str) -> None:
+        try:
+            os.makedirs(dir_path, exist_ok=True)
+
+            self.compiled_model.save(os.path.join(dir_path, COMPILED_MODEL_FILE_NAME))
+
+            np.savez(os.path.join(dir_path, IMPUTER_FILE_NAME), **self.imputer_state)
+
+            with open(os.path.join(dir_path, SERVING_MODEL_FILE_NAME), "w") as f:
+                json.dump(
+                    {
+                        "imputer_kind": self.imputer_kind,
+                        "imputer_params": self.imputer_params,
+                        "feature_names": self.feature_names,
+                    },
+                    f,
+                )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @classmethod
+    def load(cls, dir_path: str) -> "ServingModel":
+        try:
+            with open(os.path.join(dir_path, SERVING_MODEL_FILE_NAME)) as f:
+                serving_model_info: Dict = json.load(f)
+
+            with np.load(
+                os.path.join(dir_path, IMPUTER_FILE_NAME), allow_pickle=False
+            ) as data:
+                imputer_state: Dict[str, np.ndarray] = dict(data)
+
+            serving_model: ServingModel = cls(
+                compiled_model=CompiledForest.load(
+                    os.path.join(dir_path, COMPILED_MODEL_FILE_NAME)
+                ),
+                imputer_kind=serving_model_info["imputer_kind"],
+                imputer_params=serving_model_info["imputer_params"],
+                imputer_state=imputer_state,
+                feature_names=serving_model_info["feature_names"],
+            )
+
+            # scikit-learn is imported in the background, so the model is ready before it is, only requests with
+            # missing values wait for it
+            threading.Thread(target=serving_model.get_imputer, daemon=True).start()
+
+            return serving_model
+
+        except Exception as e:
+            raise PhisingException(e, sys)
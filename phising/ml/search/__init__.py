@@ -0,0 +1,385 @@
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+from neuro_mf import GridSearchedBestModel, InitializedModelDetail, ModelFactory
+from sklearn.base import BaseEstimator, clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    GridSearchCV,
+    HalvingGridSearchCV,
+    HalvingRandomSearchCV,
+    RandomizedSearchCV,
+    train_test_split,
+)
+
+from phising.exception import PhisingException
+from phising.logger import LOG_FILE_PATH, configure_logging, logging
+from phising.utils.main_utils import get_n_cores
+
+SEARCH_BACKENDS: Tuple[str, ...] = ("grid", "halving_grid", "halving_random", "random")
+
+# backends whose candidates can be early stopped, grid keeps searching every n_estimators of the grid
+EARLY_STOPPING_BACKENDS: Tuple[str, ...] = ("halving_grid", "halving_random", "random")
+
+
+def search_model_family(
+    model_search: "ModelSearch",
+    initialized_model: InitializedModelDetail,
+    input_feature,
+    output_feature,
+) -> Tuple[GridSearchedBestModel, Dict[str, List]]:
+    """
+    Searches one model family in a worker process, returning its best model with the cv results of its
+    candidates, which the worker can not record on the ModelSearch of the parent process.
+    """
+    grid_searched_best_model: GridSearchedBestModel = (
+        model_search.execute_grid_search_operation(
+            initialized_model=initialized_model,
+            input_feature=input_feature,
+            output_feature=output_feature,
+        )
+    )
+
+    return (
+        grid_searched_best_model,
+        model_search.cv_results[initialized_model.model_serial_number],
+    )
+
+
+class ModelSearch(ModelFactory):
+    """
+    ModelFactory whose hyperparameter search is chosen by backend instead of the grid_search class of the model
+    config, which keeps its search_param_grid format and its grid_search params (cv, scoring, n_jobs, verbose).
+
+    grid runs GridSearchCV over every candidate. halving_grid and halving_random run successive halving, fitting
+    every candidate on a small share of the training rows and giving factor times more rows to the best
+    1 / factor of them in each round. random and halving_random sample n_candidates candidates from the grid.
+
+    Early stopping is opt-in: with early_stopping_rounds above 0 and a backend other than grid, estimators taking
+    early_stopping_rounds, such as XGBClassifier, are searched with n_estimators fixed to the largest value of
+    their grid and stop adding trees once the score on a held out validation split stops improving, so
+    n_estimators is picked by early stopping instead of being searched. The best of them is then fitted again on
+    all the training rows with n_estimators set to its best iteration and no early stopping. Their cv score is
+    then taken on fewer rows than the one of the other families, so it is not compared with theirs as is.
+
+    With parallel_families, the model families are searched at the same time, each in its own process with a
+    budget of cores taken from family_n_jobs or an even share of the cores left. The budget is the n_jobs of
+    the search and the estimator is fitted single threaded, so the families do not compete for cores. On a
+    single core machine the families are searched one after the other.
+    """
+
+    def __init__(
+        self,
+        model_config_path: str,
+        backend: str = "grid",
+        n_candidates: int = 16,
+        halving_factor: int = 3,
+        early_stopping_rounds: int = 0,
+        early_stopping_validation_size: float = 0.2,
+        random_state: int = 42,
+        parallel_families: bool = False,
+        family_n_jobs: Union[Dict[str, int], None] = None,
+    ):
+        try:
+            if backend not in SEARCH_BACKENDS:
+                raise ValueError(
+                    f"Unknown search backend {backend}, expected one of {SEARCH_BACKENDS}"
+                )
+
+            super().__init__(model_config_path=model_config_path)
+
+            self.backend = backend
+
+            self.n_candidates = n_candidates
+
+            self.halving_factor = halving_factor
+
+            self.early_stopping_rounds = early_stopping_rounds
+
+            self.early_stopping_validation_size = early_stopping_validation_size
+
+            self.random_state = random_state
+
+            self.parallel_families = parallel_families
+
+            self.family_n_jobs: Dict[str, int] = dict(family_n_jobs or {})
+
+            # model serial number -> cores of its search, set only when the families run in parallel
+            self.n_jobs_budget: Dict[str, int] = {}
+
+            # model serial number -> cv scores and parameters of every candidate searched
+            self.cv_results: Dict[str, Dict[str, List]] = {}
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def get_search_cv(self, estimator: BaseEstimator, param_grid: Dict) -> object:
+        if self.backend == "grid":
+            return GridSearchCV(estimator=estimator, param_grid=param_grid)
+
+        if self.backend == "halving_grid":
+            return HalvingGridSearchCV(
+                estimator=estimator,
+                param_grid=param_grid,
+                factor=self.halving_factor,
+                random_state=self.random_state,
+            )
+
+        n_grid_candidates: int = int(np.prod([len(v) for v in param_grid.values()]))
+
+        if self.backend == "halving_random":
+            return HalvingRandomSearchCV(
+                estimator=estimator,
+                param_distributions=param_grid,
+                n_candidates=min(self.n_candidates, n_grid_candidates),
+                factor=self.halving_factor,
+                min_resources="exhaust",
+                random_state=self.random_state,
+            )
+
+        return RandomizedSearchCV(
+            estimator=estimator,
+            param_distributions=param_grid,
+            n_iter=min(self.n_candidates, n_grid_candidates),
+            random_state=self.random_state,
+        )
+
+    @staticmethod
+    def get_cv_results(search_cv: object) -> Dict[str, List]:
+        """
+        Gets the parameters, cv scores and fit times of every candidate of a fitted search, with the number of
+        training rows each candidate was last scored on for the halving backends.
+        """
+        keys: List[str] = [
+            "mean_test_score",
+            "std_test_score",
+            "rank_test_score",
+            "mean_fit_time",
+            "n_resources",
+            "iter",
+        ]
+
+        cv_results: Dict[str, List] = {
+            "params": [
+                {name: np.asarray(value).item() for name, value in params.items()}
+                for params in search_cv.cv_results_["params"]
+            ]
+        }
+
+        for key in keys:
+            if key in search_cv.cv_results_:
+                cv_results[key] = np.asarray(search_cv.cv_results_[key]).tolist()
+
+        return cv_results
+
+    def get_n_jobs_budget(self, model_serial_numbers: List[str]) -> Dict[str, int]:
+        """
+        Gives every family its cores from family_n_jobs, the families not listed there share the remaining cores
+        evenly, with at least one core each.
+        """
+        n_cores: int = get_n_cores()
+
+        unlisted: List[str] = [
+            serial for serial in model_serial_numbers if serial not in self.family_n_jobs
+        ]
+
+        n_cores_left: int = n_cores - sum(
+            n_jobs
+            for serial, n_jobs in self.family_n_jobs.items()
+            if serial in model_serial_numbers
+        )
+
+        return {
+            serial: self.family_n_jobs.get(
+                serial, max(1, n_cores_left // max(1, len(unlisted)))
+            )
+            for serial in model_serial_numbers
+        }
+
+    def initiate_best_parameter_search_for_initialized_models(
+        self,
+        initialized_model_list: List[InitializedModelDetail],
+        input_feature,
+        output_feature,
+    ) -> List[GridSearchedBestModel]:
+        if (
+            not self.parallel_families
+            or len(initialized_model_list) < 2
+            or get_n_cores() < 2
+        ):
+            return super().initiate_best_parameter_search_for_initialized_models(
+                initialized_model_list=initialized_model_list,
+                input_feature=input_feature,
+                output_feature=output_feature,
+            )
+
+        logging.info(
+            "Entered initiate_best_parameter_search_for_initialized_models method of ModelSearch class"
+        )
+
+        try:
+            self.n_jobs_budget = self.get_n_jobs_budget(
+                [model.model_serial_number for model in initialized_model_list]
+            )
+
+            logging.info(
+                f"Searching {len(initialized_model_list)} model families in parallel with cores {self.n_jobs_budget}"
+            )
+
+            # spawned workers do not inherit the threads of the training pipeline, which fork could deadlock on
+            with ProcessPoolExecutor(
+                max_workers=len(initialized_model_list),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=configure_logging,
+                initargs=(LOG_FILE_PATH,),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        search_model_family,
+                        self,
+                        initialized_model,
+                        input_feature,
+                        output_feature,
+                    )
+                    for initialized_model in initialized_model_list
+                ]
+
+                self.grid_searched_best_model_list = []
+
+                for future in futures:
+                    grid_searched_best_model, cv_results = future.result()
+
+                    self.grid_searched_best_model_list.append(grid_searched_best_model)
+
+                    self.cv_results[grid_searched_best_model.model_serial_number] = (
+                        cv_results
+                    )
+
+            logging.info(
+                "Exited initiate_best_parameter_search_for_initialized_models method of ModelSearch class"
+            )
+
+            return self.grid_searched_best_model_list
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def is_early_stopping(self, estimator: BaseEstimator) -> bool:
+        return (
+            self.backend in EARLY_STOPPING_BACKENDS
+            and self.early_stopping_rounds > 0
+            and "early_stopping_rounds" in estimator.get_params()
+        )
+
+    def execute_grid_search_operation(
+        self, initialized_model: InitializedModelDetail, input_feature, output_feature
+    ) -> GridSearchedBestModel:
+        logging.info(
+            "Entered execute_grid_search_operation method of ModelSearch class"
+        )
+
+        try:
+            estimator: BaseEstimator = clone(initialized_model.model)
+
+            param_grid: Dict[str, List] = dict(initialized_model.param_grid_search)
+
+            fit_params: Dict = {}
+
+            early_stopping: bool = self.is_early_stopping(estimator)
+
+            # the training rows before the validation split, which the early stopped best model is refitted on
+            x_train, y_train = input_feature, output_feature
+
+            if early_stopping:
+                if "n_estimators" in param_grid:
+                    estimator.set_params(
+                        n_estimators=max(param_grid.pop("n_estimators"))
+                    )
+
+                estimator.set_params(early_stopping_rounds=self.early_stopping_rounds)
+
+                if estimator.get_params().get("eval_metric") is None:
+                    estimator.set_params(eval_metric="auc")
+
+                (
+                    input_feature,
+                    x_validation,
+                    output_feature,
+                    y_validation,
+                ) = train_test_split(
+                    input_feature,
+                    output_feature,
+                    test_size=self.early_stopping_validation_size,
+                    stratify=output_feature,
+                    random_state=self.random_state,
+                )
+
+                fit_params = {
+                    "eval_set": [(x_validation, y_validation)],
+                    "verbose": False,
+                }
+
+            search_cv: object = ModelFactory.update_property_of_class(
+                self.get_search_cv(estimator, param_grid),
+                self.grid_search_property_data,
+            )
+
+            n_jobs: Union[int, None] = self.n_jobs_budget.get(
+                initialized_model.model_serial_number
+            )
+
+            if n_jobs is not None:
+                search_cv.n_jobs = n_jobs
+
+                if "n_jobs" in estimator.get_params():
+                    estimator.set_params(n_jobs=1)
+
+            logging.info(
+                f"Searching {type(estimator).__name__} with {type(search_cv).__name__} on {search_cv.n_jobs} cores, early stopping is {early_stopping}"
+            )
+
+            search_cv.fit(input_feature, output_feature, **fit_params)
+
+            self.cv_results[initialized_model.model_serial_number] = self.get_cv_results(
+                search_cv
+            )
+
+            best_parameters: Dict = dict(search_cv.best_params_)
+
+            best_model: BaseEstimator = search_cv.best_estimator_
+
+            if early_stopping:
+                best_parameters["n_estimators"] = best_model.best_iteration + 1
+
+                best_model = clone(best_model).set_params(
+                    n_estimators=best_parameters["n_estimators"],
+                    early_stopping_rounds=None,
+                )
+
+                best_model.fit(x_train, y_train)
+
+                logging.info(
+                    f"Refitted best {type(estimator).__name__} on {len(y_train)} rows with {best_parameters['n_estimators']} estimators"
+                )
+
+            logging.info(
+                f"Best {type(estimator).__name__} has parameters {best_parameters} and score {search_cv.best_score_}"
+            )
+
+            logging.info(
+                "Exited execute_grid_search_operation method of ModelSearch class"
+            )
+
+            return GridSearchedBestModel(
+                model_serial_number=initialized_model.model_serial_number,
+                model=initialized_model.model,
+                best_model=best_model,
+                best_parameters=best_parameters,
+                best_score=search_cv.best_score_,
+            )
+
+        except Exception as e:
+            raise PhisingException(e, sys)
@@ -0,0 +1,95 @@
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from phising.exception import PhisingException
+from phising.logger import logging
+
+
+@dataclass
+class DAGNode:
+    name: str
+
+    fn: Callable
+
+    # keyword argument of fn -> name of the node whose output is passed as that argument
+    inputs: Dict[str, str] = field(default_factory=dict)
+
+
+class DAGExecutor:
+    """
+    Runs a set of nodes on a thread pool, starting every node as soon as the nodes it takes inputs from are done,
+    so nodes that do not depend on each other run concurrently. A failing node stops the scheduling of new nodes,
+    and its error is raised once the running nodes have finished.
+    """
+
+    def __init__(self, nodes: List[DAGNode], max_workers: int):
+        self.nodes: Dict[str, DAGNode] = {node.name: node for node in nodes}
+
+        self.max_workers = max_workers
+
+        for node in nodes:
+            for upstream in node.inputs.values():
+                if upstream not in self.nodes:
+                    raise ValueError(
+                        f"Node {node.name} takes input from unknown node {upstream}"
+                    )
+
+    def run(self) -> Dict[str, object]:
+        logging.info("Entered run method of DAGExecutor class")
+
+        try:
+            outputs: Dict[str, object] = {}
+
+            pending: Dict[str, DAGNode] = dict(self.nodes)
+
+            running: Dict[Future, str] = {}
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while pending or running:
+                    for name, node in list(pending.items()):
+                        if all(
+                            upstream in outputs for upstream in node.inputs.values()
+                        ):
+                            logging.info(f"Starting {name} node")
+
+                            running[
+                                executor.submit(
+                                    node.fn,
+                                    **{
+                                        arg: outputs[upstream]
+                                        for arg, upstream in node.inputs.items()
+                                    },
+                                )
+                            ] = name
+
+                            del pending[name]
+
+                    if not running:
+                        raise ValueError(
+                            f"Nodes {list(pending)} can not run, their inputs form a cycle"
+                        )
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        name: str = running.pop(future)
+
+                        if future.exception() is not None:
+                            pending.clear()
+
+                            wait(running)
+
+                            raise future.exception()
+
+                        outputs[name] = future.result()
+
+                        logging.info(f"Finished {name} node")
+
+            logging.info("Exited run method of DAGExecutor class")
+
+            return outputs
+
+        except Exception as e:
+            raise PhisingException(e, sys)
@@ -0,0 +1,188 @@
+import dataclasses
+import hashlib
+import importlib.util
+import os
+import sys
+from typing import Dict, Iterator, List, Union
+
+from phising.constant import training_pipeline
+from phising.exception import PhisingException
+from phising.logger import logging
+from phising.utils.main_utils import load_object, save_object
+
+
+class StageCache:
+    """
+    Content addressed cache of the artifacts of the training pipeline stages.
+
+    The key of a stage is the sha256 of the stage name, the keys of the stages it reads artifacts from, its config
+    with the run artifact dir taken out, the constants of the stage, the files of the config dir, the source of
+    the phising package and any extra input, such as the fingerprint of the batch files in s3. The whole package
+    is hashed, as a stage component runs code of the utils, ml and data access modules too. A stage whose
+    inputs did not change gets the same key in the next run, and its cached artifact can be reused.
+    """
+
+    def __init__(self, artifact_dir: str, cache_dir: str = training_pipeline.STAGE_CACHE_DIR):
+        self.artifact_dir = artifact_dir
+
+        self.cache_dir = cache_dir
+
+        self.source_hash: Union[str, None] = None
+
+    @staticmethod
+    def get_file_hash(file_path: str) -> str:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    @staticmethod
+    def get_constants(stage_name: str) -> Dict[str, str]:
+        """
+        Gets the constants of the stage, which start with the upper case stage name, and the constants shared by
+        all stages. The constants of the other stages and the per run ones are left out.
+        """
+        stage_prefixes: List[str] = [
+            stage.upper() + "_" for stage in training_pipeline.STAGE_CACHE_STAGES
+        ]
+
+        return {
+            name: repr(value)
+            for name, value in sorted(vars(training_pipeline).items())
+            if name.isupper()
+            and name not in training_pipeline.STAGE_CACHE_UNHASHED_CONSTANTS
+            and (
+                name.startswith(stage_name.upper() + "_")
+                or not any(name.startswith(prefix) for prefix in stage_prefixes)
+            )
+        }
+
+    def get_source_hash(self) -> str:
+        """
+        Gets the sha256 of the paths and contents of the python files of the phising package, once per run.
+        """
+        if self.source_hash is None:
+            package_dir: str = os.path.dirname(
+                importlib.util.find_spec("phising").origin
+            )
+
+            source_hash = hashlib.sha256()
+
+            for dir_path, _, file_names in sorted(os.walk(package_dir)):
+                for fname in sorted(file_names):
+                    if not fname.endswith(".py"):
+                        continue
+
+                    file_path: str = os.path.join(dir_path, fname)
+
+                    source_hash.update(os.path.relpath(file_path, package_dir).encode())
+
+                    source_hash.update(self.get_file_hash(file_path).encode())
+
+            self.source_hash = source_hash.hexdigest()
+
+        return self.source_hash
+
+    def get_config_state(self, config: object) -> Dict[str, str]:
+        if config is None:
+            return {}
+
+        return {
+            name: repr(value).replace(self.artifact_dir, "<artifact_dir>")
+            for name, value in sorted(vars(config).items())
+        }
+
+    def get_key(
+        self,
+        stage_name: str,
+        config: object,
+        upstream_keys: List[str],
+        extra: str = "",
+    ) -> str:
+        try:
+            key = hashlib.sha256()
+
+            key.update(stage_name.encode())
+
+            for upstream_key in upstream_keys:
+                key.update(upstream_key.encode())
+
+            key.update(repr(self.get_config_state(config)).encode())
+
+            key.update(repr(self.get_constants(stage_name)).encode())
+
+            for fname in sorted(os.listdir(training_pipeline.STAGE_CACHE_CONFIG_DIR)):
+                key.update(fname.encode())
+
+                key.update(
+                    self.get_file_hash(
+                        os.path.join(training_pipeline.STAGE_CACHE_CONFIG_DIR, fname)
+                    ).encode()
+                )
+
+            key.update(self.get_source_hash().encode())
+
+            key.update(extra.encode())
+
+            return key.hexdigest()
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def get_artifact_file_path(self, stage_name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, stage_name, key + ".pkl")
+
+    @staticmethod
+    def iter_artifact_paths(artifact: object) -> Iterator[str]:
+        """
+        Yields the paths under the artifact dir that the artifact refers to, in nested artifacts too.
+        """
+        if dataclasses.is_dataclass(artifact):
+            for f in dataclasses.fields(artifact):
+                yield from StageCache.iter_artifact_paths(getattr(artifact, f.name))
+
+        elif isinstance(artifact, (list, tuple)):
+            for value in artifact:
+                yield from StageCache.iter_artifact_paths(value)
+
+        elif isinstance(artifact, str) and artifact.startswith(
+            training_pipeline.ARTIFACT_DIR + os.sep
+        ):
+            yield artifact
+
+    def load(self, stage_name: str, key: str) -> Union[object, None]:
+        """
+        Loads the cached artifact of the stage, None when there is none or a file it refers to is gone.
+        """
+        try:
+            artifact_file_path: str = self.get_artifact_file_path(stage_name, key)
+
+            if not os.path.exists(artifact_file_path):
+                return None
+
+            artifact: object = load_object(artifact_file_path)
+
+            missing_paths: List[str] = [
+                path
+                for path in self.iter_artifact_paths(artifact)
+                if not os.path.exists(path)
+            ]
+
+            if missing_paths:
+                logging.info(
+                    f"Cached {stage_name} artifact {key} refers to missing files {missing_paths}"
+                )
+
+                return None
+
+            return artifact
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def save(self, stage_name: str, key: str, artifact: object) -> None:
+        try:
+            save_object(self.get_artifact_file_path(stage_name, key), artifact)
+
+            logging.info(f"Cached {stage_name} artifact with key {key}")
+
+        except Exception as e:
+            raise PhisingException(e, sys)
@@ -1,5 +1,7 @@
-import sys
 import os
+import sys
+from dataclasses import replace
+from typing import Callable, Dict, List, Union
 
 from phising.components.data_ingestion import DataIngestion
 from phising.components.data_transformation import DataTransformation
@@ -7,6 +9,7 @@ from phising.components.data_validation import DataValidation
 from phising.components.model_evaluation import ModelEvaluation
 from phising.components.model_pusher import ModelPusher
 from phising.components.model_trainer import ModelTrainer
+from phising.constant import training_pipeline
 from phising.entity.artifact_entity import (
     DataIngestionArtifact,
     DataTransformationArtifact,
@@ -19,20 +22,102 @@ from phising.entity.config_entity import (
     DataIngestionConfig,
     DataTransformationConfig,
     DataValidationConfig,
+    MLFlowModelInfo,
     ModelEvaluationConfig,
     ModelPusherConfig,
     ModelTrainerConfig,
     TrainingPipelineConfig,
 )
 from phising.exception import PhisingException
+from phising.logger import logging
+from phising.ml.mlflow import MLFLowOperation
+from phising.pipeline.dag import DAGExecutor, DAGNode
+from phising.pipeline.stage_cache import StageCache
+from phising.utils.instrumentation import Instrumentation, instrumented
+from phising.utils.main_utils import read_json, write_json
 
 
 class TrainPipeline:
     is_pipeline_running = False
 
-    def __init__(self):
+    def __init__(self, resume: bool = False, from_stage: Union[str, None] = None):
+        """
+        With resume, stages whose inputs did not change since a previous run reuse the artifact cached by that
+        run. With from_stage, the stages before from_stage are resumed and from_stage onwards run again. Stage
+        artifacts are cached when resuming or when the stage cache is enabled, other runs skip the stage keys and
+        the listing of the batch files in s3 they need.
+        """
         self.training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
+        self.stage_cache: StageCache = StageCache(
+            artifact_dir=self.training_pipeline_config.artifact_dir
+        )
+
+        self.resume: bool = resume or from_stage is not None
+
+        self.caching: bool = self.resume or training_pipeline.STAGE_CACHE_ENABLED
+
+        self.from_stage: Union[str, None] = from_stage
+
+        self.stage_keys: Dict[str, str] = {}
+
+    def is_stage_reusable(self, stage_name: str) -> bool:
+        if not self.resume:
+            return False
+
+        if self.from_stage is None:
+            return True
+
+        return training_pipeline.STAGE_CACHE_STAGES.index(
+            stage_name
+        ) < training_pipeline.STAGE_CACHE_STAGES.index(self.from_stage)
+
+    def run_stage(
+        self,
+        stage_name: str,
+        config: object,
+        upstream_stages: List[str],
+        start_fn: Callable,
+        extra: str = "",
+        save: bool = True,
+        **kwargs,
+    ) -> object:
+        """
+        Runs start_fn with kwargs, or reuses the cached artifact of the stage when the stage is reusable and
+        its key is in the stage cache. The artifact of a stage that ran is cached unless save is False.
+        """
+        try:
+            if not self.caching:
+                return start_fn(**kwargs)
+
+            key: str = self.stage_cache.get_key(
+                stage_name=stage_name,
+                config=config,
+                upstream_keys=[self.stage_keys[stage] for stage in upstream_stages],
+                extra=extra,
+            )
+
+            self.stage_keys[stage_name] = key
+
+            if self.is_stage_reusable(stage_name):
+                artifact: object = self.stage_cache.load(stage_name, key)
+
+                if artifact is not None:
+                    logging.info(f"Reusing cached {stage_name} artifact {key}")
+
+                    return artifact
+
+            artifact: object = start_fn(**kwargs)
+
+            if save:
+                self.stage_cache.save(stage_name, key, artifact)
+
+            return artifact
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    @instrumented
     def start_data_ingestion(self) -> DataIngestionArtifact:
         try:
             self.data_ingestion_config: DataIngestionConfig = DataIngestionConfig(
@@ -52,6 +137,7 @@ class TrainPipeline:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def start_data_validation(
         self, data_ingestion_artifact: DataIngestionArtifact
     ) -> DataValidationArtifact:
@@ -74,6 +160,7 @@ class TrainPipeline:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def start_data_transformation(
         self, data_validation_artifact: DataValidationArtifact
     ) -> DataTransformationArtifact:
@@ -98,8 +185,11 @@ class TrainPipeline:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def start_model_trainer(
-        self, data_transformation_artifact: DataTransformationArtifact
+        self,
+        data_transformation_artifact: DataTransformationArtifact,
+        prod_model_info: Union[MLFlowModelInfo, None] = None,
     ) -> ModelTrainerArtifact:
         try:
             self.model_trainer_config: ModelTrainerConfig = ModelTrainerConfig(
@@ -109,6 +199,7 @@ class TrainPipeline:
             model_trainer = ModelTrainer(
                 data_transformation_artifact=data_transformation_artifact,
                 model_trainer_config=self.model_trainer_config,
+                prod_model_info=prod_model_info,
             )
 
             model_trainer_artifact = model_trainer.initiate_model_trainer()
@@ -118,10 +209,12 @@ class TrainPipeline:
         except Exception as e:
             raise PhisingException(e, sys)
 
+    @instrumented
     def start_model_evaluation(
         self,
         data_validation_artifact: DataValidationArtifact,
         model_trainer_artifact: ModelTrainerArtifact,
+        prod_model_info: Union[MLFlowModelInfo, None] = None,
     ) -> ModelEvaluationArtifact:
         try:
             self.model_eval_config: ModelEvaluationConfig = ModelEvaluationConfig()
@@ -130,6 +223,7 @@ class TrainPipeline:
                 model_eval_config=self.model_eval_config,
                 data_validation_artifact=data_validation_artifact,
                 model_trainer_artifact=model_trainer_artifact,
+                prod_model_info=prod_model_info,
             )
 
             model_evaluation_artifact = model_evaluation.initiate_model_evaluation()
@@ -139,13 +233,19 @@ class TrainPipeline:
         except Exception as e:
             raise PhisingException(e, sys)
 
-    def start_model_pusher(self, model_evaluation_artifact: ModelEvaluationArtifact):
+    @instrumented
+    def start_model_pusher(
+        self,
+        model_evaluation_artifact: ModelEvaluationArtifact,
+        model_trainer_artifact: Union[ModelTrainerArtifact, None] = None,
+    ):
         try:
             self.model_pusher_config: ModelPusherConfig = ModelPusherConfig()
 
             model_pusher = ModelPusher(
                 model_evaluation_artifact=model_evaluation_artifact,
                 model_pusher_config=self.model_pusher_config,
+                model_trainer_artifact=model_trainer_artifact,
             )
 
             model_pusher_artifact = model_pusher.initiate_model_pusher()
@@ -155,38 +255,220 @@ class TrainPipeline:
         except Exception as e:
             raise PhisingException(e, sys)
 
-    def run_pipeline(self):
+    @instrumented
+    def start_prod_model_info(self) -> Union[MLFlowModelInfo, None]:
         try:
-            TrainPipeline.is_pipeline_running = True
+            return MLFLowOperation().get_prod_model_info()
 
-            data_ingestion_artifact: DataIngestionArtifact = self.start_data_ingestion()
+        except Exception as e:
+            raise PhisingException(e, sys)
 
-            data_validation_artifact: DataValidationArtifact = (
-                self.start_data_validation(
-                    data_ingestion_artifact=data_ingestion_artifact
-                )
+    def run_data_ingestion_stage(self) -> DataIngestionArtifact:
+        data_ingestion_config: DataIngestionConfig = DataIngestionConfig(
+            training_pipeline_config=self.training_pipeline_config
+        )
+
+        # the ingestion artifact is cached once validation has consumed the streamed batch files
+        return self.run_stage(
+            stage_name="data_ingestion",
+            config=data_ingestion_config,
+            upstream_stages=[],
+            start_fn=self.start_data_ingestion,
+            extra=DataIngestion(data_ingestion_config).get_source_fingerprint()
+            if self.caching
+            else "",
+            save=False,
+        )
+
+    def run_data_validation_stage(
+        self, data_ingestion_artifact: DataIngestionArtifact
+    ) -> DataValidationArtifact:
+        data_validation_artifact: DataValidationArtifact = self.run_stage(
+            stage_name="data_validation",
+            config=DataValidationConfig(
+                training_pipeline_config=self.training_pipeline_config
+            ),
+            upstream_stages=["data_ingestion"],
+            start_fn=self.start_data_validation,
+            data_ingestion_artifact=data_ingestion_artifact,
+        )
+
+        if self.caching:
+            # a cached validation artifact leaves the streamed batch files unconsumed, they are downloaded and the
+            # watermark moved here so the cached ingestion artifact describes a complete feature store
+            if data_ingestion_artifact.batch_files is not None:
+                for _ in data_ingestion_artifact.batch_files:
+                    pass
+
+            self.stage_cache.save(
+                "data_ingestion",
+                self.stage_keys["data_ingestion"],
+                replace(data_ingestion_artifact, batch_files=None),
             )
 
-            data_transformation_artifact: DataTransformationArtifact = (
-                self.start_data_transformation(
-                    data_validation_artifact=data_validation_artifact
-                )
-            )
+        return data_validation_artifact
 
-            model_trainer_artifact: ModelTrainerArtifact = self.start_model_trainer(
-                data_transformation_artifact=data_transformation_artifact
+    def run_data_transformation_stage(
+        self, data_validation_artifact: DataValidationArtifact
+    ) -> DataTransformationArtifact:
+        return self.run_stage(
+            stage_name="data_transformation",
+            config=DataTransformationConfig(
+                training_pipeline_config=self.training_pipeline_config
+            ),
+            upstream_stages=["data_validation"],
+            start_fn=self.start_data_transformation,
+            data_validation_artifact=data_validation_artifact,
+        )
+
+    def run_model_trainer_stage(
+        self,
+        data_transformation_artifact: DataTransformationArtifact,
+        prod_model_info: Union[MLFlowModelInfo, None],
+    ) -> ModelTrainerArtifact:
+        model_trainer_config: ModelTrainerConfig = ModelTrainerConfig(
+            training_pipeline_config=self.training_pipeline_config
+        )
+
+        # incremental training continues the production model on the batch files the trainer state does not
+        # record, so a cached model is reused only against the same production model and state
+        return self.run_stage(
+            stage_name="model_trainer",
+            config=model_trainer_config,
+            upstream_stages=["data_transformation"],
+            start_fn=self.start_model_trainer,
+            extra=repr(prod_model_info)
+            + (
+                repr(read_json(model_trainer_config.state_file_path))
+                if os.path.exists(model_trainer_config.state_file_path)
+                else ""
+            ),
+            data_transformation_artifact=data_transformation_artifact,
+            prod_model_info=prod_model_info,
+        )
+
+    def run_model_evaluation_stage(
+        self,
+        data_validation_artifact: DataValidationArtifact,
+        model_trainer_artifact: ModelTrainerArtifact,
+        prod_model_info: Union[MLFlowModelInfo, None],
+    ) -> ModelEvaluationArtifact:
+        # a cached evaluation is reused only against the same production model
+        return self.run_stage(
+            stage_name="model_evaluation",
+            config=ModelEvaluationConfig(),
+            upstream_stages=["data_validation", "model_trainer"],
+            start_fn=self.start_model_evaluation,
+            extra=repr(prod_model_info),
+            data_validation_artifact=data_validation_artifact,
+            model_trainer_artifact=model_trainer_artifact,
+            prod_model_info=prod_model_info,
+        )
+
+    def run_model_pusher_stage(
+        self,
+        model_evaluation_artifact: ModelEvaluationArtifact,
+        model_trainer_artifact: ModelTrainerArtifact,
+    ) -> ModelPusherArtifact:
+        return self.run_stage(
+            stage_name="model_pusher",
+            config=ModelPusherConfig(),
+            upstream_stages=["model_evaluation", "model_trainer"],
+            start_fn=self.start_model_pusher,
+            model_evaluation_artifact=model_evaluation_artifact,
+            model_trainer_artifact=model_trainer_artifact,
+        )
+
+    def get_pipeline_nodes(self) -> List[DAGNode]:
+        """
+        Declares the stages of the training pipeline and the artifacts each stage takes from the others. The
+        production model lookup in the MLflow registry needs no artifact, so it runs while the data stages run,
+        and the model trainer and the model evaluation take the production model from it.
+        """
+        return [
+            DAGNode(name="data_ingestion", fn=self.run_data_ingestion_stage),
+            DAGNode(
+                name="data_validation",
+                fn=self.run_data_validation_stage,
+                inputs={"data_ingestion_artifact": "data_ingestion"},
+            ),
+            DAGNode(
+                name="data_transformation",
+                fn=self.run_data_transformation_stage,
+                inputs={"data_validation_artifact": "data_validation"},
+            ),
+            DAGNode(
+                name="model_trainer",
+                fn=self.run_model_trainer_stage,
+                inputs={
+                    "data_transformation_artifact": "data_transformation",
+                    "prod_model_info": "prod_model_info",
+                },
+            ),
+            DAGNode(name="prod_model_info", fn=self.start_prod_model_info),
+            DAGNode(
+                name="model_evaluation",
+                fn=self.run_model_evaluation_stage,
+                inputs={
+                    "data_validation_artifact": "data_validation",
+                    "model_trainer_artifact": "model_trainer",
+                    "prod_model_info": "prod_model_info",
+                },
+            ),
+            DAGNode(
+                name="model_pusher",
+                fn=self.run_model_pusher_stage,
+                inputs={
+                    "model_evaluation_artifact": "model_evaluation",
+                    "model_trainer_artifact": "model_trainer",
+                },
+            ),
+        ]
+
+    def save_run_report(self) -> None:
+        """
+        Writes the stage metrics collected by Instrumentation as a json run report in the artifact dir, and logs
+        it to MLflow. A failure to reach MLflow is logged without failing the pipeline.
+        """
+        try:
+            run_report: Dict = Instrumentation.get_report()
+
+            run_report_file_path: str = os.path.join(
+                self.training_pipeline_config.artifact_dir,
+                training_pipeline.INSTRUMENTATION_REPORT_FILE_NAME,
             )
 
-            model_evaluation_artifact: ModelEvaluationArtifact = (
-                self.start_model_evaluation(
-                    data_validation_artifact=data_validation_artifact,
-                    model_trainer_artifact=model_trainer_artifact,
+            write_json(file_name=run_report_file_path, content=run_report)
+
+            try:
+                MLFLowOperation().log_run_report(
+                    run_report=run_report, run_report_file_path=run_report_file_path
                 )
-            )
 
-            model_pusher_artifact: ModelPusherArtifact = self.start_model_pusher(
-                model_evaluation_artifact=model_evaluation_artifact
-            )
+            except Exception as e:
+                logging.info(f"Could not log the run report to MLflow : {e}")
+
+        except Exception as e:
+            raise PhisingException(e, sys)
+
+    def run_pipeline(self) -> ModelPusherArtifact:
+        try:
+            TrainPipeline.is_pipeline_running = True
+
+            Instrumentation.reset()
+
+            try:
+                outputs: Dict[str, object] = DAGExecutor(
+                    nodes=self.get_pipeline_nodes(),
+                    max_workers=training_pipeline.DAG_MAX_WORKERS,
+                ).run()
+
+            finally:
+                self.save_run_report()
+
+            model_pusher_artifact: ModelPusherArtifact = outputs["model_pusher"]
+
+            return model_pusher_artifact
 
         except Exception as e:
             raise PhisingException(e, sys)
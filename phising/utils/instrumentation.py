@@ -0,0 +1,315 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+from phising.constant import training_pipeline
+from phising.logger import logging
+
+try:
+    import resource
+
+except ImportError:  # resource is not available on windows
+    resource = None
+
+
+@dataclass
+class StageMetrics:
+    name: str
+
+    started_at: str
+
+    status: str = "running"
+
+    wall_seconds: float = 0.0
+
+    # cpu time, rss and i/o counters are process wide, so they include the stages running at the same time, which
+    # are listed in overlaps_with. cpu time covers every thread of the process, child cpu time the child processes
+    # reaped while the stage ran
+    cpu_seconds: float = 0.0
+
+    child_cpu_seconds: float = 0.0
+
+    rss_start_mb: Union[float, None] = None
+
+    peak_rss_mb: Union[float, None] = None
+
+    bytes_read: Union[int, None] = None
+
+    bytes_written: Union[int, None] = None
+
+    rows_in: Union[int, None] = None
+
+    rows_out: Union[int, None] = None
+
+    overlaps_with: Union[List[str], None] = None
+
+    # time spent waiting for the items of an iterator stage, out of its wall time, None for the other stages
+    wait_seconds: Union[float, None] = None
+
+
+def get_rss_mb() -> Union[float, None]:
+    try:
+        with open("/proc/self/statm") as f:
+            rss_pages: int = int(f.read().split()[1])
+
+        return rss_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+
+        # ru_maxrss is the peak rss of the process so far, in KiB on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_io_counters() -> Dict[str, int]:
+    try:
+        with open("/proc/self/io") as f:
+            counters: Dict[str, int] = dict(
+                (key, int(value)) for key, value in (line.split(":") for line in f)
+            )
+
+        return {"read": counters["rchar"], "write": counters["wchar"]}
+
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def get_child_cpu_seconds() -> float:
+    if resource is None:
+        times = os.times()
+
+        return times.children_user + times.children_system
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return usage.ru_utime + usage.ru_stime
+
+
+class Instrumentation:
+    """
+    Collects the wall time, cpu time, peak rss, bytes of i/o and rows in and out of every instrumented stage of a
+    pipeline run, and writes them as a json run report.
+
+    Stages run concurrently under the DAG executor, and all metrics but wall time and rows are process wide, so
+    the metrics of overlapping stages count each other's work and do not add up to the run total. The report
+    lists the stages every stage overlapped with.
+    """
+
+    stages: List[StageMetrics] = []
+
+    lock: threading.Lock = threading.Lock()
+
+    local: threading.local = threading.local()
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls.lock:
+            cls.stages = []
+
+    @classmethod
+    def active_stages(cls) -> List[StageMetrics]:
+        if not hasattr(cls.local, "stack"):
+            cls.local.stack = []
+
+        return cls.local.stack
+
+    @classmethod
+    def record_rows(
+        cls, rows_in: Union[int, None] = None, rows_out: Union[int, None] = None
+    ) -> None:
+        """
+        Records the rows read and written by the stages running in the calling thread.
+        """
+        for stage in cls.active_stages():
+            if rows_in is not None:
+                stage.rows_in = rows_in
+
+            if rows_out is not None:
+                stage.rows_out = rows_out
+
+    @staticmethod
+    def get_interval(stage: StageMetrics) -> Tuple[datetime, datetime]:
+        started_at: datetime = datetime.fromisoformat(stage.started_at)
+
+        return started_at, started_at + timedelta(seconds=stage.wall_seconds)
+
+    @classmethod
+    def get_report(cls) -> Dict:
+        with cls.lock:
+            intervals: List[Tuple[datetime, datetime]] = [
+                cls.get_interval(stage) for stage in cls.stages
+            ]
+
+            for stage, (start, end) in zip(cls.stages, intervals):
+                stage.overlaps_with = [
+                    other.name
+                    for other, (other_start, other_end) in zip(cls.stages, intervals)
+                    if other is not stage and other_start < end and start < other_end
+                ]
+
+            return {
+                "pipeline_name": training_pipeline.PIPELINE_NAME,
+                "timestamp": training_pipeline.TIMESTAMP,
+                "process_wide_metrics": [
+                    "cpu_seconds",
+                    "child_cpu_seconds",
+                    "rss_start_mb",
+                    "peak_rss_mb",
+                    "bytes_read",
+                    "bytes_written",
+                ],
+                "stages": [asdict(stage) for stage in cls.stages],
+            }
+
+
+@contextmanager
+def instrument(name: str) -> Iterator[StageMetrics]:
+    """
+    Measures the block as a stage called name. Peak rss is sampled by a background thread every
+    INSTRUMENTATION_SAMPLE_INTERVAL seconds.
+    """
+    stage: StageMetrics = StageMetrics(
+        name=name, started_at=datetime.now().isoformat()
+    )
+
+    with Instrumentation.lock:
+        Instrumentation.stages.append(stage)
+
+    stage.rss_start_mb = stage.peak_rss_mb = get_rss_mb()
+
+    io_start: Dict[str, int] = get_io_counters()
+
+    done: threading.Event = threading.Event()
+
+    def sample_rss() -> None:
+        while not done.wait(training_pipeline.INSTRUMENTATION_SAMPLE_INTERVAL):
+            rss: Union[float, None] = get_rss_mb()
+
+            if rss is not None:
+                stage.peak_rss_mb = max(stage.peak_rss_mb or 0.0, rss)
+
+    sampler: threading.Thread = threading.Thread(target=sample_rss, daemon=True)
+
+    sampler.start()
+
+    Instrumentation.active_stages().append(stage)
+
+    wall_start, cpu_start, child_cpu_start = (
+        time.perf_counter(),
+        time.process_time(),
+        get_child_cpu_seconds(),
+    )
+
+    try:
+        yield stage
+
+        stage.status = "succeeded"
+
+    except BaseException:
+        stage.status = "failed"
+
+        raise
+
+    finally:
+        stage.wall_seconds = time.perf_counter() - wall_start
+
+        stage.cpu_seconds = time.process_time() - cpu_start
+
+        stage.child_cpu_seconds = get_child_cpu_seconds() - child_cpu_start
+
+        Instrumentation.active_stages().remove(stage)
+
+        done.set()
+
+        sampler.join()
+
+        rss: Union[float, None] = get_rss_mb()
+
+        if rss is not None:
+            stage.peak_rss_mb = max(stage.peak_rss_mb or 0.0, rss)
+
+        io_end: Dict[str, int] = get_io_counters()
+
+        if io_start and io_end:
+            stage.bytes_read = io_end["read"] - io_start["read"]
+
+            stage.bytes_written = io_end["write"] - io_start["write"]
+
+        logging.info(f"Stage metrics : {stage}")
+
+
+def instrument_iterator(
+    name: str,
+    iterator: Iterator,
+    get_bytes_read: Union[Callable[[], int], None] = None,
+) -> Iterator:
+    """
+    Measures a lazily consumed iterator as a stage called name. Its wall time runs from the first item asked for
+    to the iterator being exhausted or closed, which is the interval checked for overlapping stages, and includes
+    the time the consumer spends between the items. The time spent waiting for the items alone is kept as its
+    wait time. The i/o counters of the process would count the consumer too, so bytes read are taken from
+    get_bytes_read once the iterator is exhausted.
+    """
+    # the body runs on the first next call, so the stage starts when the first item is asked for
+    stage: StageMetrics = StageMetrics(
+        name=name, started_at=datetime.now().isoformat(), wait_seconds=0.0
+    )
+
+    with Instrumentation.lock:
+        Instrumentation.stages.append(stage)
+
+    wall_start: float = time.perf_counter()
+
+    try:
+        while True:
+            wait_start: float = time.perf_counter()
+
+            try:
+                item = next(iterator)
+
+            except StopIteration:
+                break
+
+            finally:
+                stage.wait_seconds += time.perf_counter() - wait_start
+
+            yield item
+
+        stage.status = "succeeded"
+
+    except GeneratorExit:
+        stage.status = "closed"
+
+        raise
+
+    except BaseException:
+        stage.status = "failed"
+
+        raise
+
+    finally:
+        stage.wall_seconds = time.perf_counter() - wall_start
+
+        if get_bytes_read is not None:
+            stage.bytes_read = get_bytes_read()
+
+        logging.info(f"Stage metrics : {stage}")
+
+
+def instrumented(fn: Callable) -> Callable:
+    """
+    Decorator measuring every call of fn as a stage named after the qualified name of fn.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with instrument(fn.__qualname__):
+            return fn(*args, **kwargs)
+
+    return wrapper
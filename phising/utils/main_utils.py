@@ -1,16 +1,38 @@
+import errno
+import json
 import os
+import shutil
 import sys
-from typing import Dict, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Union
 
 import bentoml
 import dill
+import mlflow
 import numpy as np
 import yaml
+from bentoml._internal.models.model import ModelContext
 
 from phising.cloud_storage.aws_operations import S3Sync
 from phising.constant import training_pipeline
 from phising.exception import PhisingException
 from phising.logger import logging
+from phising.ml.model.compiled_forest import CompiledForest
+from phising.ml.model.serving_model import ServingModel
+
+# Linux ioctl request number for cloning a file (reflink) on btrfs and xfs
+FICLONE: int = 0x40049409
+
+
+def get_n_cores() -> int:
+    """
+    Number of cores the process may run on, which is less than os.cpu_count() under a cpu affinity mask such
+    as the one of a container.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
 
 
 def read_yaml(file_name: str) -> Dict:
@@ -47,6 +69,107 @@ def read_text(file_name: str) -> str:
         raise PhisingException(e, sys)
 
 
+def read_json(file_name: str) -> Dict:
+    logging.info("Entered the read_json method of MainUtils class")
+
+    try:
+        with open(file_name) as f:
+            dic: Dict = json.load(f)
+
+        logging.info(f"Read the json content from {file_name}")
+
+        logging.info("Exited the read_json method of MainUtils class")
+
+        return dic
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
+def write_json(file_name: str, content: Dict) -> None:
+    logging.info("Entered the write_json method of MainUtils class")
+
+    try:
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+        tmp_file_name: str = file_name + ".tmp"
+
+        with open(tmp_file_name, "w") as f:
+            json.dump(content, f, indent=2)
+
+        os.replace(tmp_file_name, file_name)
+
+        logging.info(f"Wrote the json content to {file_name}")
+
+        logging.info("Exited the write_json method of MainUtils class")
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
+def link_file(src: str, dest_dir: str, mode: str = "hardlink") -> str:
+    """
+    Places src in dest_dir without copying the data where the filesystem allows it.
+
+    mode is one of hardlink, reflink, symlink or copy. hardlink and reflink fall back to a copy when the
+    link cannot be made, for example when src and dest_dir are on different filesystems.
+    Returns the routing method that was actually used.
+    """
+    try:
+        dest: str = os.path.join(dest_dir, os.path.basename(src))
+
+        if os.path.lexists(dest):
+            os.remove(dest)
+
+        if mode == "hardlink":
+            try:
+                os.link(src, dest)
+
+                return "hardlink"
+
+            except OSError as e:
+                if e.errno not in (
+                    errno.EXDEV,
+                    errno.EPERM,
+                    errno.EMLINK,
+                    errno.ENOTSUP,
+                ):
+                    raise
+
+        elif mode == "reflink":
+            try:
+                import fcntl
+
+                with open(src, "rb") as src_obj, open(dest, "wb") as dest_obj:
+                    fcntl.ioctl(dest_obj.fileno(), FICLONE, src_obj.fileno())
+
+                return "reflink"
+
+            except (ImportError, OSError) as e:
+                if isinstance(e, OSError) and e.errno not in (
+                    errno.EXDEV,
+                    errno.EOPNOTSUPP,
+                    errno.ENOTTY,
+                    errno.EINVAL,
+                ):
+                    raise
+
+        elif mode == "symlink":
+            os.symlink(os.path.abspath(src), dest)
+
+            return "symlink"
+
+        elif mode != "copy":
+            raise ValueError(f"Unknown file routing mode {mode}")
+
+        shutil.copy2(src, dest)
+
+        return "copy"
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
 def save_numpy_array_data(file_path: str, array: Union[np.array, np.ndarray]) -> None:
     logging.info("Entered the save_numpy_array_data class of MainUtils class")
 
@@ -71,7 +194,7 @@ def load_numpy_array_data(file_path: str) -> Union[np.array, np.ndarray]:
 
     try:
         with open(file_path, "rb") as file_obj:
-            obj = np.load(file_obj, allow_pickle=True)
+            obj = np.load(file_obj, allow_pickle=False)
 
         logging.info(f"Loaded numpy array from {file_path}")
 
@@ -83,6 +206,132 @@ def load_numpy_array_data(file_path: str) -> Union[np.array, np.ndarray]:
         raise PhisingException(e, sys)
 
 
+def save_compact_array_data(
+    file_path: str, array: Union[np.array, np.ndarray]
+) -> None:
+    """
+    Saves a 2-D array of small integer codes (the ternary phising features and the target) as int8 columns.
+
+    Cells which are not integers in the int8 range, such as values filled in by the imputer, are flagged in a
+    packed bitmap and their values are kept separately as float32, so the array is restored without loss.
+    """
+    logging.info("Entered the save_compact_array_data method of MainUtils class")
+
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        array: np.ndarray = np.asarray(array, dtype=np.float64)
+
+        values: np.ndarray = np.zeros(array.shape, dtype=np.int8)
+
+        with np.errstate(invalid="ignore"):
+            imputed: np.ndarray = ~(
+                (array == np.round(array)) & (array >= -128) & (array <= 127)
+            )
+
+        values[~imputed] = array[~imputed]
+
+        with open(file_path, "wb") as file_obj:
+            np.savez(
+                file_obj,
+                values=values,
+                imputed=np.packbits(imputed, axis=None),
+                imputed_values=array[imputed].astype(np.float32),
+            )
+
+        logging.info(
+            f"Saved {array.shape} array to {file_path} as int8 with {int(imputed.sum())} imputed cells, {os.path.getsize(file_path)} bytes against {array.nbytes} bytes as float64"
+        )
+
+        logging.info("Exited the save_compact_array_data method of MainUtils class")
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
+def load_compact_array_data(
+    file_path: str, mmap_mode: Union[str, None] = None
+) -> np.ndarray:
+    """
+    Loads an array saved by save_compact_array_data as float32.
+
+    With mmap_mode the array is returned as a read-only memory map of a float32 .npy file next to file_path, so
+    joblib workers share the same pages instead of receiving a pickled copy. The .npy file is decoded into only
+    when it is missing or older than file_path, straight through a writable memory map of it, so no float32 copy
+    of the array is built in memory.
+    """
+    logging.info("Entered the load_compact_array_data method of MainUtils class")
+
+    try:
+        decoded_file_path: str = os.path.splitext(file_path)[0] + ".float32.npy"
+
+        if mmap_mode is not None and (
+            os.path.exists(decoded_file_path)
+            and os.path.getmtime(decoded_file_path) >= os.path.getmtime(file_path)
+        ):
+            array: np.ndarray = np.load(
+                decoded_file_path, mmap_mode=mmap_mode, allow_pickle=False
+            )
+
+            logging.info(
+                f"Memory mapped {array.shape} array from {decoded_file_path} with mode {mmap_mode}"
+            )
+
+            logging.info(
+                "Exited the load_compact_array_data method of MainUtils class"
+            )
+
+            return array
+
+        with np.load(file_path, allow_pickle=False) as data:
+            values: np.ndarray = data["values"]
+
+            imputed_values: np.ndarray = data["imputed_values"]
+
+            if mmap_mode is None:
+                array: np.ndarray = np.empty(values.shape, dtype=np.float32)
+
+            else:
+                # written under a temporary name, so a partly decoded file is never taken as up to date
+                array: np.ndarray = np.lib.format.open_memmap(
+                    decoded_file_path + ".tmp",
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=values.shape,
+                )
+
+            array[...] = values
+
+            if imputed_values.size > 0:
+                imputed: np.ndarray = (
+                    np.unpackbits(data["imputed"], count=values.size)
+                    .reshape(values.shape)
+                    .astype(bool)
+                )
+
+                array[imputed] = imputed_values
+
+        if mmap_mode is not None:
+            array.flush()
+
+            del array
+
+            os.replace(decoded_file_path + ".tmp", decoded_file_path)
+
+            logging.info(f"Decoded {file_path} into {decoded_file_path}")
+
+            return load_compact_array_data(file_path, mmap_mode=mmap_mode)
+
+        logging.info(f"Loaded {array.shape} array from {file_path} as float32")
+
+        logging.info("Exited the load_compact_array_data method of MainUtils class")
+
+        return array
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
 def load_object(file_path: str) -> object:
     logging.info("Entered the load_object method of MainUtils class")
 
@@ -119,32 +368,154 @@ def sync_app_artifacts() -> None:
     try:
         s3 = S3Sync()
 
-        s3.sync_folder_to_s3(
-            folder=training_pipeline.ARTIFACT_DIR,
-            bucket_name=training_pipeline.APP_ARTIFACTS_BUCKET,
-            bucket_folder_name=training_pipeline.PIPELINE_NAME
-            + "/"
-            + training_pipeline.ARTIFACT_DIR,
-        )
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures: List[Future] = [
+                executor.submit(
+                    s3.sync_folder_to_s3,
+                    folder=folder,
+                    bucket_name=training_pipeline.APP_ARTIFACTS_BUCKET,
+                    bucket_folder_name=training_pipeline.PIPELINE_NAME + "/" + folder,
+                )
+                for folder in (training_pipeline.ARTIFACT_DIR, training_pipeline.LOG_DIR)
+            ]
 
-        s3.sync_folder_to_s3(
-            folder=training_pipeline.LOG_DIR,
-            bucket_name=training_pipeline.APP_ARTIFACTS_BUCKET,
-            bucket_folder_name=training_pipeline.PIPELINE_NAME
-            + "/"
-            + training_pipeline.LOG_DIR,
-        )
+            for future in futures:
+                future.result()
 
     except Exception as e:
         raise PhisingException(e, sys)
 
 
-def build_and_push_bento_image(model_uri: str) -> None:
+def get_serving_model(
+    model: object, compiled_model_file_path: Union[str, None] = None
+) -> Union[ServingModel, None]:
+    """
+    Converts a phisingModel into its slim serving form, when it converts and predicts the same as the model on
+    random ternary rows with missing values. Returns None otherwise. The trained model is loaded from the
+    compiled model the model trainer saved at compiled_model_file_path, and compiled here when there is none.
+    """
+    logging.info("Entered the get_serving_model method of MainUtils class")
+
     try:
-        bentoml.mlflow.import_model(
-            name=training_pipeline.MODEL_PUSHER_BENTOML_MODEL_NAME, model_uri=model_uri
+        try:
+            serving_model: ServingModel = ServingModel.from_phising_model(
+                model,
+                compiled_model=CompiledForest.load(compiled_model_file_path)
+                if compiled_model_file_path is not None
+                else None,
+            )
+
+        except PhisingException as e:
+            logging.info(f"Can not convert {model} to a serving model: {e}")
+
+            return None
+
+        rng: np.random.Generator = np.random.default_rng(0)
+
+        rows: np.ndarray = rng.integers(
+            -1,
+            2,
+            size=(
+                training_pipeline.MODEL_PUSHER_SERVING_MODEL_CHECK_ROWS,
+                model.preprocessing_object.n_features_in_,
+            ),
+        ).astype(np.float64)
+
+        rows[rng.random(rows.shape) < 0.05] = np.nan
+
+        if not np.array_equal(serving_model.predict(rows), model.predict(None, rows)):
+            logging.info(f"Serving model of {model} disagrees with the model, not using it")
+
+            return None
+
+        logging.info("Exited the get_serving_model method of MainUtils class")
+
+        return serving_model
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
+def import_serving_model(serving_model: ServingModel, model_uri: str) -> None:
+    """
+    Saves the serving model into the bentoml model store under the bentoml model name, along with the
+    requirements of the mlflow model it was converted from, at the path the bentofile reads them from. Its
+    feature names are kept in the metadata, the model service caches only rows having that many features.
+    """
+    logging.info("Entered the import_serving_model method of MainUtils class")
+
+    try:
+        with bentoml.models.create(
+            training_pipeline.MODEL_PUSHER_BENTOML_MODEL_NAME,
+            module=ServingModel.__module__,
+            signatures={
+                "predict": {
+                    "batchable": training_pipeline.MODEL_SERVICE_BATCHABLE,
+                    "batch_dim": training_pipeline.MODEL_SERVICE_BATCH_DIM,
+                }
+            },
+            metadata={
+                "model_uri": model_uri,
+                "feature_names": list(serving_model.feature_names or []),
+            },
+            context=ModelContext(
+                framework_name="phising", framework_versions={"numpy": np.__version__}
+            ),
+        ) as bento_model:
+            serving_model.save(bento_model.path)
+
+            requirements_dir: str = os.path.join(bento_model.path, "mlflow_model")
+
+            os.makedirs(requirements_dir, exist_ok=True)
+
+            shutil.copy(
+                mlflow.pyfunc.get_model_dependencies(model_uri),
+                os.path.join(requirements_dir, "requirements.txt"),
+            )
+
+        logging.info(f"Imported serving model of {model_uri} as {bento_model.tag}")
+
+        logging.info("Exited the import_serving_model method of MainUtils class")
+
+    except Exception as e:
+        raise PhisingException(e, sys)
+
+
+def build_and_push_bento_image(
+    model_uri: str,
+    model: object = None,
+    compiled_model_file_path: Union[str, None] = None,
+) -> None:
+    """
+    Imports the model into bentoml and containerizes the service. The model, the phisingModel logged at
+    model_uri, is imported in its slim serving form when it converts, the mlflow model is imported otherwise.
+    compiled_model_file_path is the compiled model the model trainer saved for it, if any.
+    """
+    try:
+        serving_model: Union[ServingModel, None] = (
+            get_serving_model(model, compiled_model_file_path=compiled_model_file_path)
+            if model is not None and training_pipeline.MODEL_PUSHER_SLIM_SERVING_MODEL
+            else None
         )
 
+        if serving_model is not None:
+            import_serving_model(serving_model, model_uri=model_uri)
+
+        else:
+            bentoml.mlflow.import_model(
+                name=training_pipeline.MODEL_PUSHER_BENTOML_MODEL_NAME,
+                model_uri=model_uri,
+                metadata={
+                    "feature_names": list(getattr(model, "feature_names", None) or [])
+                },
+                signatures={
+                    "predict": {
+                        "batchable": training_pipeline.MODEL_SERVICE_BATCHABLE,
+                        "batch_dim": training_pipeline.MODEL_SERVICE_BATCH_DIM,
+                    }
+                },
+            )
+
         os.system(
             f"bentoml containerize {training_pipeline.MODEL_PUSHER_BENTOML_SERVICE_NAME}:latest {training_pipeline.MODEL_PUSHER_MODEL_ECR_URI}"
         )
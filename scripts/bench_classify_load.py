@@ -0,0 +1,190 @@
+"""
+Load test of the classify endpoint of the bentoml service.
+
+Serves phising.ml.model.model_service:svc with bentoml serve, once with adaptive batching of the runner turned
+off and once with it on, and sends single row classify requests from --concurrency client threads for
+--seconds each time. The rows are taken from notebooks/phising.csv. Reports the p50 and p99 request latency
+and the requests per second of both runs.
+
+The phising-model bentoml model must already be imported, as the model pusher does.
+
+Usage: python scripts/bench_classify_load.py --concurrency 64 --seconds 30
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phising.constant import training_pipeline
+
+
+def wait_until_ready(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+
+            conn.request("GET", "/readyz")
+
+            if conn.getresponse().status == 200:
+                return
+
+        except OSError:
+            pass
+
+        time.sleep(0.5)
+
+    raise TimeoutError(f"bentoml service on port {port} not ready after {timeout}s")
+
+
+def client(
+    port: int, bodies: List[bytes], stop_at: float, latencies: List[float], errors: List[int]
+) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+
+    i = 0
+
+    while time.monotonic() < stop_at:
+        body = bodies[i % len(bodies)]
+
+        i += 1
+
+        start = time.perf_counter()
+
+        try:
+            conn.request(
+                "POST", "/classify", body=body, headers={"Content-Type": "application/json"}
+            )
+
+            response = conn.getresponse()
+
+            response.read()
+
+            if response.status != 200:
+                errors.append(response.status)
+
+                continue
+
+        except (OSError, http.client.HTTPException):
+            errors.append(0)
+
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+
+            continue
+
+        latencies.append(time.perf_counter() - start)
+
+
+def run_load(port: int, bodies: List[bytes], concurrency: int, seconds: float):
+    latencies: List[float] = []
+
+    errors: List[int] = []
+
+    stop_at = time.monotonic() + seconds
+
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(port, bodies[i::concurrency], stop_at, latencies, errors),
+        )
+        for i in range(concurrency)
+    ]
+
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return np.array(latencies), len(errors), time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--concurrency", type=int, default=64)
+
+    parser.add_argument("--seconds", type=float, default=30.0)
+
+    parser.add_argument("--port", type=int, default=3000)
+
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+
+    args = parser.parse_args()
+
+    rows = (
+        pd.read_csv("notebooks/phising.csv")
+        .drop(columns=[training_pipeline.TARGET_COLUMN])
+        .to_numpy()
+    )
+
+    bodies = [json.dumps([row.tolist()]).encode() for row in rows[: args.concurrency * 50]]
+
+    print(
+        f"concurrency={args.concurrency} seconds={args.seconds} max_batch_size={training_pipeline.MODEL_SERVICE_MAX_BATCH_SIZE} "
+        f"max_latency_ms={training_pipeline.MODEL_SERVICE_MAX_LATENCY_MS}"
+    )
+
+    print(f"{'batching':<10} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for batching in (False, True):
+            config_path = os.path.join(tmp, f"bentoml_batching_{batching}.yaml")
+
+            with open(config_path, "w") as f:
+                f.write(f"runners:\n  batching:\n    enabled: {str(batching).lower()}\n")
+
+            server = subprocess.Popen(
+                [
+                    "bentoml",
+                    "serve",
+                    "phising.ml.model.model_service:svc",
+                    "--production",
+                    "--port",
+                    str(args.port),
+                ],
+                env={**os.environ, "BENTOML_CONFIG": config_path},
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+
+            try:
+                wait_until_ready(args.port, args.startup_timeout)
+
+                # warm up the runner before measuring
+                run_load(args.port, bodies, args.concurrency, 2.0)
+
+                latencies, n_errors, elapsed = run_load(
+                    args.port, bodies, args.concurrency, args.seconds
+                )
+
+            finally:
+                server.terminate()
+
+                server.wait()
+
+            p50, p99 = (
+                np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (np.nan, np.nan)
+            )
+
+            print(
+                f"{str(batching):<10} {len(latencies):>9} {n_errors:>7} {len(latencies) / elapsed:>9.1f} {p50:>8.2f} {p99:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
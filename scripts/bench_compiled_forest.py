@@ -0,0 +1,90 @@
+"""
+Benchmark of the compiled tree evaluator against the predict of the trained models.
+
+Trains a RandomForestClassifier and an XGBClassifier on notebooks/phising.csv with parameters from the grids of
+config/model.yaml, compiles both with CompiledForest and checks that the compiled models predict the held-out
+test set identically. Then reports the median latency of predict on batches of every requested size, for the
+trained model and the compiled one.
+
+Usage: python scripts/bench_compiled_forest.py --batch-sizes 1 32 1024 --repeats 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phising.constant import training_pipeline
+from phising.ml.model.compiled_forest import CompiledForest
+
+
+def median_latency(predict, x: np.ndarray, repeats: int) -> float:
+    timings = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+
+        predict(x)
+
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024])
+
+    parser.add_argument("--repeats", type=int, default=50)
+
+    args = parser.parse_args()
+
+    df = pd.read_csv("notebooks/phising.csv")
+
+    y = df.pop(training_pipeline.TARGET_COLUMN).replace(-1, 0).to_numpy()
+
+    x_train, x_test, y_train, y_test = train_test_split(
+        df.to_numpy(dtype=np.float64), y, test_size=0.2, random_state=0
+    )
+
+    models = {
+        "random_forest": RandomForestClassifier(
+            n_estimators=130, max_depth=5, random_state=0
+        ),
+        "xgboost": XGBClassifier(n_estimators=200, max_depth=10, learning_rate=0.1),
+    }
+
+    print(f"{'model':<14} {'trees':>6} {'agree':>6} {'batch':>6} {'predict ms':>11} {'compiled ms':>12} {'speedup':>8}")
+
+    for name, model in models.items():
+        model.fit(x_train, y_train)
+
+        compiled_model = CompiledForest.from_model(model)
+
+        agree = np.array_equal(compiled_model.predict(x_test), model.predict(x_test))
+
+        rows = np.resize(x_test, (max(args.batch_sizes), x_test.shape[1]))
+
+        for batch_size in args.batch_sizes:
+            batch = rows[:batch_size]
+
+            predict_s = median_latency(model.predict, batch, args.repeats)
+
+            compiled_s = median_latency(compiled_model.predict, batch, args.repeats)
+
+            print(
+                f"{name:<14} {len(compiled_model.roots):>6} {str(agree):>6} {batch_size:>6} {predict_s * 1000:>11.3f} "
+                f"{compiled_s * 1000:>12.3f} {predict_s / compiled_s:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
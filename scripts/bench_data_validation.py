@@ -0,0 +1,147 @@
+"""
+Benchmark of the data validation stage.
+
+Generates synthetic phising batch files and compares the number of csv parses and the wall time of the
+legacy three pass validation (copy, column length pass, missing values pass, merge pass and train test split)
+against the single pass validation and streaming merge of DataValidation.
+
+Usage: python scripts/bench_data_validation.py --files 500 --rows 200
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phising.components.data_validation import DataValidation
+from phising.entity.artifact_entity import DataIngestionArtifact
+from phising.entity.config_entity import DataValidationConfig, TrainingPipelineConfig
+from phising.utils.main_utils import read_yaml
+
+
+def make_feature_store(folder: str, n_files: int, n_rows: int) -> None:
+    os.makedirs(folder, exist_ok=True)
+
+    columns = list(read_yaml("config/phising_schema_training.yaml")["ColName"])
+
+    rng = np.random.default_rng(0)
+
+    for i in range(n_files):
+        df = pd.DataFrame(
+            rng.integers(-1, 2, size=(n_rows, len(columns))), columns=columns
+        )
+
+        if i % 10 == 0:
+            df[columns[0]] = np.nan
+
+        df.to_csv(os.path.join(folder, f"phising_0801{2000 + i:04d}_120000.csv"), index=False)
+
+
+def count_parses(fn: Callable[[], object]) -> Dict[str, float]:
+    calls = {"n": 0}
+
+    read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        calls["n"] += 1
+
+        return read_csv(*args, **kwargs)
+
+    pd.read_csv = counting_read_csv
+
+    try:
+        start = time.perf_counter()
+
+        fn()
+
+        return {"parses": calls["n"], "seconds": time.perf_counter() - start}
+
+    finally:
+        pd.read_csv = read_csv
+
+
+def legacy_validation(dv: DataValidation, feature_store: str) -> None:
+    valid_dir = dv.data_validation_config.data_validation_valid_data_dir
+
+    invalid_dir = dv.data_validation_config.data_validation_invalid_data_dir
+
+    for fname in os.listdir(feature_store):
+        shutil.copy(os.path.join(feature_store, fname), valid_dir)
+
+    for fname in os.listdir(valid_dir):
+        if pd.read_csv(os.path.join(valid_dir, fname)).shape[1] != 31:
+            shutil.move(os.path.join(valid_dir, fname), invalid_dir)
+
+    for fname in os.listdir(valid_dir):
+        if pd.read_csv(os.path.join(valid_dir, fname)).isnull().all().any():
+            shutil.move(os.path.join(valid_dir, fname), invalid_dir)
+
+    merged = pd.concat(
+        [pd.read_csv(os.path.join(valid_dir, f)) for f in os.listdir(valid_dir)],
+        ignore_index=True,
+    )
+
+    merged.to_csv(os.path.join(os.path.dirname(valid_dir), "merged.csv"), index=False)
+
+    train, test = train_test_split(merged, test_size=0.3)
+
+    train.to_csv(os.path.join(os.path.dirname(valid_dir), "train.csv"), index=False)
+
+    test.to_csv(os.path.join(os.path.dirname(valid_dir), "test.csv"), index=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--files", type=int, default=500)
+
+    parser.add_argument("--rows", type=int, default=200)
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feature_store = os.path.join(tmp, "feature_store")
+
+        make_feature_store(feature_store, args.files, args.rows)
+
+        results = {}
+
+        for name in ("legacy", "single_pass"):
+            training_pipeline_config = TrainingPipelineConfig()
+
+            training_pipeline_config.artifact_dir = os.path.join(tmp, name)
+
+            config = DataValidationConfig(training_pipeline_config)
+
+            config.data_validation_cache_file_path = os.path.join(
+                tmp, name, "data_validation_cache.json"
+            )
+
+            os.makedirs(config.data_validation_valid_data_dir)
+
+            os.makedirs(config.data_validation_invalid_data_dir)
+
+            dv = DataValidation(DataIngestionArtifact(feature_store), config)
+
+            if name == "legacy":
+                results[name] = count_parses(lambda: legacy_validation(dv, feature_store))
+
+            else:
+                results[name] = count_parses(
+                    lambda: dv.merge_batch_data(dv.validate_batch_files(8, 6, 31))
+                )
+
+        for name, result in results.items():
+            print(f"{name:<12} parses={result['parses']:<6} wall={result['seconds']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
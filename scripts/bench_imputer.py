@@ -0,0 +1,92 @@
+"""
+Benchmark of the imputer strategies of the data transformation stage.
+
+Uses notebooks/phising.csv replicated to the requested number of rows. A fraction of the cells of a held-out
+part is blanked out, every imputer is fitted on the training part and used to fill the blanks. Reports fit and
+transform time and, against the true values, the mean absolute error and the share of cells recovered exactly
+after rounding.
+
+Usage: python scripts/bench_imputer.py --rows 11055 100000 --missing 0.05
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.impute import KNNImputer, SimpleImputer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phising.constant import training_pipeline
+from phising.ml.model.imputer import NearestPatternImputer
+
+
+def get_imputers():
+    return {
+        "knn": KNNImputer(**training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS),
+        "nearest_pattern": NearestPatternImputer(
+            **training_pipeline.DATA_TRANSFORMATION_NEAREST_PATTERN_IMPUTER_PARAMS
+        ),
+        "mode": SimpleImputer(**training_pipeline.DATA_TRANSFORMATION_MODE_IMPUTER_PARAMS),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--rows", type=int, nargs="+", default=[11055, 100000])
+
+    parser.add_argument("--missing", type=float, default=0.05)
+
+    parser.add_argument("--test-rows", type=int, default=2000)
+
+    parser.add_argument("--skip-knn-above", type=int, default=200000)
+
+    args = parser.parse_args()
+
+    df = pd.read_csv("notebooks/phising.csv").drop(columns=[training_pipeline.TARGET_COLUMN])
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'rows':>8} {'imputer':<16} {'fit s':>8} {'transform s':>12} {'mae':>8} {'exact':>8}")
+
+    for n_rows in args.rows:
+        data = df.sample(n=n_rows + args.test_rows, replace=True, random_state=0)
+
+        train = data.iloc[:n_rows].copy()
+
+        train = train.mask(rng.random(train.shape) < args.missing)
+
+        truth = data.iloc[n_rows:].to_numpy(dtype=np.float64)
+
+        blanks = rng.random(truth.shape) < args.missing
+
+        test = pd.DataFrame(np.where(blanks, np.nan, truth), columns=df.columns)
+
+        for name, imputer in get_imputers().items():
+            if name == "knn" and n_rows > args.skip_knn_above:
+                continue
+
+            start = time.perf_counter()
+
+            imputer.fit(train)
+
+            fitted = time.perf_counter()
+
+            filled = np.asarray(imputer.transform(test))
+
+            transformed = time.perf_counter()
+
+            mae = np.abs(filled[blanks] - truth[blanks]).mean()
+
+            exact = (np.round(filled[blanks]) == truth[blanks]).mean()
+
+            print(
+                f"{n_rows:>8} {name:<16} {fitted - start:>8.3f} {transformed - fitted:>12.3f} {mae:>8.4f} {exact:>8.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
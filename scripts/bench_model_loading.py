@@ -0,0 +1,179 @@
+"""
+Benchmark of model loading at service startup.
+
+Fits the imputer of the data transformation stage and a RandomForestClassifier and an XGBClassifier on
+notebooks/phising.csv, wraps each in a phisingModel and saves it twice: dill-pickled, as the mlflow pyfunc
+model holds it, and as the slim ServingModel directory the model pusher imports into bentoml. Every form is
+then loaded in --repeats fresh Python processes, which report the time to import the modules the form needs,
+to load the model and to predict one row, and whether mlflow and xgboost got imported.
+
+Usage: python scripts/bench_model_loading.py --imputer knn --repeats 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import dill
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import KNNImputer, SimpleImputer
+from sklearn.pipeline import Pipeline
+from xgboost import XGBClassifier
+
+ROOT_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_DIR)
+
+from phising.constant import training_pipeline
+from phising.ml.model.estimator import phisingModel
+from phising.ml.model.imputer import NearestPatternImputer
+from phising.ml.model.serving_model import ServingModel
+
+LOAD_PICKLED = """
+import time
+start = time.perf_counter()
+import dill
+import numpy as np
+from phising.ml.model.estimator import phisingModel
+imported = time.perf_counter()
+with open(path, "rb") as f:
+    model = dill.load(f)
+model.prepare_numpy_path()
+loaded = time.perf_counter()
+model.predict(None, row)
+"""
+
+LOAD_SLIM = """
+import time
+start = time.perf_counter()
+import numpy as np
+from phising.ml.model.serving_model import ServingModel
+imported = time.perf_counter()
+model = ServingModel.load(path)
+loaded = time.perf_counter()
+model.predict(row)
+"""
+
+REPORT = """
+predicted = time.perf_counter()
+import json, sys
+print(json.dumps({
+    "import": imported - start, "load": loaded - imported, "predict": predicted - loaded,
+    "mlflow": "mlflow" in sys.modules, "xgboost": "xgboost" in sys.modules,
+}))
+"""
+
+
+def get_imputer(name: str):
+    if name == "knn":
+        return KNNImputer(**training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS)
+
+    if name == "nearest_pattern":
+        return NearestPatternImputer(
+            **training_pipeline.DATA_TRANSFORMATION_NEAREST_PATTERN_IMPUTER_PARAMS
+        )
+
+    return SimpleImputer(**training_pipeline.DATA_TRANSFORMATION_MODE_IMPUTER_PARAMS)
+
+
+def get_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def run(code: str, path: str, row: list) -> dict:
+    setup = f"import json, numpy\npath = {path!r}\nrow = numpy.array([json.loads({json.dumps(row)!r})])\n"
+
+    output = subprocess.run(
+        [sys.executable, "-c", setup + code + REPORT],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--imputer", choices=["knn", "nearest_pattern", "mode"], default="knn"
+    )
+
+    parser.add_argument("--missing", type=float, default=0.03)
+
+    parser.add_argument("--repeats", type=int, default=5)
+
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT_DIR, "notebooks", "phising.csv"))
+
+    y = df.pop(training_pipeline.TARGET_COLUMN).replace(-1, 0).to_numpy()
+
+    rng = np.random.default_rng(0)
+
+    df = df.mask(rng.random(df.shape) < args.missing)
+
+    preprocessing_object = Pipeline([("imputer", get_imputer(args.imputer))]).fit(df)
+
+    x = preprocessing_object.transform(df)
+
+    row = df.iloc[0].tolist()
+
+    models = {
+        "random_forest": RandomForestClassifier(n_estimators=130, max_depth=5, random_state=0),
+        "xgboost": XGBClassifier(n_estimators=200, max_depth=10, learning_rate=0.1),
+    }
+
+    print(f"imputer={args.imputer} repeats={args.repeats}, median seconds")
+
+    print(
+        f"{'model':<14} {'form':<8} {'size MB':>8} {'import':>8} {'load':>8} {'predict':>8} {'total':>8} {'mlflow':>7} {'xgboost':>8}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, model in models.items():
+            model.fit(x, y)
+
+            trained_model = phisingModel(
+                preprocessing_object=preprocessing_object,
+                trained_model_object=model,
+                feature_names=list(df.columns),
+            )
+
+            pickled_path = os.path.join(tmp, f"{name}.pkl")
+
+            with open(pickled_path, "wb") as f:
+                dill.dump(trained_model, f)
+
+            slim_path = os.path.join(tmp, f"{name}_serving_model")
+
+            ServingModel.from_phising_model(trained_model).save(slim_path)
+
+            for form, code, path in (
+                ("pickled", LOAD_PICKLED, pickled_path),
+                ("slim", LOAD_SLIM, slim_path),
+            ):
+                runs = [run(code, path, row) for _ in range(args.repeats)]
+
+                timings = {
+                    key: float(np.median([r[key] for r in runs]))
+                    for key in ("import", "load", "predict")
+                }
+
+                print(
+                    f"{name:<14} {form:<8} {get_size(path) / 2**20:>8.2f} {timings['import']:>8.3f} {timings['load']:>8.3f} "
+                    f"{timings['predict']:>8.3f} {sum(timings.values()):>8.3f} {str(runs[0]['mlflow']):>7} {str(runs[0]['xgboost']):>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
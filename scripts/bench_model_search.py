@@ -0,0 +1,129 @@
+"""
+Benchmark of the hyperparameter search backends of the model trainer.
+
+Runs ModelSearch over the model config (config/model.yaml by default) with every backend on a synthetic
+ternary phising training set, and reports the search time, its speedup over the exhaustive grid backend, and
+the test ROC-AUC of the best model. The baseline is the exhaustive grid backend without early stopping, as
+ModelFactory ran it, and every backend is checked to stay within --tolerance of its test ROC-AUC.
+
+Usage: python scripts/bench_model_search.py --rows 11000 --tolerance 0.01 --early-stopping-rounds 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_data(rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+
+    x = rng.integers(-1, 2, size=(rows, 30)).astype(np.float64)
+
+    logit = x[:, :10] @ rng.normal(size=10) + 1.5 * x[:, 10] * x[:, 11]
+
+    y = (logit + rng.normal(scale=1.5, size=rows) > 0).astype(np.float64)
+
+    return x, y
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--rows", type=int, default=11000)
+
+    parser.add_argument("--tolerance", type=float, default=0.01)
+
+    parser.add_argument("--model-config", default="config/model.yaml")
+
+    # early stopping is off by default in the trainer, the bench turns it on for the backends supporting it
+    parser.add_argument("--early-stopping-rounds", type=int, default=10)
+
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=["grid", "halving_grid", "halving_random", "random"],
+    )
+
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+
+    from sklearn.model_selection import train_test_split
+
+    from phising.constant import training_pipeline
+    from phising.ml.metric import calculate_metric
+    from phising.ml.search import ModelSearch
+
+    x, y = make_data(args.rows)
+
+    x_train, x_test, y_train, y_test = train_test_split(
+        x, y, test_size=0.2, stratify=y, random_state=0
+    )
+
+    with open(args.model_config) as f:
+        model_config = yaml.safe_load(f)
+
+    model_config["grid_search"]["params"]["verbose"] = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_config_path = os.path.join(tmp, "model.yaml")
+
+        with open(model_config_path, "w") as f:
+            yaml.safe_dump(model_config, f)
+
+        results = {}
+
+        print(
+            f"{'backend':<16} {'seconds':>8} {'speedup':>8} {'cv score':>9} {'test auc':>9}  best model"
+        )
+
+        for name in ["exhaustive"] + args.backends:
+            backend = "grid" if name == "exhaustive" else name
+
+            search = ModelSearch(
+                model_config_path=model_config_path,
+                backend=backend,
+                n_candidates=training_pipeline.MODEL_TRAINER_SEARCH_N_CANDIDATES,
+                halving_factor=training_pipeline.MODEL_TRAINER_SEARCH_HALVING_FACTOR,
+                early_stopping_rounds=0
+                if name == "exhaustive"
+                else args.early_stopping_rounds,
+                early_stopping_validation_size=training_pipeline.MODEL_TRAINER_EARLY_STOPPING_VALIDATION_SIZE,
+                random_state=training_pipeline.MODEL_TRAINER_SEARCH_RANDOM_STATE,
+            )
+
+            start = time.perf_counter()
+
+            best = search.get_best_model(x_train, y_train, base_accuracy=0.5)
+
+            seconds = time.perf_counter() - start
+
+            test_auc = calculate_metric(best.best_model, x_test, y_test)
+
+            results[name] = (seconds, test_auc)
+
+            speedup = f"{results['exhaustive'][0] / seconds:.1f}x"
+
+            print(
+                f"{name:<16} {seconds:>8.1f} {speedup:>8} {best.best_score:>9.4f} {test_auc:>9.4f}  "
+                f"{type(best.best_model).__name__} {best.best_parameters}"
+            )
+
+        for name, (_, test_auc) in results.items():
+            drop = results["exhaustive"][1] - test_auc
+
+            print(
+                f"{name:<16} test auc drop {drop:+.4f} "
+                f"{'within' if drop <= args.tolerance else 'OUTSIDE'} tolerance {args.tolerance}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark of the memory used by the grid search of the model trainer.
+
+Fits a GridSearchCV over a synthetic ternary training set loaded either fully in memory or memory mapped
+(load_compact_array_data with mmap_mode="r"), for a range of n_jobs values, and reports the peak
+proportional set size (PSS) summed over the process and all of its joblib workers.
+
+Usage: python scripts/bench_model_trainer_memory.py --rows 500000 --n-jobs 1 2 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def process_tree_pss_kb(root_pid: int) -> int:
+    children = {}
+
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+
+            children.setdefault(ppid, []).append(int(pid))
+
+        except (OSError, IndexError, ValueError):
+            continue
+
+    total, stack = 0, [root_pid]
+
+    while stack:
+        pid = stack.pop()
+
+        stack.extend(children.get(pid, []))
+
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total += int(line.split()[1])
+
+                        break
+
+        except OSError:
+            continue
+
+    return total
+
+
+def run_search(file_path: str, mmap_mode: str, n_jobs: int) -> None:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import GridSearchCV
+
+    from phising.utils.main_utils import load_compact_array_data
+
+    peak = {"kb": 0}
+
+    done = threading.Event()
+
+    def sample() -> None:
+        while not done.is_set():
+            peak["kb"] = max(peak["kb"], process_tree_pss_kb(os.getpid()))
+
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+
+    sampler.start()
+
+    start = time.perf_counter()
+
+    train_arr = load_compact_array_data(
+        file_path, mmap_mode=None if mmap_mode == "none" else mmap_mode
+    )
+
+    GridSearchCV(
+        RandomForestClassifier(n_jobs=1),
+        param_grid={"n_estimators": [10, 20], "max_depth": [3, 5]},
+        cv=3,
+        n_jobs=n_jobs,
+        scoring="roc_auc",
+    ).fit(train_arr[:, :-1], train_arr[:, -1])
+
+    done.set()
+
+    sampler.join()
+
+    print(
+        json.dumps(
+            {
+                "mmap_mode": mmap_mode,
+                "n_jobs": n_jobs,
+                "peak_pss_mb": round(peak["kb"] / 1024, 1),
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--rows", type=int, default=500000)
+
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    parser.add_argument("--worker", nargs=3, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        run_search(args.worker[0], args.worker[1], int(args.worker[2]))
+
+        return
+
+    from phising.utils.main_utils import save_compact_array_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "train.npz")
+
+        rng = np.random.default_rng(0)
+
+        train_arr = rng.integers(-1, 2, size=(args.rows, 31)).astype(np.float64)
+
+        train_arr[:, -1] = (train_arr[:, :3].sum(axis=1) > 0).astype(np.float64)
+
+        save_compact_array_data(file_path, train_arr)
+
+        del train_arr
+
+        print(f"{'mmap_mode':<10} {'n_jobs':>6} {'peak PSS MB':>12} {'seconds':>8}")
+
+        for mmap_mode in ("none", "r"):
+            for n_jobs in args.n_jobs:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--worker", file_path, mmap_mode, str(n_jobs)],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout.strip().splitlines()[-1]
+
+                result = json.loads(out)
+
+                print(
+                    f"{result['mmap_mode']:<10} {result['n_jobs']:>6} {result['peak_pss_mb']:>12} {result['seconds']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of the parallel model family search of the model trainer.
+
+Runs ModelSearch over the model config (config/model.yaml by default) on a synthetic ternary phising training
+set, first searching the model families one after the other as ModelFactory did, every search using the n_jobs
+of the model config, then searching them at the same time in one process each with a core budget per family,
+and reports the total wall time of both.
+
+Usage: python scripts/bench_parallel_families.py --rows 11000 --family-n-jobs module_0=8 module_1=8
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--rows", type=int, default=11000)
+
+    parser.add_argument("--model-config", default="config/model.yaml")
+
+    parser.add_argument("--backend", default="grid")
+
+    parser.add_argument(
+        "--family-n-jobs",
+        nargs="*",
+        default=[],
+        help="model serial number=cores, the other families share the remaining cores",
+    )
+
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+
+    from phising.constant import training_pipeline
+    from phising.ml.search import ModelSearch
+    from phising.utils.main_utils import get_n_cores
+
+    rng = np.random.default_rng(0)
+
+    x = rng.integers(-1, 2, size=(args.rows, 30)).astype(np.float64)
+
+    logit = x[:, :10] @ rng.normal(size=10) + 1.5 * x[:, 10] * x[:, 11]
+
+    y = (logit + rng.normal(scale=1.5, size=args.rows) > 0).astype(np.float64)
+
+    family_n_jobs = {
+        serial: int(n_jobs)
+        for serial, n_jobs in (item.split("=") for item in args.family_n_jobs)
+    }
+
+    print(f"{get_n_cores()} cores, {args.rows} rows, {args.backend} backend")
+
+    for parallel_families in (False, True):
+        search = ModelSearch(
+            model_config_path=args.model_config,
+            backend=args.backend,
+            early_stopping_rounds=training_pipeline.MODEL_TRAINER_EARLY_STOPPING_ROUNDS,
+            parallel_families=parallel_families,
+            family_n_jobs=family_n_jobs,
+        )
+
+        search.grid_search_property_data["verbose"] = 0
+
+        start = time.perf_counter()
+
+        best = search.get_best_model(x, y, base_accuracy=0.5)
+
+        print(
+            f"parallel_families={str(parallel_families):<6} wall={time.perf_counter() - start:.1f}s "
+            f"cores={search.n_jobs_budget or search.grid_search_property_data.get('n_jobs')} "
+            f"best={type(best.best_model).__name__} cv score={best.best_score:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark of the S3Sync transfer engine.
+
+Uploads a folder of synthetic batch files and a few large multipart files, syncs it again to check that
+unchanged objects are skipped, then downloads it twice, reporting the S3SyncMetrics of every sync.
+
+Runs against an in-process moto mock of s3 by default. Set AWS_S3_ENDPOINT_URL (and the AWS credentials) to
+run it against a local s3 stand-in such as MinIO or a moto server instead.
+
+Usage: python scripts/bench_s3_sync.py --files 200 --file-kb 64 --large-files 2 --large-mb 20
+"""
+import argparse
+import contextlib
+import filecmp
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phising.constant.env_variable import AWS_S3_ENDPOINT_URL_KEY
+
+
+def make_folder(folder: str, n_files: int, file_kb: int, n_large: int, large_mb: int) -> None:
+    os.makedirs(os.path.join(folder, "large"), exist_ok=True)
+
+    for i in range(n_files):
+        with open(os.path.join(folder, f"phising_0801{2000 + i:04d}_120000.csv"), "wb") as f:
+            f.write(os.urandom(file_kb * 1024))
+
+    for i in range(n_large):
+        with open(os.path.join(folder, "large", f"part_{i}.bin"), "wb") as f:
+            f.write(os.urandom(large_mb * 1024 * 1024))
+
+
+def report(name: str, metrics) -> None:
+    print(
+        f"{name:<16} transferred={metrics.files_transferred:<5} skipped={metrics.files_skipped:<5} "
+        f"MB={metrics.bytes_transferred / 1024 / 1024:<8.1f} wall={metrics.seconds:.3f}s "
+        f"throughput={metrics.throughput_mb_per_sec:.1f} MB/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--files", type=int, default=200)
+
+    parser.add_argument("--file-kb", type=int, default=64)
+
+    parser.add_argument("--large-files", type=int, default=2)
+
+    parser.add_argument("--large-mb", type=int, default=20)
+
+    parser.add_argument("--bucket", default="phising-bench")
+
+    args = parser.parse_args()
+
+    if os.getenv(AWS_S3_ENDPOINT_URL_KEY) is None:
+        from moto import mock_aws
+
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+        os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+        mock = mock_aws()
+
+    else:
+        mock = contextlib.nullcontext()
+
+    with mock, tempfile.TemporaryDirectory() as tmp:
+        from phising.cloud_storage.aws_operations import S3Sync
+
+        s3 = S3Sync()
+
+        s3.s3_client.create_bucket(Bucket=args.bucket)
+
+        src, dest = os.path.join(tmp, "src"), os.path.join(tmp, "dest")
+
+        make_folder(src, args.files, args.file_kb, args.large_files, args.large_mb)
+
+        report("upload", s3.sync_folder_to_s3(src, args.bucket, "bench"))
+
+        report("upload again", s3.sync_folder_to_s3(src, args.bucket, "bench"))
+
+        report("download", s3.sync_folder_from_s3(dest, args.bucket, "bench"))
+
+        report("download again", s3.sync_folder_from_s3(dest, args.bucket, "bench"))
+
+        cmp = filecmp.dircmp(src, dest)
+
+        assert not cmp.diff_files and not cmp.left_only and not cmp.right_only
+
+        print("downloaded folder matches the uploaded folder")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark of streaming ingestion.
+
+Puts synthetic phising batch files in an in-process moto mock of s3, then runs a cold data ingestion and data
+validation twice: first with the whole download finishing before validation starts, then in streaming mode
+where DataValidation consumes the batch files as DataIngestion downloads them. Every download is slowed
+down to --mb-per-sec per transfer thread to stand in for a real network link.
+
+Usage: python scripts/bench_streaming_ingestion.py --files 200 --rows 2000 --mb-per-sec 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--files", type=int, default=200)
+
+    parser.add_argument("--rows", type=int, default=2000)
+
+    parser.add_argument("--mb-per-sec", type=float, default=2.0)
+
+    args = parser.parse_args()
+
+    from moto import mock_aws
+
+    with mock_aws(), tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+
+        from phising.cloud_storage.aws_operations import S3Sync
+        from phising.components.data_ingestion import DataIngestion
+        from phising.components.data_validation import DataValidation
+        from phising.configuration.aws_connection import S3Client
+        from phising.constant import training_pipeline
+        from phising.entity.config_entity import (
+            DataIngestionConfig,
+            DataValidationConfig,
+            TrainingPipelineConfig,
+        )
+        from phising.utils.main_utils import read_yaml
+
+        client = S3Client().client
+
+        bucket = training_pipeline.DATA_INGESTION_BUCKET_NAME
+
+        client.create_bucket(Bucket=bucket)
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        columns = list(
+            read_yaml(os.path.join(root, training_pipeline.DATA_VALIDATION_TRAIN_SCHEMA))[
+                "ColName"
+            ]
+        )
+
+        rng = np.random.default_rng(0)
+
+        for i in range(args.files):
+            df = pd.DataFrame(
+                rng.integers(-1, 2, size=(args.rows, len(columns))), columns=columns
+            )
+
+            client.put_object(
+                Bucket=bucket,
+                Key=f"{training_pipeline.DATA_INGESTION_BUCKET_FOLDER_NAME}/phising_0801{2000 + i:04d}_120000.csv",
+                Body=df.to_csv(index=False).encode(),
+            )
+
+        download_file = S3Sync.download_file
+
+        def throttled_download_file(self, file_path, bucket_name, key, remote):
+            n_bytes = download_file(self, file_path, bucket_name, key, remote)
+
+            if n_bytes is not None:
+                time.sleep(n_bytes / (args.mb_per_sec * 1024 * 1024))
+
+            return n_bytes
+
+        S3Sync.download_file = throttled_download_file
+
+        for streaming in (False, True):
+            training_pipeline_config = TrainingPipelineConfig()
+
+            training_pipeline_config.artifact_dir = os.path.join(
+                tmp, f"streaming_{streaming}"
+            )
+
+            data_ingestion_config = DataIngestionConfig(training_pipeline_config)
+
+            data_ingestion_config.data_ingestion_cache_dir = os.path.join(
+                tmp, f"cache_{streaming}"
+            )
+
+            data_ingestion_config.data_ingestion_watermark_file_path = os.path.join(
+                data_ingestion_config.data_ingestion_cache_dir, "watermark.json"
+            )
+
+            data_ingestion_config.data_ingestion_streaming_mode = streaming
+
+            data_validation_config = DataValidationConfig(training_pipeline_config)
+
+            data_validation_config.data_validation_training_schema_path = os.path.join(
+                root, training_pipeline.DATA_VALIDATION_TRAIN_SCHEMA
+            )
+
+            data_validation_config.data_validation_regex_path = os.path.join(
+                root, training_pipeline.DATA_VALIDATION_REGEX
+            )
+
+            data_validation_config.data_validation_cache_file_path = os.path.join(
+                tmp, f"data_validation_cache_{streaming}.json"
+            )
+
+            start = time.perf_counter()
+
+            data_ingestion_artifact = DataIngestion(
+                data_ingestion_config
+            ).initiate_data_ingestion()
+
+            ingested = time.perf_counter()
+
+            DataValidation(
+                data_ingestion_artifact, data_validation_config
+            ).initiate_data_validation()
+
+            done = time.perf_counter()
+
+            print(
+                f"streaming={str(streaming):<6} ingestion={ingested - start:.2f}s "
+                f"validation={done - ingested:.2f}s total={done - start:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import KNNImputer, SimpleImputer
+from sklearn.pipeline import Pipeline
+
+from phising.constant import training_pipeline
+from phising.ml.model.estimator import phisingModel
+from phising.ml.model.imputer import NearestPatternImputer
+
+
+def make_rows(n_rows: int, n_features: int, seed: int = 0) -> np.ndarray:
+    """Random ternary rows, half of them with missing values."""
+    rng = np.random.default_rng(seed)
+
+    rows = rng.integers(-1, 2, size=(n_rows, n_features)).astype(np.float64)
+
+    rows[(rng.random(rows.shape) < 0.1) & (np.arange(n_rows) % 2 == 0)[:, None]] = np.nan
+
+    return rows
+
+
+@pytest.mark.parametrize(
+    "imputer",
+    [
+        KNNImputer(**training_pipeline.DATA_TRANSFORMATION_IMPUTER_PARAMS),
+        NearestPatternImputer(
+            **training_pipeline.DATA_TRANSFORMATION_NEAREST_PATTERN_IMPUTER_PARAMS
+        ),
+        SimpleImputer(**training_pipeline.DATA_TRANSFORMATION_MODE_IMPUTER_PARAMS),
+    ],
+)
+def test_batch_predictions_equal_per_row_predictions(imputer):
+    """The model service batches the rows of concurrent requests into one predict call."""
+    x_train = make_rows(500, 30, seed=1)
+
+    y_train = (np.nan_to_num(x_train[:, :5]).sum(axis=1) > 0).astype(int)
+
+    preprocessing_object = Pipeline([("imputer", imputer)]).fit(x_train)
+
+    trained_model_object = RandomForestClassifier(
+        n_estimators=20, random_state=0
+    ).fit(preprocessing_object.transform(x_train), y_train)
+
+    model = phisingModel(
+        preprocessing_object=preprocessing_object,
+        trained_model_object=trained_model_object,
+    )
+
+    rows = make_rows(256, 30)
+
+    batch_predictions = model.predict(None, rows)
+
+    row_predictions = np.concatenate([model.predict(None, row) for row in rows])
+
+    np.testing.assert_array_equal(batch_predictions, row_predictions)
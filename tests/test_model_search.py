@@ -0,0 +1,68 @@
+import numpy as np
+import yaml
+from xgboost import XGBClassifier
+
+from phising.constant import training_pipeline
+from phising.ml.search import ModelSearch
+
+
+def write_model_config(tmp_path) -> str:
+    model_config = {
+        "grid_search": {
+            "class": "GridSearchCV",
+            "module": "sklearn.model_selection",
+            "params": {"cv": 2, "verbose": 0, "n_jobs": 1, "scoring": "roc_auc"},
+        },
+        "model_selection": {
+            "module_0": {
+                "class": "XGBClassifier",
+                "module": "xgboost",
+                "search_param_grid": {"max_depth": [2, 3], "n_estimators": [5, 10]},
+            }
+        },
+    }
+
+    model_config_path = str(tmp_path / "model.yaml")
+
+    with open(model_config_path, "w") as f:
+        yaml.safe_dump(model_config, f)
+
+    return model_config_path
+
+
+def test_default_grid_search_searches_xgb_n_estimators(tmp_path):
+    model_search = ModelSearch(
+        model_config_path=write_model_config(tmp_path),
+        backend=training_pipeline.MODEL_TRAINER_SEARCH_BACKEND,
+        early_stopping_rounds=training_pipeline.MODEL_TRAINER_EARLY_STOPPING_ROUNDS,
+    )
+
+    assert not model_search.is_early_stopping(XGBClassifier())
+
+    rng = np.random.default_rng(0)
+
+    x = rng.integers(-1, 2, size=(200, 5)).astype(np.float64)
+
+    y = (x[:, 0] + x[:, 1] + rng.normal(scale=0.5, size=200) > 0).astype(int)
+
+    best_model = model_search.get_best_model(x, y, base_accuracy=0.5)
+
+    searched = {params["n_estimators"] for params in model_search.cv_results["module_0"]["params"]}
+
+    assert searched == {5, 10}
+
+    assert best_model.best_parameters["n_estimators"] in searched
+
+
+def test_grid_search_ignores_early_stopping_rounds(tmp_path):
+    model_search = ModelSearch(
+        model_config_path=write_model_config(tmp_path),
+        backend="grid",
+        early_stopping_rounds=10,
+    )
+
+    assert not model_search.is_early_stopping(XGBClassifier())
+
+    model_search.backend = "random"
+
+    assert model_search.is_early_stopping(XGBClassifier())
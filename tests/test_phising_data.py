@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from phising.data_access.phising_data import ArtifactWriter, PhisingData
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("artifact_format", ["csv", "parquet", "arrow"])
+def test_artifact_writer_keeps_missing_values(tmp_path, artifact_format):
+    """Validated chunks keep the missing values of the batch files, which the imputer fills later."""
+    column_types = {"having_IP_Address": "INTEGER", "URL_Length": "INTEGER", "Result": "INTEGER"}
+
+    chunks = [
+        pd.DataFrame({"having_IP_Address": [1, -1], "URL_Length": [0, 1], "Result": [1, -1]}),
+        pd.DataFrame(
+            {"having_IP_Address": [np.nan, 1.0], "URL_Length": [-1, 0], "Result": [-1, 1]}
+        ),
+    ]
+
+    file_path = os.path.join(tmp_path, "train." + artifact_format)
+
+    with ArtifactWriter(file_path, artifact_format, column_types) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    dataframe = PhisingData().read_artifact(file_path)
+
+    expected = pd.concat(chunks, ignore_index=True).astype(np.float64)
+
+    np.testing.assert_array_equal(dataframe.to_numpy(np.float64), expected.to_numpy())
@@ -1,13 +1,15 @@
+import argparse
 import sys
 
+from phising.constant import training_pipeline
 from phising.exception import PhisingException
 from phising.pipeline.training_pipeline import TrainPipeline
 from phising.utils.main_utils import sync_app_artifacts
 
 
-def start_training():
+def start_training(resume: bool = False, from_stage: str = None):
     try:
-        tp = TrainPipeline()
+        tp = TrainPipeline(resume=resume, from_stage=from_stage)
 
         tp.run_pipeline()
 
@@ -19,4 +21,20 @@ def start_training():
 
 
 if __name__ == "__main__":
-    start_training()
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="reuse the cached artifact of every stage whose inputs did not change, and cache the artifacts of this run",
+    )
+
+    parser.add_argument(
+        "--from-stage",
+        choices=training_pipeline.STAGE_CACHE_STAGES,
+        help="reuse the cached artifacts of the stages before this one, and run this stage onwards",
+    )
+
+    args = parser.parse_args()
+
+    start_training(resume=args.resume, from_stage=args.from_stage)